@@ -0,0 +1,230 @@
+"""
+    This is the file for tracing many course files for any seasons
+    without opening images, writing the results as they are found.
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+import time
+from PathFinderClass import PathFinder
+
+
+def findCourseFiles(patterns):
+    """
+        This function returns the course files matching the patterns, in order and without
+        duplicates. File names are kept even if the file is missing, so the error is written
+        with the results, and glob patterns matching no files are reported.
+    :param patterns:    the file names or glob patterns, ** matches any directories
+    :return:            list of the course files
+    """
+    courseFiles = []
+    for pattern in patterns:
+        matches = [pattern]
+        if glob.has_magic(pattern):
+            matches = [match for match in sorted(glob.glob(pattern, recursive=True)) if os.path.isfile(match)]
+            if not matches:
+                print("No course files match " + pattern, file=sys.stderr)
+        for courseFile in matches:
+            if courseFile not in courseFiles:
+                courseFiles.append(courseFile)
+    return courseFiles
+
+
+def imageNames(courseFiles):
+    """
+        This function returns the name used in the images of every course file, which is
+        its file name without the extension, or its path when several files share the name.
+    :param courseFiles: the course files
+    :return:            dictionary of the name of every course file
+    """
+    stems = [os.path.splitext(os.path.basename(courseFile))[0] for courseFile in courseFiles]
+    names = {}
+    for courseFile, stem in zip(courseFiles, stems):
+        if stems.count(stem) > 1:
+            stem = os.path.splitext(os.path.normpath(courseFile))[0].replace(os.sep, "_").lstrip("._")
+        names[courseFile] = stem
+    return names
+
+
+class ResultWriter():
+
+    """
+        This class writes the result of every course as soon as it is found,
+        as one JSON object per line or as one CSV row per leg.
+    """
+    __slots__ = 'outputFile', 'outputFormat', 'writePaths', 'csvWriter'
+
+    csvColumns = ['course', 'season', 'leg', 'startX', 'startY', 'endX', 'endY', 'distance',
+                  'totalDistance', 'seconds', 'image', 'error', 'path']
+
+    def __init__(self, outputFile, outputFormat, writePaths):
+        """
+            This is the constructor for the class.
+        :param outputFile:      the open file to write to
+        :param outputFormat:    'json' or 'csv'
+        :param writePaths:      True to write the points of the paths of the legs
+        """
+        self.outputFile = outputFile
+        self.outputFormat = outputFormat
+        self.writePaths = writePaths
+        self.csvWriter = None
+        if outputFormat == 'csv':
+            self.csvWriter = csv.writer(outputFile)
+            self.csvWriter.writerow(self.csvColumns)
+
+    def write(self, record):
+        """
+            This function writes the result of one course and season.
+        :param record:  dictionary of the result, as built by solveCourse
+        :return:        None
+        """
+        if self.outputFormat == 'json':
+            if not self.writePaths and 'legs' in record:
+                record = dict(record, legs=[{name: value for name, value in leg.items() if name != 'path'}
+                                            for leg in record['legs']])
+            self.outputFile.write(json.dumps(record) + "\n")
+        elif 'error' in record:
+            self.csvWriter.writerow([record['course'], record['season'], '', '', '', '', '', '', '',
+                                     record['seconds'], '', record['error'], ''])
+        else:
+            for i, leg in enumerate(record['legs']):
+                path = ";".join(str(x) + " " + str(y) for x, y in leg['path']) if self.writePaths else ''
+                self.csvWriter.writerow([record['course'], record['season'], i + 1] + leg['start'] + leg['end'] +
+                                        [leg['distance'], record['totalDistance'], record['seconds'],
+                                         record.get('image', ''), '', path])
+        self.outputFile.flush()
+
+
+def solveCourse(pathFinder, courseFile, season, imageFilePath=None):
+    """
+        This function finds the paths of a course for the season loaded.
+    :param pathFinder:      the path finder with the season loaded
+    :param courseFile:      the file with the points on the course
+    :param season:          the season loaded
+    :param imageFilePath:   the PNG file to draw the route in, None for no image
+    :return:                dictionary of the result, with an error instead of
+                            the legs if the course could not be traced
+    """
+    record = {'course': courseFile, 'season': season}
+    startTime = time.time()
+    try:
+        points = pathFinder.readPointsFile(courseFile)
+        if len(points) < 2:
+            raise ValueError("a course needs at least 2 points")
+        for point in points:
+            if not pathFinder.isOnMap(point):
+                raise ValueError("point outside the map: " + str(point))
+        result = pathFinder.solvePoints(points, season, courseFile)
+    except (OSError, ValueError, IndexError) as error:
+        record['seconds'] = time.time() - startTime
+        record['error'] = str(error)
+        return record
+
+    record['totalDistance'] = result.totalDistance()
+    record['seconds'] = result.timeTaken
+    record['legs'] = []
+    for i in range(0, len(result.legPaths)):
+        start, end = result.pointsOnRoute[i], result.pointsOnRoute[i + 1]
+        leg = {'start': [start.xCoordinate, start.yCoordinate], 'end': [end.xCoordinate, end.yCoordinate],
+               'distance': result.legDistances[i],
+               'path': [[start.xCoordinate, start.yCoordinate]] +
+                       [[point.xCoordinate, point.yCoordinate] for point in reversed(result.legPaths[i])]}
+        if result.legBounds[i] is not None:
+            leg['bound'] = result.legBounds[i]
+        record['legs'].append(leg)
+    if imageFilePath is not None:
+        pathFinder.renderRoute(result).save(imageFilePath)
+        record['image'] = imageFilePath
+    return record
+
+
+def main():
+    """
+        This is the main function for the batch route finder.
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description="Trace course files for the chosen seasons without opening any "
+                                                 "images, writing every result as soon as it is found.")
+    parser.add_argument("courses", nargs="+",
+                        help="course files or glob patterns of them, e.g. \"PathFiles/*.txt\" or \"courses/**/*.txt\"")
+    parser.add_argument("--season", nargs="+", default=None, choices=PathFinder.seasonsToConsider,
+                        help="the seasons to trace the courses for, all of them by default")
+    parser.add_argument("--output-dir", default="BatchResults", help="the directory to write the results to")
+    parser.add_argument("--format", default="json", choices=["json", "csv"],
+                        help="results.jsonl with one JSON object per course and season, or "
+                             "results.csv with one row per leg")
+    parser.add_argument("--images", action="store_true",
+                        help="also draw every route in <output-dir>/images/<season>_<course>.png")
+    parser.add_argument("--no-paths", action="store_true", help="leave the points of the paths out of the results")
+    parser.add_argument("--terrain", default="TerrainImageAndElevation/terrain.png", help="the terrain image")
+    parser.add_argument("--elevations", default="TerrainImageAndElevation/elevations.txt",
+                        help="the elevation file of the terrain")
+    parser.add_argument("--bundle", default="TerrainImageAndElevation/terrain.bundle",
+                        help="the compiled terrain bundle, rebuilt when the terrain files change; "
+                             "\"none\" to always read the terrain files")
+    parser.add_argument("--tiled-store", default=None,
+                        help="search this tiled terrain store instead of loading the whole map, only reading "
+                             "the tiles the searches reach; it is written from --terrain and --elevations a "
+                             "band of tiles at a time when missing. It holds the summer terrain only and "
+                             "can not be used with --images")
+    parser.add_argument("--epsilon", type=float, default=None,
+                        help="accept paths up to this many times the optimal cost, found faster with weighted A*")
+    arguments = parser.parse_args()
+
+    seasons = arguments.season or PathFinder.seasonsToConsider
+    if arguments.tiled_store is not None:
+        if arguments.season is not None and arguments.season != ['summer']:
+            parser.error("a tiled terrain store only holds the summer terrain")
+        if arguments.images:
+            parser.error("--images needs the whole map, it can not be used with --tiled-store")
+        if arguments.epsilon is not None:
+            parser.error("the tiled search always finds the optimal path, --epsilon can not be used with --tiled-store")
+        seasons = ['summer']
+
+    courseFiles = findCourseFiles(arguments.courses)
+    if not courseFiles:
+        parser.error("no course files match " + " ".join(arguments.courses))
+    names = imageNames(courseFiles)
+
+    os.makedirs(arguments.output_dir, exist_ok=True)
+    imageDirectory = os.path.join(arguments.output_dir, "images")
+    if arguments.images:
+        os.makedirs(imageDirectory, exist_ok=True)
+
+    # Create a path finder object
+    if arguments.tiled_store is not None:
+        pathFinder = PathFinder(arguments.terrain, arguments.elevations, searchEngine='tiled',
+                                tiledStoreFilePath=arguments.tiled_store)
+    else:
+        pathFinder = PathFinder(arguments.terrain, arguments.elevations, searchEngine='grid',
+                                bundleFilePath=None if arguments.bundle == "none" else arguments.bundle)
+    pathFinder.searchEpsilon = arguments.epsilon
+
+    outputFilePath = os.path.join(arguments.output_dir, "results.jsonl" if arguments.format == "json" else "results.csv")
+    failures = 0
+    count = 0
+    with open(outputFilePath, "w", newline="") as outputFile:
+        writer = ResultWriter(outputFile, arguments.format, not arguments.no_paths)
+        for season in seasons:
+            if arguments.tiled_store is None:
+                pathFinder.loadSeason(season)
+            for courseFile in courseFiles:
+                imageFilePath = None
+                if arguments.images:
+                    imageFilePath = os.path.join(imageDirectory, season + "_" + names[courseFile] + ".png")
+                record = solveCourse(pathFinder, courseFile, season, imageFilePath)
+                writer.write(record)
+                count += 1
+                if 'error' in record:
+                    failures += 1
+                    print(season + " " + courseFile + ": " + record['error'], file=sys.stderr)
+
+    print("Traced " + str(count) + " courses and seasons, " + str(failures) + " failed, results in " +
+          outputFilePath, file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+    This is the file for comparing the repair of the legs of a course
+    after a terrain edit with searching them again from scratch.
+"""
+import argparse
+import time
+from PathFinderClass import PathFinder
+from PixelPositionClass import PixelPosition
+
+
+def editArea(pathFinder, planners, controls, size):
+    """
+        This function returns a square of pixels around the middle of the
+        path of the middle leg, leaving out the controls.
+    :param pathFinder:  the path finder with the terrain
+    :param planners:    the planners of the legs
+    :param controls:    the nodes of the controls
+    :param size:        the length of the side of the square
+    :return:            list of the points in the square
+    """
+    terrainGrid = pathFinder.terrainGrid
+    path, distance = planners[len(planners) // 2].computePath()
+    centre = terrainGrid.position(path[len(path) // 2])
+    points = []
+    for x in range(centre.xCoordinate - size // 2, centre.xCoordinate - size // 2 + size):
+        for y in range(centre.yCoordinate - size // 2, centre.yCoordinate - size // 2 + size):
+            if 0 <= x < terrainGrid.width and 0 <= y < terrainGrid.height and \
+                    terrainGrid.index(PixelPosition(x, y)) not in controls:
+                points.append(PixelPosition(x, y))
+    return points
+
+
+def main():
+    """
+        This is the main function for the replanning benchmark.
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description="Compare repairing the legs of a course after a terrain edit "
+                                                 "with searching them again.")
+    parser.add_argument("--course", default="red.txt", help="the course in PathFiles to plan")
+    parser.add_argument("--season", default="summer", choices=PathFinder.seasonsToConsider,
+                        help="the season to plan in")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[5, 60],
+                        help="the lengths of the sides of the square areas to edit")
+    arguments = parser.parse_args()
+
+    # Create a path finder object
+    pathFinder = PathFinder("TerrainImageAndElevation/terrain.png", "TerrainImageAndElevation/elevations.txt",
+                            searchEngine='grid', bundleFilePath="TerrainImageAndElevation/terrain.bundle")
+    engine = pathFinder.gridSearchEngine
+    points = pathFinder.getPointsOnRoute(arguments.course)
+    controls = {pathFinder.terrainGrid.index(point) for point in points}
+
+    # a slow edit, like a flooded patch, and a fast one, like a cleared trail
+    for size in arguments.sizes:
+        for color in (pathFinder.walkForestF, pathFinder.pavedRoadKnL):
+            pathFinder.loadSeason(arguments.season)
+            planners = [pathFinder.incrementalPlanner(points[i - 1], points[i]) for i in range(1, len(points))]
+            for planner in planners:
+                planner.computePath()
+
+            changedEdges = pathFinder.editTerrain(editArea(pathFinder, planners, controls, size), color)
+
+            start = time.perf_counter()
+            repairExpanded = 0
+            for planner in planners:
+                planner.updateEdges(changedEdges)
+                planner.computePath()
+                repairExpanded += planner.nodesExpanded
+            repairTime = time.perf_counter() - start
+
+            start = time.perf_counter()
+            scratchExpanded = 0
+            worstError = 0.0
+            for planner in planners:
+                engine.findPath(planner.startNode, planner.endNode)
+                scratchExpanded += engine.nodesExpanded
+                worstError = max(worstError, abs(planner.lastCost - engine.lastCost) / engine.lastCost)
+            scratchTime = time.perf_counter() - start
+
+            print(str(size) + "x" + str(size) + " " + color + ": " + str(len(changedEdges)) + " edges changed, " +
+                  "repair " + format(repairTime * 1000, ".1f") + " ms (" + str(repairExpanded) + " nodes), " +
+                  "from scratch " + format(scratchTime * 1000, ".1f") + " ms (" + str(scratchExpanded) + " nodes), " +
+                  "largest cost difference " + format(worstError, ".1e"))
+
+if __name__ == '__main__':
+    main()
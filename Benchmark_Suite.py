@@ -0,0 +1,341 @@
+"""
+    This is the file for timing the terrain load, the seasons and every
+    season and course run, checking the total distances against their
+    known values and comparing the timings with an earlier benchmark.
+"""
+import argparse
+import gc
+import json
+import platform
+import resource
+import sys
+import time
+from PathFinderClass import PathFinder
+from GridSearchEngineClass import GridSearchEngine
+
+# the total distances of the courses found by the exact A* search of the grid engine; summer
+# and fall match the original search, winter and spring use the ice and mud layers of SeasonLayerBuilder
+goldenTotalDistances = {
+    ('summer', 'brown.txt'): 4216.776887336065,
+    ('summer', 'white.txt'): 2361.7822371100483,
+    ('summer', 'red.txt'): 5525.072584646182,
+    ('fall', 'brown.txt'): 4201.808776909981,
+    ('fall', 'white.txt'): 2346.2795336346867,
+    ('fall', 'red.txt'): 5449.045026350516,
+    ('winter', 'brown.txt'): 4216.776887336065,
+    ('winter', 'white.txt'): 2351.3568301593255,
+    ('winter', 'red.txt'): 5525.072584646182,
+    ('spring', 'brown.txt'): 4340.139067269376,
+    ('spring', 'white.txt'): 2427.3843884549897,
+    ('spring', 'red.txt'): 5755.342875005577,
+}
+
+# the largest relative difference of a total distance from its golden value
+distanceTolerance = 1e-9
+
+# the largest ratio of the total distance of the hierarchical search to the golden value, the worst
+# measured with 40 pixel clusters is 1.062 on spring white.txt
+hierarchicalDistanceBound = 1.065
+
+# timings differing by less than this many seconds, or than their noise, are never regressions
+noiseFloor = 0.005
+
+# the runs of every course kept when comparing with an earlier benchmark, the fastest is used
+compareRepeat = 5
+
+# the functions of SeasonLayerBuilder building the layer of every season from the base terrain
+layerBuilders = {'fall': 'buildFall', 'winter': 'buildWinter', 'spring': 'buildSpring'}
+
+
+def percentiles(values):
+    """
+        This function returns the percentiles of a list of values.
+    :param values:  the values
+    :return:        dictionary of the 50th, 90th and 99th percentile and the largest value
+    """
+    values = sorted(values)
+    if not values:
+        return {}
+    return {'p50': values[(len(values) - 1) // 2],
+            'p90': values[min(len(values) - 1, int(len(values) * 0.9))],
+            'p99': values[min(len(values) - 1, int(len(values) * 0.99))],
+            'max': values[-1]}
+
+
+def peakMemory():
+    """
+        This function returns the peak resident memory of the process.
+    :return:    the peak resident memory in megabytes
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes elsewhere
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / (1 << 10)
+
+
+def runCourse(pathFinder, season, routeFile):
+    """
+        This function finds the paths of all legs of a course, timing every leg.
+        The garbage collector is paused while timing, as timeit does, so its
+        collections do not land on some runs and not on others.
+    :param pathFinder:  the path finder with the season loaded
+    :param season:      the season loaded
+    :param routeFile:   the file with the points on the course
+    :return:            dictionary of the time taken, the total distance, the
+                        nodes expanded and the latencies of the legs in milliseconds
+    """
+    points = pathFinder.getPointsOnRoute(routeFile)
+    totalDistance = 0
+    nodesExpanded = 0
+    latencies = []
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for point in range(1, len(points)):
+            legStart = time.perf_counter()
+            path, distance = pathFinder.findPath(points[point - 1], points[point])
+            latencies.append((time.perf_counter() - legStart) * 1000)
+            # every search, the hierarchical one included, leaves its counters in the grid search engine
+            nodesExpanded += pathFinder.gridSearchEngine.nodesExpanded
+            totalDistance += distance
+        seconds = time.perf_counter() - start
+    finally:
+        gc.enable()
+    return {'season': season, 'course': routeFile, 'seconds': seconds,
+            'totalDistance': totalDistance, 'nodesExpanded': nodesExpanded, 'legLatenciesMs': latencies}
+
+
+def median(values):
+    """
+        This function returns the median of a list of values.
+    :param values:  the values
+    :return:        the median
+    """
+    values = sorted(values)
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+
+
+def runHierarchical(pathFinder):
+    """
+        This function runs every season and course with the hierarchical search
+        and compares the total distances with the optimal golden values.
+    :param pathFinder:  the path finder
+    :return:            dictionary of the seconds taken to load or build the graph of every
+                        season, the runs with the ratio of their distance to the golden
+                        value and their nodes expanded per second, the worst ratio and
+                        the runs over hierarchicalDistanceBound
+    """
+    graphSeconds = {}
+    runs = []
+    pathFinder.useHierarchy = True
+    try:
+        for season in pathFinder.seasonsToConsider:
+            pathFinder.loadSeason(season)
+            start = time.perf_counter()
+            pathFinder.prepareHierarchy()
+            graphSeconds[season] = time.perf_counter() - start
+            for routeFile in pathFinder.pathsToTrace:
+                run = runCourse(pathFinder, season, routeFile)
+                del run['legLatenciesMs']
+                golden = goldenTotalDistances.get((season, routeFile))
+                run['distanceRatio'] = run['totalDistance'] / golden if golden else None
+                run['nodesPerSecond'] = run['nodesExpanded'] / run['seconds'] if run['seconds'] > 0 else 0
+                runs.append(run)
+    finally:
+        pathFinder.useHierarchy = False
+
+    ratios = [run['distanceRatio'] for run in runs if run['distanceRatio'] is not None]
+    return {'graphSeconds': graphSeconds, 'runs': runs, 'worstRatio': max(ratios) if ratios else None,
+            'bound': hierarchicalDistanceBound,
+            'overBound': [run['season'] + " " + run['course'] for run in runs
+                          if run['distanceRatio'] is not None and run['distanceRatio'] > hierarchicalDistanceBound]}
+
+
+def runBenchmark(repeat=1, openList='heap', hierarchical=True):
+    """
+        This function times the terrain load, the build of the layer of every
+        season from the base terrain, the set up of every season and every
+        season and course run. The layers are built again even though the
+        terrain bundle holds them. All of it is repeated in rounds, keeping
+        the fastest run of every timing and the noise of
+        every timing, how much slower its median run is than its fastest.
+    :param repeat:          the number of rounds
+    :param openList:        the open list of the grid search engine, one of GridSearchEngine.openLists
+    :param hierarchical:    True to also run the courses with the hierarchical search
+    :return:                the benchmark as a dictionary
+    """
+    # every round sets up every season and runs all the courses once, so a slow
+    # spell of the machine only slows one run of every timing
+    samples = {}
+    courseRuns = {}
+    for i in range(0, repeat):
+        start = time.perf_counter()
+        pathFinder = PathFinder("TerrainImageAndElevation/terrain.png", "TerrainImageAndElevation/elevations.txt",
+                                searchEngine='grid', bundleFilePath="TerrainImageAndElevation/terrain.bundle")
+        samples.setdefault('terrain load', []).append(time.perf_counter() - start)
+        pathFinder.gridSearchEngine.setOpenList(openList)
+
+        roundSeconds = 0.0
+        for season in pathFinder.seasonsToConsider:
+            layerBuild = 0.0
+            if season in layerBuilders:
+                pathFinder.terrainGrid.applyOverlay(None)
+                start = time.perf_counter()
+                getattr(pathFinder.seasonLayerBuilder, layerBuilders[season])(pathFinder.terrainGrid)
+                layerBuild = time.perf_counter() - start
+            samples.setdefault(season + " layer build", []).append(layerBuild)
+            start = time.perf_counter()
+            pathFinder.loadSeason(season)
+            samples.setdefault(season + " load", []).append(time.perf_counter() - start)
+            start = time.perf_counter()
+            pathFinder.prepareEdgeCosts()
+            samples.setdefault(season + " edge costs", []).append(time.perf_counter() - start)
+
+            for routeFile in pathFinder.pathsToTrace:
+                run = runCourse(pathFinder, season, routeFile)
+                courseRuns.setdefault((season, routeFile), []).append(run)
+                samples.setdefault(season + " " + routeFile, []).append(run['seconds'])
+                samples.setdefault(season + " " + routeFile + " p90 leg", []).append(
+                    percentiles(run['legLatenciesMs']).get('p90', 0) / 1000)
+                roundSeconds += run['seconds']
+        samples.setdefault('all runs', []).append(roundSeconds)
+
+    seasons = {}
+    for season in pathFinder.seasonsToConsider:
+        seasons[season] = {'layerBuildSeconds': min(samples[season + " layer build"]),
+                           'loadSeconds': min(samples[season + " load"]),
+                           'edgeCostSeconds': min(samples[season + " edge costs"])}
+
+    runs = []
+    for (season, routeFile), repeatedRuns in courseRuns.items():
+        run = min(repeatedRuns, key=lambda result: result['seconds'])
+        golden = goldenTotalDistances.get((season, routeFile))
+        run['goldenDistance'] = golden
+        run['matchesGolden'] = golden is None or \
+            abs(run['totalDistance'] - golden) <= distanceTolerance * golden
+        run['nodesPerSecond'] = run['nodesExpanded'] / run['seconds'] if run['seconds'] > 0 else 0
+        run['legLatencyMs'] = percentiles(run.pop('legLatenciesMs'))
+        run['legLatencyMs']['p90'] = min(samples[season + " " + routeFile + " p90 leg"]) * 1000
+        runs.append(run)
+
+    totalSeconds = sum(run['seconds'] for run in runs)
+    totalExpanded = sum(run['nodesExpanded'] for run in runs)
+    benchmark = {'python': platform.python_version(),
+            'machine': platform.machine(),
+            'repeat': repeat,
+            'openList': openList,
+            'terrainLoadSeconds': min(samples['terrain load']),
+            'seasons': seasons,
+            'runs': runs,
+            'totals': {'seconds': totalSeconds, 'nodesExpanded': totalExpanded,
+                       'nodesPerSecond': totalExpanded / totalSeconds if totalSeconds > 0 else 0},
+            'noiseSeconds': {name: median(values) - min(values) for name, values in samples.items()},
+            'peakRssMb': peakMemory(),
+            'goldenMismatches': [run['season'] + " " + run['course'] for run in runs if not run['matchesGolden']]}
+    if hierarchical:
+        benchmark['hierarchical'] = runHierarchical(pathFinder)
+    return benchmark
+
+
+def timings(benchmark):
+    """
+        This function returns the timings of a benchmark that are compared between benchmarks.
+    :param benchmark:   the benchmark
+    :return:            dictionary of the name and the seconds of every timing
+    """
+    values = {'terrain load': benchmark['terrainLoadSeconds'], 'all runs': benchmark['totals']['seconds']}
+    for season, seasonTimings in benchmark['seasons'].items():
+        values[season + " layer build"] = seasonTimings.get('layerBuildSeconds', 0)
+        values[season + " load"] = seasonTimings['loadSeconds']
+        values[season + " edge costs"] = seasonTimings['edgeCostSeconds']
+    for run in benchmark['runs']:
+        values[run['season'] + " " + run['course']] = run['seconds']
+        values[run['season'] + " " + run['course'] + " p90 leg"] = run['legLatencyMs'].get('p90', 0) / 1000
+    return values
+
+
+def findRegressions(benchmark, baseline, threshold):
+    """
+        This function compares the timings of a benchmark with a baseline. A
+        timing is only slower than allowed if it is slower by more than the
+        threshold, the noise floor and the noise of the timing in both.
+    :param benchmark:   the benchmark
+    :param baseline:    the earlier benchmark to compare with
+    :param threshold:   the largest allowed relative slow down, 0.2 for 20 %
+    :return:            list of the descriptions of the timings slower than allowed
+    """
+    regressions = []
+    current = timings(benchmark)
+    currentNoise = benchmark.get('noiseSeconds', {})
+    baselineNoise = baseline.get('noiseSeconds', {})
+    for name, before in timings(baseline).items():
+        after = current.get(name)
+        if after is None:
+            continue
+        noise = max(noiseFloor, currentNoise.get(name, 0) + baselineNoise.get(name, 0))
+        if after > before * (1 + threshold) and after - before > noise:
+            regressions.append(name + ": " + format(before, ".4f") + " s -> " + format(after, ".4f") + " s")
+    if 'hierarchical' in benchmark and 'hierarchical' in baseline:
+        # the error of the hierarchical search should not grow
+        before = {(run['season'], run['course']): run['distanceRatio'] for run in baseline['hierarchical']['runs']}
+        for run in benchmark['hierarchical']['runs']:
+            ratio = before.get((run['season'], run['course']))
+            if ratio is not None and run['distanceRatio'] > ratio + distanceTolerance:
+                regressions.append(run['season'] + " " + run['course'] + " hierarchical distance: " +
+                                   format(ratio, ".4f") + " -> " + format(run['distanceRatio'], ".4f") +
+                                   " of optimal")
+    if benchmark['peakRssMb'] > baseline['peakRssMb'] * (1 + threshold):
+        regressions.append("peak RSS: " + format(baseline['peakRssMb'], ".1f") + " MB -> " +
+                           format(benchmark['peakRssMb'], ".1f") + " MB")
+    return regressions
+
+
+def main():
+    """
+        This is the main function for the benchmark suite.
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description="Time all season and course runs and check their distances.")
+    parser.add_argument("--output", default=None, help="the JSON file to write, the standard output if not given")
+    parser.add_argument("--compare", default=None, help="the JSON file of an earlier benchmark to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="the relative slow down compared with --compare counted as a regression")
+    parser.add_argument("--repeat", type=int, default=None,
+                        help="run every course this many times and keep the fastest, by default once "
+                             "or " + str(compareRepeat) + " times with --compare")
+    parser.add_argument("--open-list", default="heap", choices=GridSearchEngine.openLists,
+                        help="the open list of the search, to compare the bucket queue with the heap")
+    parser.add_argument("--no-hierarchical", action="store_true",
+                        help="skip the runs of the hierarchical search, whose graphs take about 10 s "
+                             "per season to build the first time")
+    arguments = parser.parse_args()
+
+    repeat = arguments.repeat
+    if repeat is None:
+        repeat = compareRepeat if arguments.compare is not None else 1
+    benchmark = runBenchmark(repeat, arguments.open_list, not arguments.no_hierarchical)
+    if arguments.output is None:
+        print(json.dumps(benchmark, indent=2))
+    else:
+        with open(arguments.output, "w") as outputFile:
+            json.dump(benchmark, outputFile, indent=2)
+
+    failed = False
+    for mismatch in benchmark['goldenMismatches']:
+        print("Total distance differs from the golden value: " + mismatch, file=sys.stderr)
+        failed = True
+    for run in benchmark.get('hierarchical', {}).get('overBound', []):
+        print("Hierarchical total distance more than " + str(hierarchicalDistanceBound) +
+              " times the golden value: " + run, file=sys.stderr)
+        failed = True
+    if arguments.compare is not None:
+        with open(arguments.compare) as baselineFile:
+            regressions = findRegressions(benchmark, json.load(baselineFile), arguments.threshold)
+        for regression in regressions:
+            print("Slower than " + arguments.compare + ": " + regression, file=sys.stderr)
+            failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+    This file implements the bucket priority queue that
+    the grid search engine can use instead of a binary heap.
+"""
+
+
+class BucketQueue():
+
+    """
+        This class is a priority queue of (key, node) entries for keys that
+        only grow slowly, like the estimates of A* with positive, bounded
+        edge costs. As in Dial's algorithm, keys are quantised into an array
+        of buckets of bucketWidth, and the entries of a bucket are kept in a
+        plain list without any order among them. A pop takes any entry of the
+        lowest bucket holding entries, so its key is within bucketWidth of the
+        smallest key queued, and lowestKey gives a bound no queued key is below.
+
+        An entry with a key below the current bucket moves the current bucket
+        back to it, so the bound stays valid for inconsistent estimates.
+
+        push and pop take the queue as their first argument, so a search
+        can call them in place of heappush and heappop.
+    """
+    __slots__ = 'bucketWidth', 'currentBucket', 'buckets', 'size'
+
+    def __init__(self, bucketWidth):
+        """
+            This is the constructor for the class.
+        :param bucketWidth:     the range of keys of a bucket
+        """
+        self.bucketWidth = bucketWidth
+        self.currentBucket = 0
+        self.buckets = [[] for _ in range(0, 64)]
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def push(self, entry):
+        """
+            This function adds an entry to the queue.
+        :param entry:   the key and the node
+        :return:        None
+        """
+        self.size += 1
+        bucket = int(entry[0] / self.bucketWidth)
+        if bucket >= len(self.buckets):
+            self.buckets.extend([] for _ in range(0, bucket + 1))
+        elif bucket < self.currentBucket:
+            self.currentBucket = bucket
+        self.buckets[bucket].append(entry)
+
+    def pop(self):
+        """
+            This function removes an entry of the lowest bucket holding entries.
+        :return:    the key and the node
+        """
+        buckets = self.buckets
+        bucket = self.currentBucket
+        while not buckets[bucket]:
+            bucket += 1
+        self.currentBucket = bucket
+        self.size -= 1
+        return buckets[bucket].pop()
+
+    def lowestKey(self):
+        """
+            This function returns a bound no key in the queue is below.
+        :return:    the lowest key of the current bucket
+        """
+        return self.currentBucket * self.bucketWidth
@@ -0,0 +1,165 @@
+"""
+    This file implements finding the fastest order to visit
+    the controls of a score course.
+"""
+import time
+
+
+class ControlOrderSolver():
+
+    """
+        This class finds the order of the controls with the lowest total
+        cost, starting at the start and ending at the finish, from a matrix
+        of the costs between every pair of controls. The costs need not be
+        symmetric, since going uphill is slower than going down.
+
+        Up to exactLimit controls between the start and the finish are solved
+        exactly with the Held-Karp dynamic programme. Larger sets start from
+        the nearest neighbour order and are improved with 2-opt and Or-opt
+        moves until no move helps or the time budget runs out.
+    """
+    __slots__ = 'costs', 'start', 'finish', 'exactLimit', 'timeBudget', 'exact'
+
+    def __init__(self, costs, start=0, finish=None, exactLimit=12, timeBudget=1.0):
+        """
+            This is the constructor for the class.
+        :param costs:       N x N matrix of the cost from every control to every other
+        :param start:       the index of the start
+        :param finish:      the index of the finish, None for the last control
+        :param exactLimit:  the most controls between start and finish solved exactly
+        :param timeBudget:  the seconds the local search may take
+        """
+        self.costs = [[float(cost) for cost in row] for row in costs]
+        self.start = start
+        self.finish = len(self.costs) - 1 if finish is None else finish
+        self.exactLimit = exactLimit
+        self.timeBudget = timeBudget
+        self.exact = False
+
+    def orderCost(self, order):
+        """
+            This function returns the total cost of an order.
+        :param order:   the indices of the controls in the order they are visited
+        :return:        the total cost
+        """
+        costs = self.costs
+        return sum(costs[order[i]][order[i + 1]] for i in range(0, len(order) - 1))
+
+    def solve(self):
+        """
+            This function finds the order of the controls.
+        :return:    the indices of the controls from the start to the finish and its total cost
+        """
+        controls = [i for i in range(0, len(self.costs)) if i != self.start and i != self.finish]
+        if len(controls) <= self.exactLimit:
+            self.exact = True
+            order = self.heldKarp(controls)
+        else:
+            self.exact = False
+            order = self.localSearch(self.nearestNeighbourOrder(controls))
+        return order, self.orderCost(order)
+
+    def heldKarp(self, controls):
+        """
+            This function finds the best order with the Held-Karp dynamic programme.
+        :param controls:    the controls between the start and the finish
+        :return:            the best order from the start to the finish
+        """
+        costs = self.costs
+        count = len(controls)
+        infinity = float('inf')
+        full = (1 << count) - 1
+
+        # best[subset][last] is the lowest cost from the start through the subset ending at last
+        best = [[infinity] * count for subset in range(0, full + 1)]
+        parent = [[-1] * count for subset in range(0, full + 1)]
+        for i in range(0, count):
+            best[1 << i][i] = costs[self.start][controls[i]]
+
+        for subset in range(1, full + 1):
+            for last in range(0, count):
+                cost = best[subset][last]
+                if cost == infinity or not subset & (1 << last):
+                    continue
+                fromCosts = costs[controls[last]]
+                for following in range(0, count):
+                    if subset & (1 << following):
+                        continue
+                    nextSubset = subset | (1 << following)
+                    new_cost = cost + fromCosts[controls[following]]
+                    if new_cost < best[nextSubset][following]:
+                        best[nextSubset][following] = new_cost
+                        parent[nextSubset][following] = last
+
+        if count == 0:
+            return [self.start, self.finish]
+        last = min(range(0, count), key=lambda i: best[full][i] + costs[controls[i]][self.finish])
+
+        # walk back through the parents
+        order = [self.finish]
+        subset = full
+        while last != -1:
+            order.append(controls[last])
+            last, subset = parent[subset][last], subset & ~(1 << last)
+        order.append(self.start)
+        order.reverse()
+        return order
+
+    def nearestNeighbourOrder(self, controls):
+        """
+            This function builds an order by always going to the cheapest control not visited yet.
+        :param controls:    the controls between the start and the finish
+        :return:            the order from the start to the finish
+        """
+        order = [self.start]
+        remaining = set(controls)
+        while remaining:
+            current = self.costs[order[-1]]
+            following = min(remaining, key=lambda control: current[control])
+            order.append(following)
+            remaining.remove(following)
+        order.append(self.finish)
+        return order
+
+    def localSearch(self, order):
+        """
+            This function improves an order with 2-opt and Or-opt moves, taking
+            the first improving move, until none improves it or time runs out.
+        :param order:   the order from the start to the finish
+        :return:        the improved order
+        """
+        deadline = time.time() + self.timeBudget
+        cost = self.orderCost(order)
+        improved = True
+        while improved and time.time() < deadline:
+            improved = False
+            for candidate in self.neighbourOrders(order):
+                candidateCost = self.orderCost(candidate)
+                if candidateCost < cost - 1e-9:
+                    order = candidate
+                    cost = candidateCost
+                    improved = True
+                    break
+                if time.time() >= deadline:
+                    break
+        return order
+
+    def neighbourOrders(self, order):
+        """
+            This function generates the orders one move away. A 2-opt move reverses
+            a stretch of the order and an Or-opt move moves a stretch of 1 to 3
+            controls elsewhere. The start and the finish never move.
+        :param order:   the order from the start to the finish
+        :return:        generator of the neighbouring orders
+        """
+        last = len(order) - 1
+        for i in range(1, last):
+            for j in range(i + 1, last):
+                yield order[0:i] + order[i:j + 1][::-1] + order[j + 1:]
+        for length in range(1, 4):
+            for i in range(1, last - length + 1):
+                segment = order[i:i + length]
+                rest = order[0:i] + order[i + length:]
+                for position in range(1, len(rest)):
+                    if position != i:
+                        yield rest[0:position] + segment + rest[position:]
@@ -0,0 +1,114 @@
+"""
+    This file implements the precomputed traversal costs of
+    all edges between neighbouring pixels for one season.
+"""
+import hashlib
+import numpy as np
+from GridSearchEngineClass import GridSearchEngine
+
+
+class EdgeCostRaster():
+
+    """
+        This class stores the cost of moving from every pixel to each of
+        its 8 neighbours as an (8, height, width) array. The cost of an edge
+        is infinite when the neighbour is off the map or can not be entered.
+    """
+    __slots__ = 'width', 'height', 'costs', 'passable', 'flatCosts', 'minCostPerDistance', 'costsDigest', \
+                'blockedCodes'
+
+    # the version of the cost model, changed whenever the costs are computed differently
+    costModelVersion = 1
+
+    def __init__(self, terrainGrid, blockedCodes):
+        """
+            This is the constructor for the class, it computes
+            the costs for the current terrain of the grid.
+        :param terrainGrid:     the terrain grid to compute the costs for
+        :param blockedCodes:    the terrain class codes that can not be entered
+        """
+        self.width = terrainGrid.width
+        self.height = terrainGrid.height
+        self.blockedCodes = list(blockedCodes)
+        shape = (self.height, self.width)
+
+        elevation = terrainGrid.elevation.reshape(shape).astype(np.float64)
+        speed = terrainGrid.speed.reshape(shape).astype(np.float64)
+        self.passable = ~np.isin(terrainGrid.terrainClass.reshape(shape), list(blockedCodes))
+
+        self.costs = np.full((8,) + shape, np.inf)
+        self.minCostPerDistance = np.inf
+        for direction, (dx, dy) in enumerate(GridSearchEngine.stepDirections):
+            distance = GridSearchEngine.stepDistance(dx, dy)
+
+            # slices of the pixels moved from and the neighbours moved to
+            fromRows = slice(max(0, -dy), self.height - max(0, dy))
+            fromColumns = slice(max(0, -dx), self.width - max(0, dx))
+            toRows = slice(max(0, dy), self.height - max(0, -dy))
+            toColumns = slice(max(0, dx), self.width - max(0, -dx))
+
+            elevation_angle = np.degrees(np.arctan((elevation[fromRows, fromColumns] -
+                                                    elevation[toRows, toColumns]) / distance))
+            pixel_speed = speed[toRows, toColumns]
+            with np.errstate(divide='ignore'):
+                cost = distance / (pixel_speed - (pixel_speed * elevation_angle / 100))
+            self.costs[direction, fromRows, fromColumns] = np.where(self.passable[toRows, toColumns], cost, np.inf)
+            self.minCostPerDistance = min(self.minCostPerDistance, self.costs[direction].min() / distance)
+
+        # the lowest cost per unit of distance, used for admissible heuristics
+        self.minCostPerDistance = float(self.minCostPerDistance)
+
+        # flat views used by the search engine for fast lookups
+        self.flatCosts = [memoryview(self.costs[direction].reshape(-1)) for direction in range(0, 8)]
+        self.costsDigest = None
+
+    def updatePixels(self, terrainGrid, nodes):
+        """
+            This function recomputes the costs of the edges into pixels whose
+            terrain class or speed changed, the only edges such a change affects.
+        :param terrainGrid:     the terrain grid with the changed pixels
+        :param nodes:           the flat indices of the changed pixels
+        :return:                list of the node, direction and old cost of every changed edge
+        """
+        nodes = np.unique(np.asarray(nodes, dtype=np.int64))
+        x = nodes % self.width
+        y = nodes // self.width
+        self.passable[y, x] = ~np.isin(terrainGrid.terrainClass[nodes], self.blockedCodes)
+        self.costsDigest = None
+
+        changed = []
+        for direction, (dx, dy) in enumerate(GridSearchEngine.stepDirections):
+            distance = GridSearchEngine.stepDistance(dx, dy)
+            # the pixels the edges into the changed pixels start from
+            fromX = x - dx
+            fromY = y - dy
+            onMap = (fromX >= 0) & (fromX < self.width) & (fromY >= 0) & (fromY < self.height)
+            fromX, fromY, toX, toY = fromX[onMap], fromY[onMap], x[onMap], y[onMap]
+            toNodes = toY * self.width + toX
+            fromNodes = fromY * self.width + fromX
+
+            elevation_angle = np.degrees(np.arctan((terrainGrid.elevation[fromNodes].astype(np.float64) -
+                                                    terrainGrid.elevation[toNodes].astype(np.float64)) / distance))
+            pixel_speed = terrainGrid.speed[toNodes].astype(np.float64)
+            with np.errstate(divide='ignore'):
+                cost = distance / (pixel_speed - (pixel_speed * elevation_angle / 100))
+            cost = np.where(self.passable[toY, toX] & (cost > 0), cost, np.inf)
+
+            oldCost = self.costs[direction, fromY, fromX]
+            differs = oldCost != cost
+            for node, old in zip(fromNodes[differs].tolist(), oldCost[differs].tolist()):
+                changed.append((node, direction, old))
+            self.costs[direction, fromY, fromX] = cost
+            if np.isfinite(cost).any():
+                self.minCostPerDistance = min(self.minCostPerDistance, float(cost[np.isfinite(cost)].min()) / distance)
+        return changed
+
+    def digest(self):
+        """
+            This function returns a digest of the edge costs, computed on first use,
+            identifying the data derived from them such as landmark tables.
+        :return:    the hexadecimal sha1 digest of the costs
+        """
+        if self.costsDigest is None:
+            self.costsDigest = hashlib.sha1(self.costs.tobytes()).hexdigest()
+        return self.costsDigest
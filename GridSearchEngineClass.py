@@ -0,0 +1,723 @@
+"""
+    This file implements the A* search on integer node ids
+    (y * width + x) of the terrain grid.
+"""
+import time
+from heapq import heappush, heappop, heapify
+from math import sqrt
+from BucketQueueClass import BucketQueue
+
+
+class SearchBudgetExceeded(Exception):
+
+    """
+        This exception is raised when a search expands
+        more nodes than it was allowed to.
+    """
+    pass
+
+
+class GridSearchEngine():
+
+    """
+        This class implements A* on the flat terrain arrays.
+        The cost, distance and previous node arrays are allocated
+        once and reused by every search, so a search only touches
+        the nodes it actually visits.
+    """
+    __slots__ = 'terrainGrid', 'edgeCosts', 'width', 'height', 'size', 'costTillNow', 'distanceTillNow', \
+                'previousNode', 'visitStamp', 'closedStamp', 'searchNumber', 'stepOffsets', 'stepDistances', \
+                'nodesExpanded', 'lastCost', 'costFromEnd', 'distanceFromEnd', 'nextNode', 'backwardStamp', \
+                'backwardClosedStamp', 'lastBound', 'nodesPushed', 'stalePops', 'reopenedNodes', 'openList', \
+                'bucketSteps'
+
+    # *************************************** Assign the 8 neighbour steps ***************************
+    stepDirections = [(-1, -1), (0, -1), (1, -1), (-1, 0), (1, 0), (-1, 1), (0, 1), (1, 1)]
+
+    xDistLongitude = 10.29
+    yDistLatitude = 7.55
+    diagonalDist = sqrt(xDistLongitude ** 2 + yDistLatitude ** 2)
+
+    # the open lists findPath can keep its entries in
+    openLists = ['heap', 'buckets']
+
+    @classmethod
+    def stepDistance(cls, dx, dy):
+        """
+            This function returns the distance covered by a step.
+        :param dx:  the step along x
+        :param dy:  the step along y
+        :return:    the distance covered by the step
+        """
+        if dx != 0 and dy != 0:
+            return cls.diagonalDist
+        elif dx != 0:
+            return cls.xDistLongitude
+        else:
+            return cls.yDistLatitude
+
+    def __init__(self, terrainGrid):
+        """
+            This is the constructor for the class.
+        :param terrainGrid:     the terrain grid to search on
+        """
+        self.terrainGrid = terrainGrid
+        self.edgeCosts = None
+        self.width = terrainGrid.width
+        self.height = terrainGrid.height
+        self.size = self.width * self.height
+
+        # arrays reused across searches, an entry is only valid when
+        # its visit stamp matches the current search number
+        self.costTillNow = [0.0] * self.size
+        self.distanceTillNow = [0.0] * self.size
+        self.previousNode = [-1] * self.size
+        self.visitStamp = [0] * self.size
+        self.closedStamp = [0] * self.size
+        self.searchNumber = 0
+        self.nodesExpanded = 0
+        self.lastCost = 0.0
+        self.lastBound = 1.0
+        self.openList = 'heap'
+        self.bucketSteps = 1
+        # counters of the last search, for instrumentation
+        self.nodesPushed = 0
+        self.stalePops = 0
+        self.reopenedNodes = 0
+
+        # arrays of the backward search, allocated when it is first used
+        self.costFromEnd = None
+        self.distanceFromEnd = None
+        self.nextNode = None
+        self.backwardStamp = None
+        self.backwardClosedStamp = None
+
+        self.stepOffsets = [dy * self.width + dx for dx, dy in self.stepDirections]
+        self.stepDistances = [self.stepDistance(dx, dy) for dx, dy in self.stepDirections]
+
+    def setEdgeCosts(self, edgeCosts):
+        """
+            This function sets the precomputed edge costs of the season to search on.
+        :param edgeCosts:   the edge cost raster to use
+        :return:            None
+        """
+        self.edgeCosts = edgeCosts
+
+    def nextSearchNumber(self):
+        """
+            This function starts a new search, invalidating the
+            data of the previous one without clearing the arrays.
+        :return:    the number of the new search
+        """
+        self.searchNumber += 1
+        return self.searchNumber
+
+    def findPath(self, startNode, endNode, maxExpansions=None, heuristic=None):
+        """
+            This function finds the path between 2 nodes using A*.
+            Nodes closed with a higher cost than found later are reopened,
+            which keeps the results of the dictionary based implementation.
+        :param startNode:       the starting node
+        :param endNode:         the ending node
+        :param maxExpansions:   the most nodes the search may expand, None for no limit
+        :param heuristic:       function returning the estimated cost from a node to the
+                                end node, None for the estimate of heuristic1
+        :return:                the nodes of the path from the end node back to
+                                (but excluding) the start node and the distance
+        """
+        search = self.nextSearchNumber()
+        costTillNow = self.costTillNow
+        distanceTillNow = self.distanceTillNow
+        previousNode = self.previousNode
+        visitStamp = self.visitStamp
+        closedStamp = self.closedStamp
+        speedOf = memoryview(self.terrainGrid.speed)
+        width = self.width
+        steps = list(zip(self.stepDirections, self.stepOffsets, self.stepDistances, self.edgeCosts.flatCosts))
+        infinity = float('inf')
+        endX = endNode % width
+        endY = endNode // width
+
+        costTillNow[startNode] = 0.0
+        distanceTillNow[startNode] = 0.0
+        previousNode[startNode] = -1
+        visitStamp[startNode] = search
+
+        # the entries of a bucket queue leave in no order within a bucket, so the search
+        # goes on after reaching the end node until no entry left can lead to a cheaper path
+        unordered = self.openList == 'buckets'
+        if unordered:
+            queue = self.newBucketQueue()
+            push = BucketQueue.push
+            pop = BucketQueue.pop
+            push(queue, (0.0, startNode))
+        else:
+            queue = [(0.0, startNode)]
+            push = heappush
+            pop = heappop
+        expanded = 0
+        stale = 0
+        reopened = 0
+        budget = infinity if maxExpansions is None else maxExpansions
+
+        while queue:
+            value, currentNode = pop(queue)
+
+            # skip entries that were already expanded
+            if closedStamp[currentNode] == search:
+                stale += 1
+                continue
+            # skip entries that can not lead to a path cheaper than the one found
+            if unordered and visitStamp[endNode] == search and value >= costTillNow[endNode]:
+                stale += 1
+                if queue.lowestKey() >= costTillNow[endNode]:
+                    break
+                continue
+            closedStamp[currentNode] = search
+            expanded += 1
+            if expanded > budget:
+                self.recordCounters(expanded, stale, len(queue), reopened)
+                raise SearchBudgetExceeded("more than " + str(maxExpansions) + " nodes expanded from node " +
+                                           str(startNode) + " to node " + str(endNode))
+
+            # if the destination is reached
+            if currentNode == endNode:
+                break
+
+            currentCost = costTillNow[currentNode]
+            currentDistance = distanceTillNow[currentNode]
+            x = currentNode % width
+            y = currentNode // width
+
+            for (dx, dy), offset, distance, edgeCost in steps:
+                cost = edgeCost[currentNode]
+                # the neighbour is off the map or can not be entered
+                if cost == infinity:
+                    continue
+                node = currentNode + offset
+                new_cost = currentCost + cost
+
+                if visitStamp[node] != search or new_cost < costTillNow[node]:
+                    visitStamp[node] = search
+                    # reopen the node if a cheaper way to it was found
+                    if closedStamp[node] == search:
+                        closedStamp[node] = 0
+                        reopened += 1
+                    costTillNow[node] = new_cost
+                    distanceTillNow[node] = currentDistance + distance
+                    previousNode[node] = currentNode
+                    if heuristic is None:
+                        ndx = abs(x + dx - endX)
+                        ndy = abs(y + dy - endY)
+                        estimate = ((min(ndx, ndy) + abs(ndx - ndy)) / 5) / speedOf[node]
+                    else:
+                        estimate = heuristic(node)
+                    push(queue, (new_cost + estimate, node))
+
+        self.recordCounters(expanded, stale, len(queue), reopened)
+
+        if visitStamp[endNode] != search:
+            raise ValueError("no path from node " + str(startNode) + " to node " + str(endNode))
+
+        self.lastCost = costTillNow[endNode]
+        current = endNode
+        path = []
+        # add all nodes to the path array
+        while current != startNode:
+            path.append(current)
+            current = previousNode[current]
+        return path, distanceTillNow[endNode]
+
+    def setOpenList(self, openList):
+        """
+            This function selects the open list findPath keeps its entries in.
+        :param openList:    'heap' for a binary heap or 'buckets' for a BucketQueue,
+                            which gives paths of the same cost, though not always
+                            the same path when several are equally cheap
+        :return:            None
+        """
+        if openList not in self.openLists:
+            raise ValueError("unknown open list: " + str(openList))
+        self.openList = openList
+
+    def newBucketQueue(self):
+        """
+            This function returns an empty bucket queue whose buckets span the
+            cost of bucketSteps of the cheapest straight steps of the current edge costs.
+        :return:    the bucket queue
+        """
+        return BucketQueue(self.bucketSteps * self.edgeCosts.minCostPerDistance * self.yDistLatitude)
+
+    def findPathAnytime(self, startNode, endNode, epsilon=1.0, timeBudget=None, maxExpansions=None,
+                        heuristic=None, initialWeight=3.0, weightStep=0.5, onImprovement=None):
+        """
+            This function finds a path between 2 nodes whose cost is at most
+            epsilon times the optimal cost, using weighted A* with an admissible
+            heuristic. Without a time budget a single search with weight epsilon
+            is run. With a time budget the search starts with initialWeight and,
+            like ARA*, lowers the weight by weightStep and continues from the
+            previous search while time remains, reusing its costs and only
+            reopening the nodes that became cheaper. The first path is always
+            found, the time budget only stops the improvement.
+        :param startNode:       the starting node
+        :param endNode:         the ending node
+        :param epsilon:         the suboptimality bound to reach, 1 for the optimal path
+        :param timeBudget:      the seconds the search may take, None for a single search
+        :param maxExpansions:   the most nodes the search may expand, None for no limit
+        :param heuristic:       admissible function returning the estimated cost from a node
+                                to the end node, None for lowerBound
+        :param initialWeight:   the weight of the first search with a time budget
+        :param weightStep:      how much the weight is lowered after every search
+        :param onImprovement:   function called with the path, distance and bound of
+                                every better path found, None to only return the last
+        :return:                the nodes of the path from the end node back to
+                                (but excluding) the start node and the distance,
+                                the proven bound is kept in lastBound
+        """
+        search = self.nextSearchNumber()
+        costTillNow = self.costTillNow
+        previousNode = self.previousNode
+        visitStamp = self.visitStamp
+        closedStamp = self.closedStamp
+        steps = list(zip(self.stepOffsets, self.edgeCosts.flatCosts))
+        infinity = float('inf')
+        budget = infinity if maxExpansions is None else maxExpansions
+        deadline = None if timeBudget is None else time.perf_counter() + timeBudget
+        weight = epsilon if timeBudget is None else max(epsilon, initialWeight)
+
+        if heuristic is None:
+            endX = endNode % self.width
+            endY = endNode // self.width
+            costPerDistance = self.edgeCosts.minCostPerDistance
+            heuristic = lambda node: self.lowerBound(node, endX, endY, costPerDistance)
+        # the estimates are needed again whenever the queue is rebuilt
+        estimates = {}
+
+        costTillNow[startNode] = 0.0
+        previousNode[startNode] = -1
+        visitStamp[startNode] = search
+        openNodes = {startNode}
+        inconsistentNodes = set()
+        expanded = 0
+        stale = 0
+        pushed = 0
+        reopened = 0
+        best = None
+        stopped = False
+
+        while not stopped:
+            # nodes closed by an earlier pass may be expanded again
+            iteration = self.nextSearchNumber()
+            openNodes |= inconsistentNodes
+            inconsistentNodes = set()
+            queue = []
+            for node in openNodes:
+                estimate = estimates.get(node)
+                if estimate is None:
+                    estimate = estimates[node] = heuristic(node)
+                queue.append((costTillNow[node] + weight * estimate, node))
+            heapify(queue)
+            pushed += len(queue)
+
+            while queue:
+                key, currentNode = queue[0]
+                # skip entries that were already expanded in this pass
+                if closedStamp[currentNode] == iteration:
+                    heappop(queue)
+                    stale += 1
+                    continue
+                # no node left can lead to a path cheaper than the one found, weighted
+                if visitStamp[endNode] == search and costTillNow[endNode] <= key:
+                    break
+                heappop(queue)
+                closedStamp[currentNode] = iteration
+                openNodes.discard(currentNode)
+                expanded += 1
+                if expanded > budget or (best is not None and expanded & 127 == 0 and
+                                         time.perf_counter() > deadline):
+                    if best is None:
+                        self.recordCounters(expanded, stale, pushed - expanded - stale, reopened)
+                        raise SearchBudgetExceeded("more than " + str(maxExpansions) + " nodes expanded from node " +
+                                                   str(startNode) + " to node " + str(endNode))
+                    stopped = True
+                    break
+
+                currentCost = costTillNow[currentNode]
+                for offset, edgeCost in steps:
+                    cost = edgeCost[currentNode]
+                    # the neighbour is off the map or can not be entered
+                    if cost == infinity:
+                        continue
+                    node = currentNode + offset
+                    new_cost = currentCost + cost
+                    if visitStamp[node] != search or new_cost < costTillNow[node]:
+                        visitStamp[node] = search
+                        costTillNow[node] = new_cost
+                        previousNode[node] = currentNode
+                        if closedStamp[node] == iteration:
+                            # expanded again in the next pass
+                            inconsistentNodes.add(node)
+                            reopened += 1
+                        else:
+                            openNodes.add(node)
+                            estimate = estimates.get(node)
+                            if estimate is None:
+                                estimate = estimates[node] = heuristic(node)
+                            heappush(queue, (new_cost + weight * estimate, node))
+                            pushed += 1
+
+            if visitStamp[endNode] != search:
+                self.recordCounters(expanded, stale, pushed - expanded - stale, reopened)
+                raise ValueError("no path from node " + str(startNode) + " to node " + str(endNode))
+
+            path, cost, distance = self.followPreviousNodes(startNode, endNode)
+            if stopped:
+                # the pass was cut short, so only the improvement over the last bound is proven
+                if cost >= best[2]:
+                    break
+                bound = max(1.0, self.lastBound * cost / best[2])
+            else:
+                # the cost of the optimal path is at least the lowest estimate left
+                lowest = min([costTillNow[node] + estimates[node] for node in openNodes | inconsistentNodes] +
+                             [cost])
+                bound = max(1.0, min(weight, cost / lowest if lowest > 0 else 1.0))
+
+            best = (path, distance, cost)
+            self.lastCost = cost
+            self.lastBound = bound
+            if onImprovement is not None:
+                onImprovement(path, distance, bound)
+            if bound <= epsilon or deadline is None or time.perf_counter() > deadline:
+                break
+            weight = max(epsilon, weight - weightStep)
+
+        # the entries left in the queues of the passes were never popped
+        self.recordCounters(expanded, stale, pushed - expanded - stale, reopened)
+        return best[0], best[1]
+
+    def followPreviousNodes(self, startNode, endNode):
+        """
+            This function follows the previous nodes of the last search from a node
+            back to the start node, adding up the costs and distances of the steps.
+        :param startNode:   the node the last search started from
+        :param endNode:     the node to find the path to
+        :return:            the nodes of the path from the end node back to
+                            (but excluding) the start node, its cost and its distance
+        """
+        codeOf = {offset: code for code, offset in enumerate(self.stepOffsets)}
+        flatCosts = self.edgeCosts.flatCosts
+        current = endNode
+        path = []
+        cost = 0.0
+        distance = 0.0
+        while current != startNode:
+            path.append(current)
+            previous = self.previousNode[current]
+            code = codeOf[current - previous]
+            cost += flatCosts[code][previous]
+            distance += self.stepDistances[code]
+            current = previous
+        return path, cost, distance
+
+    def recordCounters(self, expanded, stale, queued, reopened):
+        """
+            This function keeps the counters of the search that just ended.
+            Every entry pushed was either expanded, skipped as stale or is still queued.
+        :param expanded:    the number of nodes expanded
+        :param stale:       the number of entries popped for nodes already expanded
+        :param queued:      the number of entries left in the queue
+        :param reopened:    the number of expanded nodes reached again with a lower cost
+        :return:            None
+        """
+        self.nodesExpanded = expanded
+        self.stalePops = stale
+        self.nodesPushed = expanded + stale + queued
+        self.reopenedNodes = reopened
+
+    def dijkstraCosts(self, sourceNode, reverse=False):
+        """
+            This function finds the cost of the cheapest path from a node to every
+            other node, or from every other node to it, with Dijkstra's algorithm.
+        :param sourceNode:  the node to start from
+        :param reverse:     True for the costs of reaching the node instead
+        :return:            list of the cost of every node, infinite when there is no path
+        """
+        size = self.size
+        infinity = float('inf')
+        steps = list(zip(self.stepOffsets, self.edgeCosts.flatCosts))
+        costs = [infinity] * size
+        closed = bytearray(size)
+
+        costs[sourceNode] = 0.0
+        queue = [(0.0, sourceNode)]
+        while queue:
+            currentCost, currentNode = heappop(queue)
+            if closed[currentNode]:
+                continue
+            closed[currentNode] = 1
+
+            for offset, edgeCost in steps:
+                if reverse:
+                    # the edge into the current node from the node before it
+                    node = currentNode - offset
+                    if node < 0 or node >= size:
+                        continue
+                    new_cost = currentCost + edgeCost[node]
+                else:
+                    node = currentNode + offset
+                    new_cost = currentCost + edgeCost[currentNode]
+                if new_cost == infinity:
+                    continue
+                if new_cost < costs[node]:
+                    costs[node] = new_cost
+                    heappush(queue, (new_cost, node))
+        return costs
+
+    def findCostsToTargets(self, sourceNode, targetNodes):
+        """
+            This function runs Dijkstra's algorithm from a node until every
+            target node is settled, reusing the arrays of findPath. The paths
+            can be read with lastSearchPath until the next search.
+        :param sourceNode:  the node to start from
+        :param targetNodes: the nodes to find the costs of
+        :return:            lists of the cost and the distance of the cheapest
+                            path to every target node, infinite when there is none
+        """
+        search = self.nextSearchNumber()
+        costTillNow = self.costTillNow
+        distanceTillNow = self.distanceTillNow
+        previousNode = self.previousNode
+        visitStamp = self.visitStamp
+        closedStamp = self.closedStamp
+        steps = list(zip(self.stepOffsets, self.stepDistances, self.edgeCosts.flatCosts))
+        infinity = float('inf')
+
+        costTillNow[sourceNode] = 0.0
+        distanceTillNow[sourceNode] = 0.0
+        previousNode[sourceNode] = -1
+        visitStamp[sourceNode] = search
+
+        remaining = set(targetNodes)
+        queue = [(0.0, sourceNode)]
+        expanded = 0
+        while queue and remaining:
+            currentCost, currentNode = heappop(queue)
+            if closedStamp[currentNode] == search:
+                continue
+            closedStamp[currentNode] = search
+            expanded += 1
+            remaining.discard(currentNode)
+
+            currentDistance = distanceTillNow[currentNode]
+            for offset, distance, edgeCost in steps:
+                cost = edgeCost[currentNode]
+                # the neighbour is off the map or can not be entered
+                if cost == infinity:
+                    continue
+                node = currentNode + offset
+                new_cost = currentCost + cost
+                if visitStamp[node] != search or new_cost < costTillNow[node]:
+                    visitStamp[node] = search
+                    costTillNow[node] = new_cost
+                    distanceTillNow[node] = currentDistance + distance
+                    previousNode[node] = currentNode
+                    heappush(queue, (new_cost, node))
+
+        self.nodesExpanded = expanded
+        costs = []
+        distances = []
+        for node in targetNodes:
+            if closedStamp[node] == search:
+                costs.append(costTillNow[node])
+                distances.append(distanceTillNow[node])
+            else:
+                costs.append(infinity)
+                distances.append(infinity)
+        return costs, distances
+
+    def lastSearchPath(self, startNode, endNode):
+        """
+            This function returns the path to a node settled by the last search.
+        :param startNode:   the node the last search started from
+        :param endNode:     the node to find the path to
+        :return:            the nodes of the path from the end node back to
+                            (but excluding) the start node
+        """
+        current = endNode
+        path = []
+        while current != startNode:
+            path.append(current)
+            current = self.previousNode[current]
+        return path
+
+    def encodePath(self, startNode, path):
+        """
+            This function encodes a path as the index in stepDirections
+            of every step, from the start node to the end node.
+        :param startNode:   the node the path starts from
+        :param path:        the nodes of the path from the end node back to
+                            (but excluding) the start node
+        :return:            the direction codes, one byte per step
+        """
+        codeOf = {offset: code for code, offset in enumerate(self.stepOffsets)}
+        codes = bytearray(len(path))
+        previous = startNode
+        for i in range(0, len(path)):
+            node = path[len(path) - 1 - i]
+            codes[i] = codeOf[node - previous]
+            previous = node
+        return bytes(codes)
+
+    def decodePath(self, startNode, codes):
+        """
+            This function decodes a path encoded by encodePath.
+        :param startNode:   the node the path starts from
+        :param codes:       the direction codes of the steps
+        :return:            the nodes of the path from the end node back to
+                            (but excluding) the start node
+        """
+        stepOffsets = self.stepOffsets
+        path = []
+        node = startNode
+        for code in codes:
+            node += stepOffsets[code]
+            path.append(node)
+        path.reverse()
+        return path
+
+    def lowerBound(self, node, targetX, targetY, costPerDistance):
+        """
+            This function returns a lower bound of the cost from a node to a target.
+            It is the shortest distance over the grid steps times the lowest cost
+            per unit of distance of any edge, so it is admissible and consistent.
+        :param node:            the node to start from
+        :param targetX:         the x coordinate of the target
+        :param targetY:         the y coordinate of the target
+        :param costPerDistance: the lowest cost per unit of distance of any edge
+        :return:                the lower bound of the cost
+        """
+        dx = abs(node % self.width - targetX)
+        dy = abs(node // self.width - targetY)
+        diagonal = min(dx, dy)
+        return costPerDistance * (diagonal * self.diagonalDist + (dx - diagonal) * self.xDistLongitude +
+                                  (dy - diagonal) * self.yDistLatitude)
+
+    def findPathBidirectional(self, startNode, endNode, maxExpansions=None):
+        """
+            This function finds the path between 2 nodes with bidirectional A*.
+            The forward search relaxes the edges out of a node and the backward
+            search the edges into it. Both use the consistent lowerBound heuristic,
+            so once the smallest estimate of either open list is not below the
+            best path found through a node both searches reached, no better path
+            can exist and the path found is optimal.
+        :param startNode:       the starting node
+        :param endNode:         the ending node
+        :param maxExpansions:   the most nodes both searches together may expand,
+                                None for no limit
+        :return:                the nodes of the path from the end node back to
+                                (but excluding) the start node and the distance
+        """
+        if self.costFromEnd is None:
+            self.costFromEnd = [0.0] * self.size
+            self.distanceFromEnd = [0.0] * self.size
+            self.nextNode = [-1] * self.size
+            self.backwardStamp = [0] * self.size
+            self.backwardClosedStamp = [0] * self.size
+
+        search = self.nextSearchNumber()
+        width = self.width
+        size = self.size
+        infinity = float('inf')
+        budget = infinity if maxExpansions is None else maxExpansions
+        costPerDistance = self.edgeCosts.minCostPerDistance
+        steps = list(zip(self.stepOffsets, self.stepDistances, self.edgeCosts.flatCosts))
+        lowerBound = self.lowerBound
+
+        # the forward search from the start node and the backward search from the end node
+        forward = (self.costTillNow, self.distanceTillNow, self.previousNode, self.visitStamp, self.closedStamp,
+                   endNode % width, endNode // width, 1)
+        backward = (self.costFromEnd, self.distanceFromEnd, self.nextNode, self.backwardStamp,
+                    self.backwardClosedStamp, startNode % width, startNode // width, -1)
+
+        for node, (cost, distance, parent, stamp, closed, targetX, targetY, direction) in \
+                ((startNode, forward), (endNode, backward)):
+            cost[node] = 0.0
+            distance[node] = 0.0
+            parent[node] = -1
+            stamp[node] = search
+        queues = {1: [(lowerBound(startNode, endNode % width, endNode // width, costPerDistance), startNode)],
+                  -1: [(lowerBound(endNode, startNode % width, startNode // width, costPerDistance), endNode)]}
+
+        bestCost = 0.0 if startNode == endNode else infinity
+        meetingNode = startNode if startNode == endNode else -1
+        expanded = 0
+        stale = 0
+
+        while queues[1] and queues[-1]:
+            # stop when no open node of either search can lead to a better path
+            if queues[1][0][0] >= bestCost or queues[-1][0][0] >= bestCost:
+                break
+
+            # expand the search with the smaller open list
+            side, other = (forward, backward) if len(queues[1]) <= len(queues[-1]) else (backward, forward)
+            cost, distance, parent, stamp, closed, targetX, targetY, direction = side
+            otherCost, otherDistance, otherParent, otherStamp = other[0:4]
+            queue = queues[direction]
+
+            value, currentNode = heappop(queue)
+            if closed[currentNode] == search:
+                stale += 1
+                continue
+            closed[currentNode] = search
+            expanded += 1
+            if expanded > budget:
+                self.recordCounters(expanded, stale, len(queues[1]) + len(queues[-1]), 0)
+                raise SearchBudgetExceeded("more than " + str(maxExpansions) + " nodes expanded from node " +
+                                           str(startNode) + " to node " + str(endNode))
+
+            currentCost = cost[currentNode]
+            currentDistance = distance[currentNode]
+
+            for offset, stepDistance, edgeCost in steps:
+                if direction == 1:
+                    node = currentNode + offset
+                    new_cost = currentCost + edgeCost[currentNode]
+                else:
+                    # the edge into the current node from the node before it
+                    node = currentNode - offset
+                    if node < 0 or node >= size:
+                        continue
+                    new_cost = currentCost + edgeCost[node]
+                if new_cost == infinity:
+                    continue
+
+                if stamp[node] != search or new_cost < cost[node]:
+                    stamp[node] = search
+                    cost[node] = new_cost
+                    distance[node] = currentDistance + stepDistance
+                    parent[node] = currentNode
+                    heappush(queue, (new_cost + lowerBound(node, targetX, targetY, costPerDistance), node))
+
+                    # a path through a node reached by both searches
+                    if otherStamp[node] == search and new_cost + otherCost[node] < bestCost:
+                        bestCost = new_cost + otherCost[node]
+                        meetingNode = node
+
+        self.recordCounters(expanded, stale, len(queues[1]) + len(queues[-1]), 0)
+
+        if meetingNode == -1:
+            raise ValueError("no path from node " + str(startNode) + " to node " + str(endNode))
+
+        self.lastCost = bestCost
+        # the nodes from the meeting node to the end node, then back to the start node
+        toEnd = []
+        current = meetingNode
+        while current != endNode:
+            current = self.nextNode[current]
+            toEnd.append(current)
+        path = toEnd[::-1]
+        current = meetingNode
+        while current != startNode:
+            path.append(current)
+            current = self.previousNode[current]
+        return path, self.distanceTillNow[meetingNode] + self.distanceFromEnd[meetingNode]
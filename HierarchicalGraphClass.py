@@ -0,0 +1,384 @@
+"""
+    This file implements hierarchical path finding (HPA*) over
+    square clusters of the terrain grid.
+"""
+import os
+from heapq import heappush, heappop
+import numpy as np
+from GridSearchEngineClass import GridSearchEngine, SearchBudgetExceeded
+
+
+class HierarchicalGraph():
+
+    """
+        This class splits the grid into square clusters and builds an abstract
+        graph of the entrances between neighbouring clusters. Entrance nodes are
+        joined by the edge that crosses the border and, inside every cluster, by
+        the cost of the cheapest path between them that stays in the cluster.
+
+        A search first runs A* on the abstract graph and then refines every
+        abstract edge with a search inside its cluster, so only the clusters
+        on the route are searched pixel by pixel. Paths can only cross the
+        borders at entrances, so they may be longer than optimal and there is
+        no proven bound. On the park map with 40 pixel clusters, the routes of
+        the 12 season and course runs are 0.4 % to 6.2 % longer than the
+        optimal ones (spring white.txt is the worst) and single legs cost up
+        to 21 % more; Benchmark_Suite checks the routes stay within 6.5 %.
+
+        Building the graph of a season takes about 10 s on the park map, so
+        the path finder saves it next to the terrain bundle and loads it.
+
+        A search leaves its counters and the pixels it reached in the grid
+        search engine, as the searches of the engine itself do.
+    """
+    __slots__ = 'searchEngine', 'clusterSize', 'clusterColumns', 'clusterRows', 'entrances', 'edges', \
+                'rasterDigest', 'nodesExpanded', 'stalePops', 'queuedEntries', 'lastCost'
+
+    # a border opening is split into pieces this wide, each with an entrance at its cheapest crossing
+    entranceSpacing = 8
+
+    def __init__(self, searchEngine, clusterSize=40, entrances=None, edges=None):
+        """
+            This is the constructor for the class, it builds the abstract graph
+            for the edge costs of the search engine unless it is given.
+        :param searchEngine:    the grid search engine with the edge costs of the season
+        :param clusterSize:     the width and height of the clusters in pixels
+        :param entrances:       dictionary of the entrance nodes of every cluster, None to find them
+        :param edges:           dictionary of the abstract edges (node, cost) out of every
+                                entrance node, None to compute them
+        """
+        self.searchEngine = searchEngine
+        self.clusterSize = clusterSize
+        self.clusterColumns = (searchEngine.width + clusterSize - 1) // clusterSize
+        self.clusterRows = (searchEngine.height + clusterSize - 1) // clusterSize
+        self.rasterDigest = searchEngine.edgeCosts.digest()
+        self.nodesExpanded = 0
+        self.stalePops = 0
+        self.queuedEntries = 0
+        self.lastCost = 0.0
+        if entrances is None:
+            self.entrances = {}
+            self.edges = {}
+            self.findEntrances()
+            self.connectEntrances()
+        else:
+            self.entrances = entrances
+            self.edges = edges
+
+    # *************************************** Clusters ***************************
+
+    def clusterOf(self, node):
+        """
+            This function returns the cluster a node lies in.
+        :param node:    the node to find the cluster of
+        :return:        the id of the cluster
+        """
+        width = self.searchEngine.width
+        return (node // width // self.clusterSize) * self.clusterColumns + (node % width) // self.clusterSize
+
+    def clusterBounds(self, cluster):
+        """
+            This function returns the pixels covered by a cluster.
+        :param cluster: the id of the cluster
+        :return:        the first x, first y, last x + 1 and last y + 1 of the cluster
+        """
+        firstX = (cluster % self.clusterColumns) * self.clusterSize
+        firstY = (cluster // self.clusterColumns) * self.clusterSize
+        return firstX, firstY, min(firstX + self.clusterSize, self.searchEngine.width), \
+            min(firstY + self.clusterSize, self.searchEngine.height)
+
+    def searchCluster(self, sourceNode, reverse=False, targetNode=None):
+        """
+            This function runs Dijkstra's algorithm from a node without
+            leaving the cluster the node lies in.
+        :param sourceNode:  the node to start from
+        :param reverse:     True to follow the edges into the nodes instead,
+                            giving the costs of reaching the source node
+        :param targetNode:  the node to stop at, None to search the whole cluster
+        :return:            dictionaries of the cost, distance and parent of every node reached
+        """
+        engine = self.searchEngine
+        width = engine.width
+        firstX, firstY, lastX, lastY = self.clusterBounds(self.clusterOf(sourceNode))
+        steps = list(zip(engine.stepDirections, engine.stepOffsets, engine.stepDistances,
+                         engine.edgeCosts.flatCosts))
+        infinity = float('inf')
+        sign = -1 if reverse else 1
+
+        costs = {sourceNode: 0.0}
+        distances = {sourceNode: 0.0}
+        parents = {sourceNode: -1}
+        closed = set()
+        queue = [(0.0, sourceNode)]
+        while queue:
+            currentCost, currentNode = heappop(queue)
+            if currentNode in closed:
+                self.stalePops += 1
+                continue
+            closed.add(currentNode)
+            if currentNode == targetNode:
+                break
+            x = currentNode % width
+            y = currentNode // width
+
+            for (dx, dy), offset, distance, edgeCost in steps:
+                # keep the search inside the cluster
+                if not (firstX <= x + sign * dx < lastX and firstY <= y + sign * dy < lastY):
+                    continue
+                node = currentNode + sign * offset
+                cost = edgeCost[node] if reverse else edgeCost[currentNode]
+                if cost == infinity:
+                    continue
+                new_cost = currentCost + cost
+                if new_cost < costs.get(node, infinity):
+                    costs[node] = new_cost
+                    distances[node] = distances[currentNode] + distance
+                    parents[node] = currentNode
+                    heappush(queue, (new_cost, node))
+
+        self.nodesExpanded += len(closed)
+        self.queuedEntries += len(queue)
+        return costs, distances, parents
+
+    # *************************************** Building the abstract graph ***************************
+
+    def addEntrance(self, node):
+        """
+            This function adds a node to the entrances of its cluster.
+        :param node:    the entrance node
+        :return:        None
+        """
+        entrances = self.entrances.setdefault(self.clusterOf(node), [])
+        if node not in entrances:
+            entrances.append(node)
+            self.edges.setdefault(node, [])
+
+    def findEntrances(self):
+        """
+            This function finds the openings in the borders between neighbouring
+            clusters and adds the edges crossing them at the entrances.
+        :return:    None
+        """
+        engine = self.searchEngine
+        costs = engine.edgeCosts.costs
+        width = engine.width
+        size = self.clusterSize
+        directions = GridSearchEngine.stepDirections
+
+        # the borders between clusters side by side, then between clusters above each other
+        borders = []
+        for x in range(size, engine.width, size):
+            for firstY in range(0, engine.height, size):
+                borders.append((x - 1, x, firstY, min(firstY + size, engine.height), True))
+        for y in range(size, engine.height, size):
+            for firstX in range(0, engine.width, size):
+                borders.append((y - 1, y, firstX, min(firstX + size, engine.width), False))
+
+        for before, after, first, last, vertical in borders:
+            if vertical:
+                forward = costs[directions.index((1, 0)), first:last, before]
+                backward = costs[directions.index((-1, 0)), first:last, after]
+            else:
+                forward = costs[directions.index((0, 1)), before, first:last]
+                backward = costs[directions.index((0, -1)), after, first:last]
+            crossable = np.isfinite(forward) & np.isfinite(backward)
+
+            position = 0
+            while position < len(crossable):
+                if not crossable[position]:
+                    position += 1
+                    continue
+                runStart = position
+                while position < len(crossable) and crossable[position]:
+                    position += 1
+                # the cheapest crossing of every piece of the opening, which finds the roads and paths
+                crossings = []
+                for pieceStart in range(runStart, position, self.entranceSpacing):
+                    pieceEnd = min(pieceStart + self.entranceSpacing, position)
+                    crossings.append(pieceStart + int(np.argmin(forward[pieceStart:pieceEnd] +
+                                                                backward[pieceStart:pieceEnd])))
+
+                for crossing in crossings:
+                    if vertical:
+                        nodeBefore = (first + crossing) * width + before
+                        nodeAfter = (first + crossing) * width + after
+                    else:
+                        nodeBefore = before * width + first + crossing
+                        nodeAfter = after * width + first + crossing
+                    self.addEntrance(nodeBefore)
+                    self.addEntrance(nodeAfter)
+                    self.edges[nodeBefore].append((nodeAfter, float(forward[crossing])))
+                    self.edges[nodeAfter].append((nodeBefore, float(backward[crossing])))
+
+    def connectEntrances(self):
+        """
+            This function adds the edges between the entrances of every cluster.
+        :return:    None
+        """
+        for cluster, entrances in self.entrances.items():
+            for entrance in entrances:
+                costs = self.searchCluster(entrance)[0]
+                for other in entrances:
+                    if other != entrance and other in costs:
+                        self.edges[entrance].append((other, costs[other]))
+
+    # *************************************** Saving and loading ***************************
+
+    @classmethod
+    def load(cls, filePath, searchEngine, clusterSize=40):
+        """
+            This function loads the abstract graph saved for the edge costs of a search engine.
+        :param filePath:        the file the graph was saved to
+        :param searchEngine:    the grid search engine with the edge costs of the season
+        :param clusterSize:     the width and height of the clusters in pixels
+        :return:                the graph, or None if the file is missing or was
+                                saved for other edge costs or clusters
+        """
+        if not os.path.exists(filePath):
+            return None
+        with np.load(filePath) as data:
+            if str(data['rasterDigest']) != searchEngine.edgeCosts.digest() or \
+                    int(data['clusterSize']) != clusterSize:
+                return None
+            entrances = {}
+            for cluster, node in zip(data['entranceClusters'].tolist(), data['entranceNodes'].tolist()):
+                entrances.setdefault(cluster, []).append(node)
+            edges = {node: [] for nodes in entrances.values() for node in nodes}
+            for node, other, cost in zip(data['edgeFrom'].tolist(), data['edgeTo'].tolist(),
+                                         data['edgeCost'].tolist()):
+                edges[node].append((other, cost))
+        return cls(searchEngine, clusterSize, entrances, edges)
+
+    def save(self, filePath):
+        """
+            This function saves the abstract graph.
+        :param filePath:    the file to save the graph to
+        :return:            None
+        """
+        entrances = [(cluster, node) for cluster, nodes in self.entrances.items() for node in nodes]
+        edges = [(node, other, cost) for node, neighbours in self.edges.items() for other, cost in neighbours]
+        temporaryFilePath = filePath + "." + str(os.getpid()) + ".tmp.npz"
+        np.savez(temporaryFilePath, rasterDigest=np.array(self.rasterDigest), clusterSize=np.array(self.clusterSize),
+                 entranceClusters=np.array([cluster for cluster, node in entrances], dtype=np.int64),
+                 entranceNodes=np.array([node for cluster, node in entrances], dtype=np.int64),
+                 edgeFrom=np.array([edge[0] for edge in edges], dtype=np.int64),
+                 edgeTo=np.array([edge[1] for edge in edges], dtype=np.int64),
+                 edgeCost=np.array([edge[2] for edge in edges], dtype=np.float64))
+        os.replace(temporaryFilePath, filePath)
+
+    # *************************************** Searching ***************************
+
+    def findPath(self, startNode, endNode, maxExpansions=None):
+        """
+            This function finds a path between 2 nodes, first over the
+            abstract graph and then pixel by pixel inside its clusters.
+        :param startNode:       the starting node
+        :param endNode:         the ending node
+        :param maxExpansions:   the most abstract nodes the search may expand, None for no limit
+        :return:                the nodes of the path from the end node back to
+                                (but excluding) the start node and the distance
+        """
+        engine = self.searchEngine
+        width = engine.width
+        infinity = float('inf')
+        budget = infinity if maxExpansions is None else maxExpansions
+        costPerDistance = engine.edgeCosts.minCostPerDistance
+        endX = endNode % width
+        endY = endNode // width
+        self.nodesExpanded = 0
+        self.stalePops = 0
+        self.queuedEntries = 0
+        # the pixels reached are stamped with a search number of the engine
+        search = engine.nextSearchNumber()
+        visitStamp = engine.visitStamp
+
+        # connect the start and end nodes to the entrances of their clusters
+        startCluster = self.clusterOf(startNode)
+        endCluster = self.clusterOf(endNode)
+        fromStart = self.searchCluster(startNode)[0]
+        startEdges = [(node, fromStart[node]) for node in self.entrances.get(startCluster, []) if node in fromStart]
+        if startCluster == endCluster and endNode in fromStart:
+            startEdges.append((endNode, fromStart[endNode]))
+        toEnd = self.searchCluster(endNode, reverse=True)[0]
+        endEdges = {node: toEnd[node] for node in self.entrances.get(endCluster, []) if node in toEnd}
+
+        # A* over the abstract graph
+        costTillNow = {startNode: 0.0}
+        previousNode = {startNode: -1}
+        closed = set()
+        queue = [(0.0, startNode)]
+        expanded = 0
+        while queue:
+            value, currentNode = heappop(queue)
+            if currentNode in closed:
+                self.stalePops += 1
+                continue
+            closed.add(currentNode)
+            expanded += 1
+            if expanded > budget:
+                self.nodesExpanded += expanded
+                self.recordCounters(len(queue))
+                raise SearchBudgetExceeded("more than " + str(maxExpansions) + " abstract nodes expanded from node " +
+                                           str(startNode) + " to node " + str(endNode))
+            if currentNode == endNode:
+                break
+
+            neighbours = list(self.edges.get(currentNode, []))
+            if currentNode == startNode:
+                neighbours += startEdges
+            if currentNode in endEdges:
+                neighbours.append((endNode, endEdges[currentNode]))
+            currentCost = costTillNow[currentNode]
+            for node, cost in neighbours:
+                new_cost = currentCost + cost
+                if new_cost < costTillNow.get(node, infinity):
+                    costTillNow[node] = new_cost
+                    previousNode[node] = currentNode
+                    heappush(queue, (new_cost + engine.lowerBound(node, endX, endY, costPerDistance), node))
+        self.nodesExpanded += expanded
+        for node in fromStart.keys() | toEnd.keys() | costTillNow.keys():
+            visitStamp[node] = search
+
+        if endNode not in closed:
+            self.recordCounters(len(queue))
+            raise ValueError("no path from node " + str(startNode) + " to node " + str(endNode))
+        self.lastCost = costTillNow[endNode]
+
+        # the abstract nodes from the end node back to the start node
+        abstractPath = [endNode]
+        while abstractPath[-1] != startNode:
+            abstractPath.append(previousNode[abstractPath[-1]])
+
+        # refine every abstract edge, walking back from the end node
+        path = []
+        distance = 0.0
+        for index in range(0, len(abstractPath) - 1):
+            toNode = abstractPath[index]
+            fromNode = abstractPath[index + 1]
+            if self.clusterOf(fromNode) != self.clusterOf(toNode):
+                # the edge crossing a border between clusters
+                path.append(toNode)
+                distance += GridSearchEngine.stepDistance(toNode % width - fromNode % width,
+                                                          toNode // width - fromNode // width)
+                continue
+            costs, distances, parents = self.searchCluster(fromNode, targetNode=toNode)
+            for node in costs:
+                visitStamp[node] = search
+            distance += distances[toNode]
+            current = toNode
+            while current != fromNode:
+                path.append(current)
+                current = parents[current]
+        self.recordCounters(len(queue))
+        engine.lastCost = self.lastCost
+        return path, distance
+
+    def recordCounters(self, queued):
+        """
+            This function keeps the counters of the search that just ended, the
+            abstract search and the searches inside the clusters together, in the
+            grid search engine.
+        :param queued:  the number of entries left in the queue of the abstract search
+        :return:        None
+        """
+        self.searchEngine.recordCounters(self.nodesExpanded, self.stalePops, self.queuedEntries + queued, 0)
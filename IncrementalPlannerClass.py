@@ -0,0 +1,241 @@
+"""
+    This file implements incremental replanning of a leg
+    with D* Lite when the terrain changes.
+"""
+from heapq import heappush, heappop, heapify
+from GridSearchEngineClass import SearchBudgetExceeded
+
+
+class IncrementalPlanner():
+
+    """
+        This class keeps the search state of one leg with D* Lite. The search
+        runs backwards from the end node, g holds the cost from a node to the
+        end node and rhs the one step lookahead of it. When edge costs change,
+        only the nodes whose costs are affected are updated and the search is
+        continued from there instead of starting over.
+
+        The planner works on the edge cost raster of the search engine, which
+        has to be updated in place (EdgeCostRaster.updatePixels) before the
+        changed edges are passed to updateEdges.
+    """
+    __slots__ = 'searchEngine', 'startNode', 'endNode', 'g', 'rhs', 'queue', 'queued', 'km', \
+                'costPerDistance', 'nodesExpanded', 'lastCost'
+
+    def __init__(self, searchEngine, startNode, endNode):
+        """
+            This is the constructor for the class.
+        :param searchEngine:    the grid search engine with the edge costs to plan on
+        :param startNode:       the starting node of the leg
+        :param endNode:         the ending node of the leg
+        """
+        self.searchEngine = searchEngine
+        self.startNode = startNode
+        self.endNode = endNode
+        self.g = {}
+        self.rhs = {endNode: 0.0}
+        self.km = 0.0
+        self.costPerDistance = searchEngine.edgeCosts.minCostPerDistance
+        self.queue = []
+        self.queued = {}
+        self.nodesExpanded = 0
+        self.lastCost = 0.0
+        self.push(endNode)
+
+    def heuristic(self, node):
+        """
+            This function returns the lower bound of the cost between the start node and a node.
+        :param node:    the node
+        :return:        the lower bound of the cost
+        """
+        width = self.searchEngine.width
+        return self.searchEngine.lowerBound(node, self.startNode % width, self.startNode // width,
+                                            self.costPerDistance)
+
+    def calculateKey(self, node):
+        """
+            This function returns the priority of a node in the queue.
+        :param node:    the node
+        :return:        the key of the node
+        """
+        best = min(self.g.get(node, float('inf')), self.rhs.get(node, float('inf')))
+        return best + self.heuristic(node) + self.km, best
+
+    def push(self, node):
+        """
+            This function puts a node in the queue with its current key.
+        :param node:    the node
+        :return:        None
+        """
+        key = self.calculateKey(node)
+        self.queued[node] = key
+        heappush(self.queue, (key, node))
+
+    def updateNode(self, node):
+        """
+            This function puts a node in the queue if it is inconsistent
+            and takes it out otherwise.
+        :param node:    the node
+        :return:        None
+        """
+        infinity = float('inf')
+        if self.g.get(node, infinity) != self.rhs.get(node, infinity):
+            self.push(node)
+        else:
+            self.queued.pop(node, None)
+
+    def lookahead(self, node):
+        """
+            This function returns the lowest cost of reaching the end node
+            over one of the edges out of a node.
+        :param node:    the node
+        :return:        the lowest cost
+        """
+        engine = self.searchEngine
+        g = self.g
+        infinity = float('inf')
+        best = infinity
+        for offset, edgeCost in zip(engine.stepOffsets, engine.edgeCosts.flatCosts):
+            cost = edgeCost[node]
+            if cost != infinity:
+                cost += g.get(node + offset, infinity)
+                if cost < best:
+                    best = cost
+        return best
+
+    def predecessors(self, node):
+        """
+            This function returns the nodes with an edge into a node.
+        :param node:    the node
+        :return:        list of the nodes before it and the costs of their edges
+        """
+        engine = self.searchEngine
+        infinity = float('inf')
+        nodes = []
+        for offset, edgeCost in zip(engine.stepOffsets, engine.edgeCosts.flatCosts):
+            previous = node - offset
+            if 0 <= previous < engine.size:
+                cost = edgeCost[previous]
+                if cost != infinity:
+                    nodes.append((previous, cost))
+        return nodes
+
+    def computePath(self, maxExpansions=None):
+        """
+            This function continues the search until the cost of the start
+            node is known, then follows the cheapest edges to the end node.
+        :param maxExpansions:   the most nodes the search may expand, None for no limit
+        :return:                the nodes of the path from the end node back to
+                                (but excluding) the start node and the distance
+        """
+        g = self.g
+        rhs = self.rhs
+        queue = self.queue
+        queued = self.queued
+        infinity = float('inf')
+        budget = infinity if maxExpansions is None else maxExpansions
+        startNode = self.startNode
+        expanded = 0
+
+        while queue:
+            key, node = queue[0]
+            if queued.get(node) != key:
+                # the entry is out of date
+                heappop(queue)
+                continue
+            if key >= self.calculateKey(startNode) and rhs.get(startNode, infinity) == g.get(startNode, infinity):
+                break
+            heappop(queue)
+            expanded += 1
+            if expanded > budget:
+                self.nodesExpanded = expanded
+                raise SearchBudgetExceeded("more than " + str(maxExpansions) + " nodes expanded from node " +
+                                           str(startNode) + " to node " + str(self.endNode))
+
+            newKey = self.calculateKey(node)
+            if key < newKey:
+                self.push(node)
+            elif g.get(node, infinity) > rhs.get(node, infinity):
+                # the node got cheaper, which can only lower the nodes before it
+                del queued[node]
+                g[node] = rhs[node]
+                for previous, cost in self.predecessors(node):
+                    if previous != self.endNode and cost + g[node] < rhs.get(previous, infinity):
+                        rhs[previous] = cost + g[node]
+                        self.updateNode(previous)
+            else:
+                # the node got dearer, so recompute the nodes that went through it
+                oldCost = g.get(node, infinity)
+                g[node] = infinity
+                for previous, cost in self.predecessors(node) + [(node, None)]:
+                    if previous != self.endNode and (cost is None or rhs.get(previous, infinity) == cost + oldCost):
+                        rhs[previous] = self.lookahead(previous)
+                    self.updateNode(previous)
+
+        self.nodesExpanded = expanded
+        if rhs.get(startNode, infinity) == infinity:
+            raise ValueError("no path from node " + str(startNode) + " to node " + str(self.endNode))
+        self.lastCost = rhs[startNode]
+        return self.followPath()
+
+    def followPath(self):
+        """
+            This function follows the cheapest edges from the start node to the end node.
+        :return:    the nodes of the path from the end node back to
+                    (but excluding) the start node and the distance
+        """
+        engine = self.searchEngine
+        g = self.g
+        infinity = float('inf')
+        steps = list(zip(engine.stepOffsets, engine.stepDistances, engine.edgeCosts.flatCosts))
+        path = []
+        distance = 0.0
+        node = self.startNode
+        while node != self.endNode:
+            best = infinity
+            bestStep = None
+            for offset, stepDistance, edgeCost in steps:
+                cost = edgeCost[node]
+                if cost != infinity:
+                    cost += 0.0 if node + offset == self.endNode else g.get(node + offset, infinity)
+                    if cost < best:
+                        best = cost
+                        bestStep = (node + offset, stepDistance)
+            if bestStep is None:
+                raise ValueError("no path from node " + str(self.startNode) + " to node " + str(self.endNode))
+            node, stepDistance = bestStep
+            path.append(node)
+            distance += stepDistance
+        path.reverse()
+        return path, distance
+
+    def updateEdges(self, changedEdges):
+        """
+            This function takes in edges whose costs changed, as returned by
+            EdgeCostRaster.updatePixels, and updates the nodes they start from.
+        :param changedEdges:    list of the node, direction and old cost of every changed edge
+        :return:                None
+        """
+        engine = self.searchEngine
+        g = self.g
+        rhs = self.rhs
+        infinity = float('inf')
+
+        # keep the heuristic admissible if an edge became cheaper than any before
+        if engine.edgeCosts.minCostPerDistance < self.costPerDistance:
+            self.costPerDistance = engine.edgeCosts.minCostPerDistance
+            self.queue = [(self.calculateKey(node), node) for node in self.queued]
+            self.queued = {node: key for key, node in self.queue}
+            heapify(self.queue)
+
+        for node, direction, oldCost in changedEdges:
+            if node == self.endNode:
+                continue
+            target = node + engine.stepOffsets[direction]
+            newCost = engine.edgeCosts.flatCosts[direction][node]
+            if newCost < oldCost:
+                if newCost + g.get(target, infinity) < rhs.get(node, infinity):
+                    rhs[node] = newCost + g.get(target, infinity)
+            elif rhs.get(node, infinity) == oldCost + g.get(target, infinity):
+                rhs[node] = self.lookahead(node)
+            self.updateNode(node)
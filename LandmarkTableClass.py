@@ -0,0 +1,145 @@
+"""
+    This file implements the landmark tables used by the ALT
+    (A*, Landmarks and Triangle inequality) heuristic.
+"""
+import os
+import numpy as np
+
+
+class LandmarkTable():
+
+    """
+        This class stores, for a few landmark nodes, the cost of the cheapest
+        path from every landmark to every node and from every node to every
+        landmark. By the triangle inequality, for a landmark L the cost from
+        a node v to a target t is at least d(L, t) - d(L, v) and at least
+        d(v, L) - d(t, L), which gives an admissible heuristic.
+    """
+    __slots__ = 'landmarks', 'fromLandmark', 'toLandmark', 'errorMargin', 'rasterDigest', 'fromViews', 'toViews'
+
+    def __init__(self, landmarks, fromLandmark, toLandmark, rasterDigest):
+        """
+            This is the constructor for the class.
+        :param landmarks:       the nodes used as landmarks
+        :param fromLandmark:    (landmarks, nodes) array of the costs from every landmark
+        :param toLandmark:      (landmarks, nodes) array of the costs to every landmark
+        :param rasterDigest:    digest of the edge costs the tables were computed for
+        """
+        self.landmarks = [int(node) for node in landmarks]
+        self.fromLandmark = np.asarray(fromLandmark, dtype=np.float32)
+        self.toLandmark = np.asarray(toLandmark, dtype=np.float32)
+        self.rasterDigest = rasterDigest
+
+        # the costs are stored as float32, so every estimate is lowered by
+        # twice the largest rounding error to keep it admissible
+        finite = np.concatenate([self.fromLandmark[np.isfinite(self.fromLandmark)],
+                                 self.toLandmark[np.isfinite(self.toLandmark)], [0]])
+        self.errorMargin = 2 * float(np.spacing(np.float32(finite.max())))
+
+        self.fromViews = [memoryview(row) for row in self.fromLandmark]
+        self.toViews = [memoryview(row) for row in self.toLandmark]
+
+    @staticmethod
+    def chooseLandmarks(edgeCosts, count):
+        """
+            This function chooses landmarks on the boundary of the passable area.
+            The boundary is split into equal angles around its centre and the
+            boundary node farthest from the centre is taken in every sector.
+        :param edgeCosts:   the edge cost raster of the season
+        :param count:       the number of landmarks to choose
+        :return:            list of the nodes chosen as landmarks
+        """
+        passable = edgeCosts.passable
+        height, width = passable.shape
+
+        # passable pixels with a neighbour that is not passable or off the map
+        padded = np.pad(passable, 1, constant_values=False)
+        interior = padded[0:-2, 1:-1] & padded[2:, 1:-1] & padded[1:-1, 0:-2] & padded[1:-1, 2:]
+        rows, columns = np.nonzero(passable & ~interior)
+        if len(rows) == 0:
+            return []
+
+        centreY = rows.mean()
+        centreX = columns.mean()
+        angle = np.arctan2(rows - centreY, columns - centreX)
+        radius = np.hypot(rows - centreY, columns - centreX)
+        sector = np.minimum(((angle + np.pi) / (2 * np.pi) * count).astype(int), count - 1)
+
+        landmarks = []
+        for i in range(0, count):
+            inSector = np.flatnonzero(sector == i)
+            if len(inSector) > 0:
+                best = inSector[np.argmax(radius[inSector])]
+                landmarks.append(int(rows[best] * width + columns[best]))
+        return landmarks
+
+    @classmethod
+    def build(cls, searchEngine, count=8):
+        """
+            This function chooses the landmarks and runs Dijkstra's algorithm from
+            and to every landmark over the edge costs of the search engine.
+        :param searchEngine:    the grid search engine with the edge costs of the season
+        :param count:           the number of landmarks to use
+        :return:                the landmark table
+        """
+        edgeCosts = searchEngine.edgeCosts
+        landmarks = cls.chooseLandmarks(edgeCosts, count)
+        fromLandmark = np.empty((len(landmarks), searchEngine.size), dtype=np.float32)
+        toLandmark = np.empty((len(landmarks), searchEngine.size), dtype=np.float32)
+        for i in range(0, len(landmarks)):
+            fromLandmark[i] = searchEngine.dijkstraCosts(landmarks[i])
+            toLandmark[i] = searchEngine.dijkstraCosts(landmarks[i], reverse=True)
+        return cls(landmarks, fromLandmark, toLandmark, edgeCosts.digest())
+
+    @classmethod
+    def load(cls, filePath, rasterDigest):
+        """
+            This function loads the landmark table saved for an edge cost raster.
+        :param filePath:        the file the table was saved to
+        :param rasterDigest:    digest of the current edge costs
+        :return:                the landmark table, or None if the file is missing
+                                or was computed for other edge costs
+        """
+        if not os.path.exists(filePath):
+            return None
+        with np.load(filePath) as data:
+            if str(data['rasterDigest']) != rasterDigest:
+                return None
+            return cls(data['landmarks'], data['fromLandmark'], data['toLandmark'], rasterDigest)
+
+    def save(self, filePath):
+        """
+            This function saves the landmark table.
+        :param filePath:    the file to save the table to
+        :return:            None
+        """
+        temporaryFilePath = filePath + "." + str(os.getpid()) + ".tmp.npz"
+        np.savez(temporaryFilePath, landmarks=np.array(self.landmarks, dtype=np.int64),
+                 fromLandmark=self.fromLandmark, toLandmark=self.toLandmark,
+                 rasterDigest=np.array(self.rasterDigest))
+        os.replace(temporaryFilePath, filePath)
+
+    def heuristicTo(self, targetNode):
+        """
+            This function returns the landmark heuristic for a target node.
+        :param targetNode:  the node the search ends at
+        :return:            function returning the lower bound of the cost
+                            from a node to the target node
+        """
+        tables = [(self.fromViews[i], self.toViews[i], self.fromViews[i][targetNode], self.toViews[i][targetNode])
+                  for i in range(0, len(self.landmarks))]
+        errorMargin = self.errorMargin
+
+        def heuristic(node):
+            estimate = 0.0
+            for fromLandmark, toLandmark, fromToTarget, targetToLandmark in tables:
+                # differences of two infinite costs are NaN and never raise the estimate
+                value = fromToTarget - fromLandmark[node]
+                if value > estimate:
+                    estimate = value
+                value = toLandmark[node] - targetToLandmark
+                if value > estimate:
+                    estimate = value
+            return estimate - errorMargin if estimate > errorMargin else 0.0
+
+        return heuristic
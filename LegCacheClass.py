@@ -0,0 +1,134 @@
+"""
+    This file implements the cache of the results of leg queries.
+"""
+import sqlite3
+from collections import OrderedDict
+
+
+class LegCache():
+
+    """
+        This class keeps the paths and distances of recently found legs,
+        keyed by the digest of the season's edge costs, the version of the
+        cost model, the search used and the start and end nodes, with the
+        suboptimality bound the search proved, if any. Paths are
+        stored as one direction code per step, so a leg takes a few hundred
+        bytes.
+
+        The least recently used legs are dropped once the cache holds more
+        than maxBytes. When a file is given, every leg is also written to an
+        SQLite database there, which is read on misses and survives restarts.
+    """
+    __slots__ = 'maxBytes', 'entries', 'usedBytes', 'database', 'hits', 'diskHits', 'misses', 'evictions'
+
+    # the bytes an entry takes besides its direction codes
+    entryOverhead = 200
+
+    def __init__(self, maxBytes=64 << 20, diskFilePath=None):
+        """
+            This is the constructor for the class.
+        :param maxBytes:        the most bytes the legs kept in memory may take
+        :param diskFilePath:    the SQLite file to keep every leg in, None for memory only
+        """
+        self.maxBytes = maxBytes
+        self.entries = OrderedDict()
+        self.usedBytes = 0
+        self.hits = 0
+        self.diskHits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.database = None
+        if diskFilePath is not None:
+            self.database = sqlite3.connect(diskFilePath)
+            self.database.execute("CREATE TABLE IF NOT EXISTS legs "
+                                  "(key TEXT PRIMARY KEY, distance REAL, codes BLOB, bound REAL)")
+            # files written before the bounds were kept get the column, their legs have no bound
+            columns = [row[1] for row in self.database.execute("PRAGMA table_info(legs)")]
+            if 'bound' not in columns:
+                self.database.execute("ALTER TABLE legs ADD COLUMN bound REAL")
+            self.database.commit()
+
+    @staticmethod
+    def databaseKey(key):
+        """
+            This function returns the key of a leg in the database.
+        :param key:     the key of the leg
+        :return:        the key as text
+        """
+        return ":".join(str(part) for part in key)
+
+    def get(self, key):
+        """
+            This function returns a leg from the cache.
+        :param key:     the key of the leg
+        :return:        the direction codes of the path, the distance and the
+                        bound, or None if the leg is not cached
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+        if self.database is not None:
+            row = self.database.execute("SELECT codes, distance, bound FROM legs WHERE key = ?",
+                                        (self.databaseKey(key),)).fetchone()
+            if row is not None:
+                self.diskHits += 1
+                entry = (bytes(row[0]), row[1], row[2])
+                self.remember(key, entry)
+                return entry
+
+        self.misses += 1
+        return None
+
+    def put(self, key, codes, distance, bound=None):
+        """
+            This function adds a leg to the cache.
+        :param key:         the key of the leg
+        :param codes:       the direction codes of the path
+        :param distance:    the distance of the leg
+        :param bound:       the suboptimality bound proved by the search, None for an optimal leg
+        :return:            None
+        """
+        entry = (bytes(codes), distance, bound)
+        self.remember(key, entry)
+        if self.database is not None:
+            self.database.execute("INSERT OR REPLACE INTO legs (key, distance, codes, bound) VALUES (?, ?, ?, ?)",
+                                  (self.databaseKey(key), distance, entry[0], bound))
+            self.database.commit()
+
+    def remember(self, key, entry):
+        """
+            This function keeps a leg in memory, dropping the least
+            recently used legs while the cache is too large.
+        :param key:     the key of the leg
+        :param entry:   the direction codes, the distance and the bound of the leg
+        :return:        None
+        """
+        if key in self.entries:
+            self.usedBytes -= len(self.entries.pop(key)[0]) + self.entryOverhead
+        self.entries[key] = entry
+        self.usedBytes += len(entry[0]) + self.entryOverhead
+        while self.usedBytes > self.maxBytes and self.entries:
+            evictedKey, evicted = self.entries.popitem(last=False)
+            self.usedBytes -= len(evicted[0]) + self.entryOverhead
+            self.evictions += 1
+
+    def statistics(self):
+        """
+            This function returns the counters of the cache.
+        :return:    dictionary of the hits in memory and on disk, the misses,
+                    the evictions and the legs and bytes kept in memory
+        """
+        return {'hits': self.hits, 'diskHits': self.diskHits, 'misses': self.misses, 'evictions': self.evictions,
+                'entries': len(self.entries), 'bytes': self.usedBytes}
+
+    def close(self):
+        """
+            This function closes the database of the cache.
+        :return:    None
+        """
+        if self.database is not None:
+            self.database.close()
+            self.database = None
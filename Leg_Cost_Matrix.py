@@ -0,0 +1,68 @@
+"""
+    This is the file for finding the cost or the distance
+    between every pair of candidate controls of a course.
+"""
+import argparse
+import os
+import sys
+import numpy as np
+from PathFinderClass import PathFinder
+
+
+def writeMatrix(matrix, outputFilePath):
+    """
+        This function writes a matrix as CSV, or as NPY if the file name ends with .npy.
+    :param matrix:          the matrix to write
+    :param outputFilePath:  the file to write to, None for CSV on the standard output
+    :return:                None
+    """
+    if outputFilePath is not None and outputFilePath.endswith(".npy"):
+        np.save(outputFilePath, matrix)
+    elif outputFilePath is None:
+        np.savetxt(sys.stdout, matrix, delimiter=",", fmt="%.6f")
+    else:
+        np.savetxt(outputFilePath, matrix, delimiter=",", fmt="%.6f")
+
+
+def main():
+    """
+        This is the main function for the leg cost matrix.
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description="Find the cost of the cheapest path between every pair of points.")
+    parser.add_argument("pointsFile", help="file with the points, as \"x y\" on every line")
+    parser.add_argument("--season", nargs="+", default=["summer"], choices=PathFinder.seasonsToConsider,
+                        help="the seasons to find the matrix for")
+    parser.add_argument("--value", default="cost", choices=["cost", "distance"],
+                        help="the travel cost (time) or the distance of the cheapest paths")
+    parser.add_argument("--output", default=None,
+                        help="the .csv or .npy file to write, with several seasons the season is "
+                             "added to the name; the CSV is written to the standard output if not given")
+    arguments = parser.parse_args()
+
+    # Create a path finder object
+    pathFinder = PathFinder("TerrainImageAndElevation/terrain.png", "TerrainImageAndElevation/elevations.txt",
+                            searchEngine='grid', bundleFilePath="TerrainImageAndElevation/terrain.bundle")
+    try:
+        points = pathFinder.readPointsFile(arguments.pointsFile)
+    except (OSError, ValueError, IndexError) as error:
+        sys.exit("Could not read the points: " + str(error))
+
+    for season in arguments.season:
+        pathFinder.loadSeason(season)
+        try:
+            costs, distances = pathFinder.legCostMatrix(points)
+        except ValueError as error:
+            sys.exit("Could not find the matrix: " + str(error))
+        matrix = costs if arguments.value == "cost" else distances
+
+        outputFilePath = arguments.output
+        if outputFilePath is not None and len(arguments.season) > 1:
+            name, extension = os.path.splitext(outputFilePath)
+            outputFilePath = name + "_" + season + extension
+        elif outputFilePath is None and len(arguments.season) > 1:
+            print("# " + season)
+        writeMatrix(matrix, outputFilePath)
+
+if __name__ == '__main__':
+    main()
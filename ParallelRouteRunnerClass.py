@@ -0,0 +1,241 @@
+"""
+    This file implements tracing the routes of several seasons and
+    courses, or the legs of one route, at the same time in worker processes.
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from PathFinderClass import PathFinder
+from GridSearchEngineClass import SearchBudgetExceeded
+from RouteResultClass import RouteResult
+
+# the path finder of a worker process, the shared memory it is attached to and its season
+workerPathFinder = None
+workerSharedMemory = []
+workerSeason = None
+
+
+class ParallelRouteRunner():
+
+    """
+        This class traces routes in a pool of worker processes.
+        The terrain layers are placed in shared memory once and
+        every worker uses them without copying.
+
+        The runner can be opened once with a with statement and used
+        for many calls, otherwise every call starts its own pool.
+    """
+    __slots__ = 'pathFinder', 'workers', 'maxExpansions', 'preloadSeasons', 'sharedMemory', 'layerSpecs', 'executor'
+
+    def __init__(self, pathFinder, workers=None, maxExpansions=None, preloadSeasons=()):
+        """
+            This is the constructor for the class.
+        :param pathFinder:      the path finder with the terrain to use
+        :param workers:         the number of worker processes, None for one per cpu
+        :param maxExpansions:   the most nodes the search of one leg may expand,
+                                None for no limit
+        :param preloadSeasons:  the seasons every worker prepares when it starts,
+                                so the first query of a season is not slower
+        """
+        self.pathFinder = pathFinder
+        self.workers = workers
+        self.maxExpansions = maxExpansions
+        self.preloadSeasons = tuple(preloadSeasons)
+        self.sharedMemory = []
+        self.layerSpecs = None
+        self.executor = None
+
+    def open(self):
+        """
+            This function places the terrain in shared memory and starts the workers.
+        :return:    None
+        """
+        layerSpecs = self.publishTerrain()
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=self.attachWorker,
+                                            initargs=(layerSpecs, self.pathFinder.searchEngine,
+                                                      self.preloadSeasons, self.pathFinder.searchSettings(),
+                                                      self.pathFinder.bundleFilePath))
+
+    def close(self):
+        """
+            This function stops the workers and frees the shared memory.
+        :return:    None
+        """
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        self.releaseTerrain()
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exceptionType, exceptionValue, traceback):
+        self.close()
+
+    def publishTerrain(self):
+        """
+            This function copies the terrain layers into shared memory.
+        :return:    dictionary of the shared memory name, dtype and shape of every layer
+        """
+        self.layerSpecs = {}
+        for name, layer in self.pathFinder.terrainLayers().items():
+            if layer.nbytes == 0:
+                # empty layers can not be placed in shared memory
+                self.layerSpecs[name] = (None, layer.dtype.str, layer.shape)
+                continue
+            block = shared_memory.SharedMemory(create=True, size=layer.nbytes)
+            np.ndarray(layer.shape, dtype=layer.dtype, buffer=block.buf)[...] = layer
+            self.sharedMemory.append(block)
+            self.layerSpecs[name] = (block.name, layer.dtype.str, layer.shape)
+        return self.layerSpecs
+
+    def releaseTerrain(self):
+        """
+            This function frees the shared memory of the terrain layers.
+        :return:    None
+        """
+        for block in self.sharedMemory:
+            block.close()
+            block.unlink()
+        self.sharedMemory = []
+        self.layerSpecs = None
+
+    @staticmethod
+    def attachWorker(layerSpecs, searchEngine, preloadSeasons=(), searchSettings=None, bundleFilePath=None):
+        """
+            This function creates the path finder of a worker
+            process from the terrain layers in shared memory.
+        :param layerSpecs:      the shared memory specs of the layers
+        :param searchEngine:    the search engine to use
+        :param preloadSeasons:  the seasons to prepare the edge costs of
+        :param searchSettings:  the search settings of the path finder, as returned
+                                by PathFinder.searchSettings, None for the defaults
+        :param bundleFilePath:  the terrain bundle of the path finder, next to which the
+                                landmark tables and hierarchical graphs are kept, so the
+                                workers load them instead of each computing them again
+        :return:                None
+        """
+        global workerPathFinder
+        layers = {}
+        for name, (memoryName, dtype, shape) in layerSpecs.items():
+            if memoryName is None:
+                layers[name] = np.zeros(shape, dtype=dtype)
+                continue
+            block = shared_memory.SharedMemory(name=memoryName)
+            workerSharedMemory.append(block)
+            layers[name] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        workerPathFinder = PathFinder(None, None, searchEngine, bundleFilePath=bundleFilePath, terrainLayers=layers)
+        for name, value in (searchSettings or {}).items():
+            setattr(workerPathFinder, name, value)
+        for season in preloadSeasons:
+            ParallelRouteRunner.useSeasonInWorker(season)
+            workerPathFinder.prepareEdgeCosts()
+
+    @staticmethod
+    def useSeasonInWorker(season):
+        """
+            This function sets up the season in a worker process,
+            unless it is already the season in use.
+        :param season:  the season to use
+        :return:        None
+        """
+        global workerSeason
+        if season != workerSeason:
+            workerPathFinder.loadSeason(season)
+            workerSeason = season
+
+    @staticmethod
+    def solveInWorker(season, routeFile, render):
+        """
+            This function traces one route in a worker process.
+        :param season:      the season to use
+        :param routeFile:   the file with the points on the route
+        :param render:      True to draw the image of the route
+        :return:            the result of the route and its image (or None)
+        """
+        ParallelRouteRunner.useSeasonInWorker(season)
+        result = workerPathFinder.solveRoute(routeFile, season)
+        image = workerPathFinder.renderRoute(result) if render else None
+        return result, image
+
+    @staticmethod
+    def solveLegInWorker(season, startPoint, endPoint, maxExpansions):
+        """
+            This function finds the path of one leg in a worker process.
+        :param season:          the season to use
+        :param startPoint:      the starting point of the leg
+        :param endPoint:        the ending point of the leg
+        :param maxExpansions:   the most nodes the search may expand
+        :return:                the path of the leg, its distance and the bound of the search
+        """
+        ParallelRouteRunner.useSeasonInWorker(season)
+        path, distance = workerPathFinder.findPath(startPoint, endPoint, maxExpansions)
+        return path, distance, workerPathFinder.lastBound
+
+    def solveLegs(self, routeFile, season, pointsOnRoute):
+        """
+            This function finds the paths of all legs of a route at the same
+            time and puts them back together in the order of the route. If a
+            leg fails, the legs not started yet are cancelled and the error is
+            raised again naming the leg.
+        :param routeFile:       the file the points on the route were read from
+        :param season:          the season to use
+        :param pointsOnRoute:   the points on the route
+        :return:                the result of the route
+        """
+        if self.executor is None:
+            with self:
+                return self.solveLegs(routeFile, season, pointsOnRoute)
+
+        start = time.time()
+        result = RouteResult(routeFile, season, pointsOnRoute)
+        futures = [self.executor.submit(self.solveLegInWorker, season, pointsOnRoute[point - 1],
+                                        pointsOnRoute[point], self.maxExpansions)
+                   for point in range(1, len(pointsOnRoute))]
+        for point, future in enumerate(futures, 1):
+            try:
+                result.addLeg(*future.result())
+            except (SearchBudgetExceeded, ValueError) as error:
+                self.cancel(futures)
+                raise type(error)("leg " + str(point) + " of " + str(routeFile) + " in " + season + ", from " +
+                                  str(pointsOnRoute[point - 1]) + " to " + str(pointsOnRoute[point]) + ": " +
+                                  str(error)) from error
+        result.timeTaken = time.time() - start
+        return result
+
+    def run(self, seasons, routeFiles, render=True):
+        """
+            This function traces every route for every season in the worker processes.
+        :param seasons:     the seasons to use
+        :param routeFiles:  the files with the points on the routes
+        :param render:      True to draw the images of the routes
+        :return:            list of the result and image of every season and route,
+                            in the order of the seasons and then the routes
+        """
+        if self.executor is None:
+            with self:
+                return self.run(seasons, routeFiles, render)
+
+        routes = [(season, routeFile) for season in seasons for routeFile in routeFiles]
+        futures = [self.executor.submit(self.solveInWorker, season, routeFile, render) for season, routeFile in routes]
+        results = []
+        for (season, routeFile), future in zip(routes, futures):
+            try:
+                results.append(future.result())
+            except (SearchBudgetExceeded, ValueError) as error:
+                self.cancel(futures)
+                raise type(error)(str(routeFile) + " in " + season + ": " + str(error)) from error
+        return results
+
+    @staticmethod
+    def cancel(futures):
+        """
+            This function cancels the work that has not started yet, the
+            work already running in the workers is left to finish.
+        :param futures: the futures of the work
+        :return:        None
+        """
+        for future in futures:
+            future.cancel()
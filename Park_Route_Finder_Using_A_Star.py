@@ -4,8 +4,17 @@
 
     By Rahul Golhar
 """
+import argparse
+import cProfile
+import pstats
+import sys
 import time
 from PathFinderClass import PathFinder
+from ParallelRouteRunnerClass import ParallelRouteRunner
+from RouteQueryServerClass import RouteQueryServer
+from LegCacheClass import LegCache
+from GridSearchEngineClass import SearchBudgetExceeded
+from SearchInstrumentationClass import SearchInstrumentation
 
 
 def main():
@@ -13,22 +22,117 @@ def main():
         This is the main function for the algorithm.
     :return: None
     """
+    parser = argparse.ArgumentParser(description="Find the paths of all routes for all seasons.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="trace the season and route combinations in this many worker processes")
+    parser.add_argument("--leg-workers", type=int, default=None,
+                        help="solve the legs of every route in this many worker processes")
+    parser.add_argument("--max-expansions", type=int, default=None,
+                        help="the most nodes the search of one leg may expand when using --leg-workers")
+    parser.add_argument("--landmarks", action="store_true",
+                        help="guide the search with landmark distances, computed once per season "
+                             "and saved next to the terrain bundle")
+    parser.add_argument("--hierarchical", action="store_true",
+                        help="search the clusters of the map first and then the pixels inside them, "
+                             "faster on large maps but the paths may be a few percent longer")
+    parser.add_argument("--epsilon", type=float, default=None,
+                        help="accept paths up to this many times the optimal cost, found faster with weighted A*")
+    parser.add_argument("--time-budget-ms", type=float, default=None,
+                        help="improve every leg towards --epsilon (the optimal path by default) for at most "
+                             "this many milliseconds, starting from a quickly found path")
+    parser.add_argument("--score", default=None,
+                        help="find the fastest order of the controls in this file of PathFiles for every "
+                             "season instead of tracing the fixed courses")
+    parser.add_argument("--serve", action="store_true",
+                        help="keep the terrain loaded and answer leg and course queries over HTTP with JSON, "
+                             "searching in --workers worker processes")
+    parser.add_argument("--port", type=int, default=8080, help="the port to answer queries on with --serve")
+    parser.add_argument("--socket", default=None, help="the Unix socket to answer queries on with --serve")
+    parser.add_argument("--cache-mb", type=float, default=None,
+                        help="keep the legs found in a cache of this many megabytes and reuse them")
+    parser.add_argument("--cache-file", default=None,
+                        help="also keep every leg found in this file, reused when run again")
+    parser.add_argument("--profile", default=None,
+                        help="profile the run with cProfile, save the statistics in this file "
+                             "and print the functions taking the most time")
+    parser.add_argument("--instrument", default=None,
+                        help="write the counters and timings of the search of every leg to this JSON file, "
+                             "for the routes traced in this process")
+    parser.add_argument("--original-layers", action="store_true",
+                        help="build the winter ice and spring mud with the original search from every shore "
+                             "pixel, as the images in GeneratedPaths and output.txt were")
+    parser.add_argument("--heatmap", action="store_true",
+                        help="also save an image of the pixels explored by the searches of every route "
+                             "next to its image in GeneratedPaths")
+    arguments = parser.parse_args()
+
     # Image file to be used for terrain
     imageFileToUse = "TerrainImageAndElevation/terrain.png"
     # Elevation file to be used
     elevationFileToUse = "TerrainImageAndElevation/elevations.txt"
+    # Compiled terrain bundle, rebuilt when the files above change
+    bundleFileToUse = "TerrainImageAndElevation/terrain.bundle"
 
     # Create a path finder object
-    pathFinder = PathFinder(imageFileToUse, elevationFileToUse)
+    pathFinder = PathFinder(imageFileToUse, elevationFileToUse, searchEngine='grid', bundleFilePath=bundleFileToUse,
+                            springCompatible=arguments.original_layers, winterCompatible=arguments.original_layers)
+    pathFinder.useLandmarks = arguments.landmarks
+    pathFinder.useHierarchy = arguments.hierarchical
+    pathFinder.searchEpsilon = arguments.epsilon
+    if arguments.time_budget_ms is not None:
+        pathFinder.searchTimeBudget = arguments.time_budget_ms / 1000
+    legCache = None
+    if arguments.cache_mb is not None or arguments.cache_file is not None:
+        legCache = LegCache(int((arguments.cache_mb or 64) * (1 << 20)), arguments.cache_file)
+        pathFinder.setLegCache(legCache)
+    instrumentation = None
+    if arguments.instrument is not None or arguments.heatmap:
+        instrumentation = SearchInstrumentation(arguments.heatmap)
+        pathFinder.setInstrumentation(instrumentation)
+
+    if arguments.serve:
+        RouteQueryServer(pathFinder, arguments.workers, arguments.max_expansions, legCache).run(
+            port=arguments.port, socketPath=arguments.socket)
+        return
 
     start = time.time()
+    profiler = None
+    if arguments.profile is not None:
+        profiler = cProfile.Profile()
+        profiler.enable()
 
     # Find the paths for all seasons
-    pathFinder.findPathsForAllSeasons()
+    if arguments.score is not None:
+        for season in pathFinder.seasonsToConsider:
+            pathFinder.loadSeason(season)
+            pathFinder.traceScoreCourse(arguments.score, season)
+    elif arguments.workers is not None or arguments.leg_workers is not None:
+        # a leg failing in a worker, for example over --max-expansions, ends the run with its error
+        try:
+            if arguments.workers is not None:
+                pathFinder.findPathsForAllSeasonsInParallel(arguments.workers)
+            else:
+                with ParallelRouteRunner(pathFinder, arguments.leg_workers, arguments.max_expansions) as legRunner:
+                    pathFinder.setLegRunner(legRunner)
+                    pathFinder.findPathsForAllSeasons()
+        except (SearchBudgetExceeded, ValueError) as error:
+            sys.exit("Could not trace the routes: " + str(error))
+    else:
+        pathFinder.findPathsForAllSeasons()
+
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(arguments.profile)
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+    if arguments.instrument is not None:
+        instrumentation.save(arguments.instrument)
 
     print("\n\n********************************************")
 
     print("Total time taken to traverse all: ", time.time() - start)
+    if legCache is not None:
+        print("Leg cache: ", legCache.statistics())
+        legCache.close()
 
     print("\n\n********************************************")
 
@@ -3,20 +3,40 @@
 
     By Rahul Golhar
 """
+import os
 import time
-from PixelDataClass import PixelData
 from PixelPositionClass import PixelPosition
+from TerrainGridClass import TerrainGrid
+from TerrainPaletteClass import TerrainPalette
+from GridSearchEngineClass import GridSearchEngine
+from EdgeCostRasterClass import EdgeCostRaster
+from LandmarkTableClass import LandmarkTable
+from HierarchicalGraphClass import HierarchicalGraph
+from TerrainBundleClass import TerrainBundle
+from TiledTerrainStoreClass import TiledTerrainStore
+from TiledSearchEngineClass import TiledSearchEngine
+from SeasonLayerBuilderClass import SeasonLayerBuilder
+from SeasonOverlayClass import SeasonOverlay
+from RouteResultClass import RouteResult
+from ControlOrderSolverClass import ControlOrderSolver
+from IncrementalPlannerClass import IncrementalPlanner
 from math import sqrt, degrees, atan
+import numpy as np
 from PIL import Image
 from queue import PriorityQueue
-from collections import deque
 
 class PathFinder():
     """
         This class implements the functions
         and actions for finding various paths.
     """
-    __slots__ = 'pixelInfoMapping', 'imagePixelForm', 'imageUsed', 'terrainSpeedMap', 'imageFilePath', 'elevationFilePath'
+    __slots__ = 'pixelInfoMapping', 'terrainGrid', 'imagePixelForm', 'imageUsed', 'terrainSpeedMap', 'imageFilePath', \
+                'elevationFilePath', 'terrainCodes', 'searchEngine', 'gridSearchEngine', \
+                'edgeCostRaster', 'bundleFilePath', 'seasonOverlays', \
+                'seasonLayerBuilder', 'legRunner', 'landmarkTables', 'useLandmarks', \
+                'hierarchicalGraphs', 'useHierarchy', 'activeSeason', 'seasonEdgeCosts', \
+                'legCache', 'searchEpsilon', 'searchTimeBudget', 'lastBound', 'instrumentation', 'terrainPalette', \
+                'tiledStore', 'tiledSearchEngine'
 
     # *************************************** Assign colors for different areas ***************************
     openLandA = '#f89412'  # (248,148,18) #
@@ -35,6 +55,10 @@ class PathFinder():
     winterColor = '#5cf2ed'
     springColor = '#8b6508'
 
+    # *************************************** Assign class codes for all colors ***************************
+    terrainColors = [openLandA, roughMeadowsB, easyForestCnD, slowRunForestE, walkForestF, impassibleVegetationG,
+                     waterHnInJ, pavedRoadKnL, footpathMnN, outside, fallColor, winterColor, springColor]
+
     # *************************************** Assign distance covered per unit ***************************
     xDistLongitude = 10.29
     yDistLatitude = 7.55
@@ -44,19 +68,105 @@ class PathFinder():
     pathsToTrace = ["brown.txt", "white.txt", "red.txt"]
     seasonsToConsider = ['summer', 'fall', 'winter', 'spring']
 
-    def __init__(self, imageFilePath, elevationFilePath):
+    # *************************************** Assign the available search engines ***************************
+    searchEngines = ['legacy', 'grid', 'tiled']
+
+    def __init__(self, imageFilePath, elevationFilePath, searchEngine='legacy', bundleFilePath=None,
+                 springCompatible=False, terrainLayers=None, tiledStoreFilePath=None, winterCompatible=False):
         """
             This is the constructor for the class.
         :param imageFilePath:       this is path of the image to use for terrain
         :param elevationFilePath:   this is path with the elevation data for the terrain
+        :param searchEngine:        the search engine to use, one of searchEngines
+        :param bundleFilePath:      path of the compiled terrain bundle to use, it is
+                                    (re)built from the image and elevation data when
+                                    missing or out of date
+        :param springCompatible:    True to flood the Spring season exactly like the
+                                    original search from every shore pixel did
+        :param terrainLayers:       dictionary of the terrain layers, as returned by
+                                    terrainLayers(), to use instead of loading the files
+        :param tiledStoreFilePath:  path of the tiled terrain store searched by the 'tiled'
+                                    engine, written from the image and elevation data a
+                                    band of tiles at a time when missing. The map is then
+                                    never loaded whole, only the tiles the searches reach
+        :param winterCompatible:    True to ice the Winter season exactly like the
+                                    original search from every shore pixel did
         """
         self.imageFilePath = imageFilePath
         self.elevationFilePath = elevationFilePath
-        self.pixelInfoMapping = {}
+        self.bundleFilePath = bundleFilePath
+        self.seasonOverlays = {}
+        self.activeSeason = None
+        self.seasonEdgeCosts = {}
         self.terrainSpeedMap = {}
         self.terrainSpeedMapping()
-        self.loadTerrainImage()
-        self.loadElevationData()
+        self.terrainPalette = TerrainPalette(self.terrainColors,
+                                             [self.terrainSpeedMap[color] for color in self.terrainColors],
+                                             [self.outside, self.impassibleVegetationG])
+        self.terrainCodes = self.terrainPalette.codes
+        self.seasonLayerBuilder = SeasonLayerBuilder(self.terrainCodes, {'easyForest': self.easyForestCnD,
+                                                                         'water': self.waterHnInJ,
+                                                                         'outside': self.outside,
+                                                                         'fall': self.fallColor,
+                                                                         'winter': self.winterColor,
+                                                                         'spring': self.springColor},
+                                                     springCompatible, winterCompatible)
+        self.tiledStore = None
+        self.tiledSearchEngine = None
+        if searchEngine == 'tiled':
+            if tiledStoreFilePath is None:
+                raise ValueError("the tiled search engine needs the path of a tiled terrain store")
+            if not os.path.exists(tiledStoreFilePath):
+                self.writeTiledStoreFromSources(tiledStoreFilePath)
+            self.tiledStore = TiledTerrainStore(tiledStoreFilePath).open()
+            self.tiledSearchEngine = TiledSearchEngine(self.tiledStore)
+            self.terrainGrid = None
+            self.gridSearchEngine = None
+        else:
+            if terrainLayers is not None:
+                self.loadTerrainLayers(terrainLayers)
+            elif bundleFilePath is None or not self.loadTerrainBundle():
+                self.loadTerrainImage()
+                self.loadElevationData()
+                if bundleFilePath is not None:
+                    self.compileTerrainBundle()
+            self.gridSearchEngine = GridSearchEngine(self.terrainGrid)
+        self.edgeCostRaster = None
+        self.landmarkTables = {}
+        self.useLandmarks = False
+        self.hierarchicalGraphs = {}
+        self.useHierarchy = False
+        self.legRunner = None
+        self.legCache = None
+        self.searchEpsilon = None
+        self.searchTimeBudget = None
+        self.lastBound = None
+        self.instrumentation = None
+        self.setSearchEngine(searchEngine)
+
+    def setSearchEngine(self, searchEngine):
+        """
+            This function selects the search engine used for finding paths.
+        :param searchEngine:    'legacy' for the dictionary based A*, 'grid' for the
+                                A* on integer nodes or 'tiled' for the A* on the tiles
+                                of the tiled terrain store
+        :return:    None
+        """
+        if searchEngine not in self.searchEngines:
+            raise ValueError("unknown search engine: " + str(searchEngine))
+        if (searchEngine == 'tiled') != (self.tiledSearchEngine is not None):
+            raise ValueError("the tiled search engine can only be chosen when creating the path "
+                             "finder with a tiled terrain store, and then not changed")
+        self.searchEngine = searchEngine
+
+    def setLegRunner(self, legRunner):
+        """
+            This function sets the runner that solves the legs of a route
+            at the same time in its worker processes.
+        :param legRunner:   an open ParallelRouteRunner, None to solve the legs one by one
+        :return:            None
+        """
+        self.legRunner = legRunner
 
     def rgbaToHex(self, rgbaValue):
         """
@@ -94,41 +204,303 @@ class PathFinder():
         self.imageUsed = Image.open(self.imageFilePath)
         self.imagePixelForm = self.imageUsed.load()
 
+    def readElevationRows(self, width, height):
+        """
+            This function reads the elevation data of terrain one row at a time.
+        :param width:   the width of the map, further elevations of a line are ignored
+        :param height:  the height of the map, further lines are ignored
+        :return:        generator of the list of the elevations of every row
+        """
+        rows = 0
+        with open(self.elevationFilePath, "r") as elevationFile:
+            # read line by line
+            for line in elevationFile:
+                lineArray = line.strip().split()
+                if len(lineArray) == 0:
+                    continue
+                if rows == height:
+                    break
+                if len(lineArray) < width:
+                    raise ValueError("line " + str(rows + 1) + " of " + self.elevationFilePath +
+                                     " has " + str(len(lineArray)) + " elevations, the terrain image is " +
+                                     str(width) + " pixels wide")
+                yield [float(lineArray[i]) for i in range(0, width)]
+                rows += 1
+        if rows < height:
+            raise ValueError(self.elevationFilePath + " has " + str(rows) +
+                             " lines of elevations, the terrain image is " + str(height) + " pixels high")
+
     def loadElevationData(self):
         """
             This function loads the elevation data of terrain.
         :return: None
         """
-        elevationFile = open(self.elevationFilePath, "r")
+        # the size of the map comes from the terrain image
+        width, height = self.imageUsed.size
+        elevationData = list(self.readElevationRows(width, height))
 
-        elevationData = []
+        # assign data to respective pixel positions
+        self.terrainGrid = TerrainGrid(width, height, elevationData,
+                                       self.readTerrainClasses(), self.terrainColors,
+                                       self.terrainPalette.speedTable, self.terrainPalette.passableTable)
+        self.pixelInfoMapping = self.terrainGrid
 
-        # read line by line
-        for line in elevationFile:
-            linesList = []
-            lineArray = line.strip().split("   ")
-            for i in range(0, 395):
-                linesList.append(float(lineArray[i]))
-            elevationData.append(linesList)
+    def loadTerrainBundle(self):
+        """
+            This function loads the terrain and the season layers
+            from the compiled terrain bundle.
+        :return: True if the bundle was loaded, False if it is
+                 missing or was compiled from other source files
+        """
+        bundle = TerrainBundle(self.bundleFilePath)
+        if not bundle.isCurrent([self.imageFilePath, self.elevationFilePath],
+                                self.seasonLayerBuilder.rulesVersion()):
+            return False
 
-        # assign data to respective pixel positions
-        for i in range(0, 395):
-            for j in range(0, 500):
-                color = self.rgbaToHex(self.imagePixelForm[i, j])
-                value = PixelData(elevationData[j][i], color, self.terrainSpeedMap[color])
-                self.pixelInfoMapping[PixelPosition(i, j)] = value
+        width, height, layers = bundle.open()
+        self.loadTerrainLayers(layers)
+        return True
+
+    def loadTerrainLayers(self, layers):
+        """
+            This function loads the terrain and the season overlays from
+            arrays, without copying the elevations.
+        :param layers:  dictionary of the terrain layers, as returned by terrainLayers()
+        :return:        None
+        """
+        height, width = layers['elevation'].shape
+        self.terrainGrid = TerrainGrid(width, height, layers['elevation'], layers['terrainClass'],
+                                       self.terrainColors,
+                                       self.terrainPalette.speedTable, self.terrainPalette.passableTable)
+        self.pixelInfoMapping = self.terrainGrid
+        for season in self.seasonsToConsider:
+            self.seasonOverlays[season] = SeasonOverlay(layers[season + 'Indices'], layers[season + 'Classes'])
+        self.renderTerrainImage()
+
+    def terrainLayers(self):
+        """
+            This function returns the layers of the terrain, building the
+            overlays of the seasons that were not used yet.
+        :return:    dictionary of the elevations, the base terrain classes
+                    and the indices and classes of every season overlay
+        """
+        activeOverlay = self.terrainGrid.activeOverlay
+        activeSeason = self.activeSeason
+        for season in self.seasonsToConsider:
+            if season not in self.seasonOverlays:
+                self.loadSeason(season)
+        self.terrainGrid.applyOverlay(activeOverlay)
+        self.renderTerrainImage()
+        self.activeSeason = activeSeason
+        self.edgeCostRaster = self.seasonEdgeCosts.get(activeSeason)
+        if self.edgeCostRaster is not None:
+            self.gridSearchEngine.setEdgeCosts(self.edgeCostRaster)
+
+        shape = (self.terrainGrid.height, self.terrainGrid.width)
+        layers = {'elevation': self.terrainGrid.elevation.reshape(shape),
+                  'terrainClass': self.terrainGrid.baseTerrainClass.reshape(shape)}
+        for season in self.seasonsToConsider:
+            layers[season + 'Indices'] = self.seasonOverlays[season].indices
+            layers[season + 'Classes'] = self.seasonOverlays[season].terrainClass
+        return layers
+
+    def compileTerrainBundle(self):
+        """
+            This function compiles the elevation, the terrain classes
+            and the overlays of every season into the terrain bundle.
+        :return: None
+        """
+        layers = self.terrainLayers()
+        TerrainBundle(self.bundleFilePath).write([self.imageFilePath, self.elevationFilePath],
+                                                 self.seasonLayerBuilder.rulesVersion(),
+                                                 self.terrainGrid.width, self.terrainGrid.height, layers)
+
+    def writeTiledStore(self, storeFilePath, tileSize=256):
+        """
+            This function writes the terrain of the current season to a tiled
+            terrain store, which the TiledSearchEngine can search while only
+            keeping the tiles it reaches in memory.
+        :param storeFilePath:   path of the store file to write
+        :param tileSize:        the width and height of the tiles in pixels
+        :return:                None
+        """
+        shape = (self.terrainGrid.height, self.terrainGrid.width)
+        TiledTerrainStore(storeFilePath).write(self.terrainGrid.elevation.reshape(shape),
+                                               self.terrainGrid.terrainClass.reshape(shape),
+                                               self.terrainGrid.speedTable,
+                                               self.terrainPalette.blockedCodes(),
+                                               tileSize, self.terrainCodes[self.outside])
+
+    def writeTiledStoreFromSources(self, storeFilePath, tileSize=256):
+        """
+            This function writes the summer terrain to a tiled terrain store
+            straight from the image and elevation files, a band of tileSize
+            rows at a time, without building the terrain grid. Only the image
+            is decoded whole by Pillow, the elevations, the terrain classes
+            and the tiles are only held for one band.
+        :param storeFilePath:   path of the store file to write
+        :param tileSize:        the width and height of the tiles in pixels
+        :return:                None
+        """
+        image = Image.open(self.imageFilePath)
+        width, height = image.size
+        rows = self.readElevationRows(width, height)
+
+        def bands():
+            for firstY in range(0, height, tileSize):
+                bandHeight = min(tileSize, height - firstY)
+                pixels = np.asarray(image.crop((0, firstY, width, firstY + bandHeight)).convert("RGB"))
+                terrainClass = self.terrainPalette.classify(pixels).reshape(bandHeight, width)
+                elevation = np.array([next(rows) for i in range(0, bandHeight)], dtype=np.float32)
+                yield elevation, terrainClass
+
+        TiledTerrainStore(storeFilePath).writeBands(width, height, bands(), self.terrainPalette.speedTable,
+                                                    self.terrainPalette.blockedCodes(), tileSize,
+                                                    self.terrainCodes[self.outside])
+
+    def seasonDifferenceWithImage(self, season, referenceImageFilePath):
+        """
+            This function finds the pixels where the terrain of a season differs
+            from a reference image, for example one of the images in GeneratedPaths.
+            Pixels colored by the path overlay in the reference are ignored.
+        :param season:                  the season to compare
+        :param referenceImageFilePath:  the image to compare with
+        :return:    boolean arrays of the pixels with the season color only in
+                    the reference and of the pixels with it only in the season
+        """
+        self.loadSeason(season)
+        reference = np.asarray(Image.open(referenceImageFilePath).convert("RGB"))
+        pixels = np.asarray(self.imageUsed.convert("RGB"))
+        overlay = np.all(reference == (255, 0, 0), axis=2) | np.all(reference == (255, 0, 255), axis=2)
+
+        seasonColor = list(bytes.fromhex({'fall': self.fallColor, 'winter': self.winterColor,
+                                          'spring': self.springColor}.get(season, self.outside)[1:]))
+        inReference = np.all(reference == seasonColor, axis=2) & ~overlay
+        inSeason = np.all(pixels == seasonColor, axis=2) & ~overlay
+        return inReference & ~inSeason, inSeason & ~inReference
+
+    def compareSeasonWithImage(self, season, referenceImageFilePath):
+        """
+            This function compares the terrain of a season with a reference
+            image, see seasonDifferenceWithImage.
+        :param season:                  the season to compare
+        :param referenceImageFilePath:  the image to compare with
+        :return:    the number of pixels with the season color only in the
+                    reference and the number with it only in the season
+        """
+        onlyInReference, onlyInSeason = self.seasonDifferenceWithImage(season, referenceImageFilePath)
+        return int(onlyInReference.sum()), int(onlyInSeason.sum())
+
+    def renderTerrainImage(self):
+        """
+            This function draws the image to use from the
+            terrain classes of the current season.
+        :return: None
+        """
+        palette = np.array([list(bytes.fromhex(color[1:])) for color in self.terrainColors], dtype=np.uint8)
+        pixels = palette[self.terrainGrid.terrainClass].reshape(self.terrainGrid.height, self.terrainGrid.width, 3)
+        self.imageUsed = Image.fromarray(pixels, "RGB")
+        self.imagePixelForm = self.imageUsed.load()
+
+    def loadSeason(self, season):
+        """
+            This function sets up the terrain and the image for a season.
+            The overlay of a season is computed from the base map the first
+            time it is used (or taken from the terrain bundle) and kept, so
+            switching seasons afterwards only touches the changed pixels.
+            The edge costs of every season are kept once computed as well.
+        :param season:  the season to set up
+        :return:        None
+        """
+        if season in self.seasonOverlays:
+            self.terrainGrid.applyOverlay(self.seasonOverlays[season])
+            self.renderTerrainImage()
+            self.activeSeason = season
+            self.edgeCostRaster = self.seasonEdgeCosts.get(season)
+            if self.edgeCostRaster is not None:
+                self.gridSearchEngine.setEdgeCosts(self.edgeCostRaster)
+            return
+
+        self.resetImageToUse()
+        if season == 'fall':
+            self.setupImageForFall()
+        elif season == 'winter':
+            self.setupImageForWinter()
+        elif season == 'spring':
+            self.setupImageForSpring()
+        self.seasonOverlays[season] = self.terrainGrid.activeOverlay or SeasonOverlay([], [])
+        self.activeSeason = season
+
+    def readTerrainClasses(self):
+        """
+            This function reads the terrain class code of
+            every pixel from the image being used.
+        :return: the terrain class codes in row major order
+        """
+        return self.terrainPalette.classify(np.asarray(self.imageUsed.convert("RGB")))
 
     def resetPixelData(self):
         """
-            This function is used to reset the pixel data.
+            This function is used to reset the pixel data
+            to the colors of the image being used.
         :return: None
         """
-        for i in range(0, 395):
-            for j in range(0, 500):
-                key = PixelPosition(i, j)
-                color = self.rgbaToHex(self.imagePixelForm[i, j])
-                self.pixelInfoMapping[key].color = color
-                self.pixelInfoMapping[key].speed = self.terrainSpeedMap[color]
+        self.terrainGrid.setTerrainClass(self.readTerrainClasses())
+        self.activeSeason = None
+        self.edgeCostRaster = None
+
+    def prepareEdgeCosts(self):
+        """
+            This function computes the edge costs for the current
+            season once and hands them to the grid search engine.
+        :return: the edge cost raster of the current season
+        """
+        if self.edgeCostRaster is None:
+            self.edgeCostRaster = EdgeCostRaster(self.terrainGrid, self.terrainPalette.blockedCodes())
+            self.gridSearchEngine.setEdgeCosts(self.edgeCostRaster)
+            if self.activeSeason is not None:
+                self.seasonEdgeCosts[self.activeSeason] = self.edgeCostRaster
+        return self.edgeCostRaster
+
+    def prepareLandmarks(self):
+        """
+            This function returns the landmark table for the edge costs of the
+            current season. Tables are kept per season and, when a terrain bundle
+            is used, saved next to it so they are only computed once.
+        :return: the landmark table of the current season
+        """
+        digest = self.prepareEdgeCosts().digest()
+        if digest not in self.landmarkTables:
+            table = None
+            if self.bundleFilePath is not None:
+                landmarkFilePath = self.bundleFilePath + "." + digest[:16] + ".landmarks.npz"
+                table = LandmarkTable.load(landmarkFilePath, digest)
+            if table is None:
+                table = LandmarkTable.build(self.gridSearchEngine)
+                if self.bundleFilePath is not None:
+                    table.save(landmarkFilePath)
+            self.landmarkTables[digest] = table
+        return self.landmarkTables[digest]
+
+    def prepareHierarchy(self):
+        """
+            This function returns the hierarchical graph of the clusters for the
+            edge costs of the current season. Like the landmark tables, graphs are
+            kept per season and saved next to the terrain bundle when one is used.
+        :return: the hierarchical graph of the current season
+        """
+        digest = self.prepareEdgeCosts().digest()
+        if digest not in self.hierarchicalGraphs:
+            graph = None
+            if self.bundleFilePath is not None:
+                graphFilePath = self.bundleFilePath + "." + digest[:16] + ".hierarchy.npz"
+                graph = HierarchicalGraph.load(graphFilePath, self.gridSearchEngine)
+            if graph is None:
+                graph = HierarchicalGraph(self.gridSearchEngine)
+                if self.bundleFilePath is not None:
+                    graph.save(graphFilePath)
+            self.hierarchicalGraphs[digest] = graph
+        return self.hierarchicalGraphs[digest]
 
     def heuristic1(self, currentPoint, endPoint):
         """
@@ -150,7 +522,8 @@ class PathFinder():
         """
         dx = abs(currentPoint.xCoordinate - endPoint.xCoordinate)
         dy = abs(currentPoint.yCoordinate - endPoint.yCoordinate)
-        dz = self.pixelInfoMapping[currentPoint].elevation - self.pixelInfoMapping[endPoint].elevation
+        elevation = self.terrainGrid.elevation
+        dz = elevation[self.terrainGrid.index(currentPoint)] - elevation[self.terrainGrid.index(endPoint)]
         return (dx + dy) - (dz / 12)
 
     def setVisitedColor(self, currentPoint, imagePixelForm):
@@ -160,7 +533,7 @@ class PathFinder():
         :param imagePixelForm:  the image pixel data
         :return:  None
         """
-        for pixel in currentPoint.findNeighbours():
+        for pixel in currentPoint.findNeighbours(self.terrainGrid.width, self.terrainGrid.height):
             imagePixelForm[pixel.xCoordinate, pixel.yCoordinate] = (255, 0, 255, 255)
 
     def findElevationAngle(self, p1, p2):
@@ -171,8 +544,10 @@ class PathFinder():
         :param p2:  second point to check for
         :return:    the angle of elevation between 2 points
         """
+        elevation = self.terrainGrid.elevation
         return degrees(atan(
-            (self.pixelInfoMapping[p1].elevation - self.pixelInfoMapping[p2].elevation) / self.calculateDistance(p1,p2)))
+            float(elevation[self.terrainGrid.index(p1)] - elevation[self.terrainGrid.index(p2)]) /
+            self.calculateDistance(p1, p2)))
 
     def aStarImplementation(self, startPoint, endPoint):
         """
@@ -201,6 +576,9 @@ class PathFinder():
         distanceTillNow = {}
         distanceTillNow[startPoint] = 0
 
+        speedOf = self.terrainGrid.speed
+        width = self.terrainGrid.width
+
         while not queue.empty():
 
             currentPoint = queue.get()
@@ -210,14 +588,14 @@ class PathFinder():
                 break
 
             # find best neighbour
-            for point in currentPoint.findNeighbours():
+            for point in currentPoint.findNeighbours(self.terrainGrid.width, self.terrainGrid.height):
                 if self.isValidPoint(point):
                     # Calculate distance to neighbour
                     distance = self.calculateDistance(currentPoint, point)
                     # Calculate elevation angle between current point and next point
                     elevation_angle = self.findElevationAngle(currentPoint, point)
                     # find the speed at new pixel
-                    pixel_speed = self.pixelInfoMapping[point].speed
+                    pixel_speed = float(speedOf[point.yCoordinate * width + point.xCoordinate])
                     # find the speed with which we can move
                     speed = pixel_speed - (pixel_speed * elevation_angle / 100)
                     # find the new cost and append
@@ -226,7 +604,7 @@ class PathFinder():
                     # find the neighbour with least cost
                     if point not in costTillNow or new_cost < costTillNow[point]:
                         distanceTillNow[point] = distanceTillNow[currentPoint] + distance
-                        point.value = new_cost + self.heuristic1(point, endPoint) / self.pixelInfoMapping[point].speed
+                        point.value = new_cost + self.heuristic1(point, endPoint) / pixel_speed
                         costTillNow[point] = new_cost
                         queue.put(point)
                         previousPoint[point] = currentPoint
@@ -240,6 +618,208 @@ class PathFinder():
         # the path between the 2 given points and the distance so far
         return path, distanceTillNow[endPoint]
 
+    def searchSettings(self):
+        """
+            This function returns the settings choosing the search of the grid
+            engine, to give the same settings to the path finders of workers.
+        :return:    dictionary of the settings
+        """
+        return {'useLandmarks': self.useLandmarks, 'useHierarchy': self.useHierarchy,
+                'searchEpsilon': self.searchEpsilon, 'searchTimeBudget': self.searchTimeBudget}
+
+    def selectSearch(self, bidirectional=False, useLandmarks=None, hierarchical=None, epsilon=None,
+                     timeBudget=None):
+        """
+            This function returns the name of the search findPath uses for the
+            arguments given, which is also part of the key of a leg in the leg cache.
+        :param bidirectional:   True to search from both points at once
+        :param useLandmarks:    True to use the landmark heuristic, None for the useLandmarks setting
+        :param hierarchical:    True to search the hierarchical graph, None for the useHierarchy setting
+        :param epsilon:         the suboptimality bound, None for the searchEpsilon setting
+        :param timeBudget:      the seconds the anytime search may take, None for the
+                                searchTimeBudget setting
+        :return:                'hierarchical', 'bidirectional', 'anytime', 'weighted' followed
+                                by the bound, 'landmarks' or 'astar', with '+landmarks' added to
+                                the weighted searches guided by the landmark heuristic
+        """
+        epsilon = self.searchEpsilon if epsilon is None else epsilon
+        timeBudget = self.searchTimeBudget if timeBudget is None else timeBudget
+        landmarks = useLandmarks or (useLandmarks is None and self.useLandmarks)
+        if hierarchical or (hierarchical is None and self.useHierarchy):
+            return 'hierarchical'
+        elif bidirectional:
+            return 'bidirectional'
+        elif timeBudget is not None:
+            # the path depends on the time the search got, so it is never cached
+            return 'anytime' + ('+landmarks' if landmarks else '')
+        elif epsilon is not None:
+            return 'weighted' + str(float(epsilon)) + ('+landmarks' if landmarks else '')
+        elif landmarks:
+            return 'landmarks'
+        return 'astar'
+
+    def findPath(self, startPoint, endPoint, maxExpansions=None, bidirectional=False, useLandmarks=None,
+                 hierarchical=None, epsilon=None, timeBudget=None):
+        """
+            This function finds the path between the 2 given
+            points using the selected search engine. The weighted and
+            anytime searches keep the bound they proved in lastBound.
+        :param startPoint:      the starting points
+        :param endPoint:        the ending point
+        :param maxExpansions:   the most nodes the grid engine may expand before
+                                raising SearchBudgetExceeded, None for no limit
+        :param bidirectional:   True to search from both points at once with the
+                                grid engine, which gives an optimal path
+        :param useLandmarks:    True to guide the grid engine with the landmark
+                                heuristic, which gives an optimal path, None to
+                                use the useLandmarks setting of the path finder
+        :param hierarchical:    True to search the clusters of the hierarchical graph,
+                                which is faster on large maps but may give a slightly
+                                longer path, None to use the useHierarchy setting
+        :param epsilon:         the largest ratio of the cost of the path to the optimal
+                                cost allowed, found with weighted A*, None to use the
+                                searchEpsilon setting
+        :param timeBudget:      the seconds the anytime search may spend improving the
+                                path towards epsilon, None to use the searchTimeBudget setting
+        :return:                the path between the 2 given points
+                                and the distance so far
+        """
+        if self.searchEngine == 'legacy':
+            return self.aStarImplementation(startPoint, endPoint)
+        if self.searchEngine == 'tiled':
+            return self.findPathOnTiles(startPoint, endPoint, maxExpansions)
+
+        self.prepareEdgeCosts()
+        startNode = self.terrainGrid.index(startPoint)
+        endNode = self.terrainGrid.index(endPoint)
+        epsilon = self.searchEpsilon if epsilon is None else epsilon
+        timeBudget = self.searchTimeBudget if timeBudget is None else timeBudget
+        search = self.selectSearch(bidirectional, useLandmarks, hierarchical, epsilon, timeBudget)
+        self.lastBound = None
+        if search.startswith('weighted') or search.startswith('anytime'):
+            self.lastBound = float(epsilon or 1.0)
+        if self.instrumentation is not None:
+            self.instrumentation.startLeg(self.gridSearchEngine)
+
+        if self.legCache is not None and not search.startswith('anytime'):
+            key = self.legCacheKey(search, startNode, endNode)
+            cached = self.legCache.get(key)
+            if cached is not None:
+                nodes = self.gridSearchEngine.decodePath(startNode, cached[0])
+                if cached[2] is not None:
+                    self.lastBound = cached[2]
+                if self.instrumentation is not None:
+                    self.instrumentation.recordLeg(self.gridSearchEngine, startNode, endNode, search, cached[1], True)
+                return [self.terrainGrid.position(node) for node in nodes], cached[1]
+
+        if search == 'hierarchical':
+            nodes, distance = self.prepareHierarchy().findPath(startNode, endNode, maxExpansions)
+        elif search == 'bidirectional':
+            nodes, distance = self.gridSearchEngine.findPathBidirectional(startNode, endNode, maxExpansions)
+        elif search == 'landmarks':
+            heuristic = self.prepareLandmarks().heuristicTo(endNode)
+            nodes, distance = self.gridSearchEngine.findPath(startNode, endNode, maxExpansions, heuristic)
+        elif search == 'astar':
+            nodes, distance = self.gridSearchEngine.findPath(startNode, endNode, maxExpansions)
+        else:
+            heuristic = self.prepareLandmarks().heuristicTo(endNode) if search.endswith('+landmarks') else None
+            nodes, distance = self.gridSearchEngine.findPathAnytime(startNode, endNode, epsilon or 1.0, timeBudget,
+                                                                    maxExpansions, heuristic)
+            self.lastBound = self.gridSearchEngine.lastBound
+
+        if self.legCache is not None and not search.startswith('anytime'):
+            self.legCache.put(key, self.gridSearchEngine.encodePath(startNode, nodes), distance, self.lastBound)
+        if self.instrumentation is not None:
+            self.instrumentation.recordLeg(self.gridSearchEngine, startNode, endNode, search, distance)
+        return [self.terrainGrid.position(node) for node in nodes], distance
+
+    def findPathOnTiles(self, startPoint, endPoint, maxExpansions=None):
+        """
+            This function finds the path between the 2 given points with the
+            tiled search engine, which only reads the tiles the search reaches.
+        :param startPoint:      the starting point
+        :param endPoint:        the ending point
+        :param maxExpansions:   the most nodes the search may expand before
+                                raising SearchBudgetExceeded, None for no limit
+        :return:                the path between the 2 given points
+                                and the distance so far
+        """
+        width = self.tiledStore.width
+        self.lastBound = None
+        nodes, distance = self.tiledSearchEngine.findPath(startPoint.yCoordinate * width + startPoint.xCoordinate,
+                                                          endPoint.yCoordinate * width + endPoint.xCoordinate,
+                                                          maxExpansions)
+        return [PixelPosition(node % width, node // width) for node in nodes], distance
+
+    def isOnMap(self, point):
+        """
+            This function checks whether a point lies on the map, which
+            is the tiled terrain store with the tiled search engine.
+        :param point:   the point to check for
+        :return:        True if the point is on the map else False
+        """
+        if self.tiledStore is not None:
+            return 0 <= point.xCoordinate < self.tiledStore.width and 0 <= point.yCoordinate < self.tiledStore.height
+        return point in self.terrainGrid
+
+    def editTerrain(self, points, color=None, speed=None):
+        """
+            This function changes pixels of the current season, for example an
+            area closed on race day or a newly cleared trail, and updates the
+            edge costs in place. The edits are undone when a season is loaded.
+        :param points:  the points to change
+        :param color:   the color of the new terrain, None to keep it
+        :param speed:   the new speed of the points, None for the speed of the terrain
+        :return:        list of the node, direction and old cost of every edge whose
+                        cost changed, to pass to IncrementalPlanner.updateEdges
+        """
+        edgeCostRaster = self.prepareEdgeCosts()
+        nodes = [self.terrainGrid.index(point) for point in points]
+        self.terrainGrid.editPixels(nodes, None if color is None else self.terrainPalette.code(color), speed)
+        # the raster no longer belongs to the season as loaded
+        self.seasonEdgeCosts.pop(self.activeSeason, None)
+        self.renderTerrainImage()
+        return edgeCostRaster.updatePixels(self.terrainGrid, nodes)
+
+    def incrementalPlanner(self, startPoint, endPoint):
+        """
+            This function returns a D* Lite planner for a leg on the current
+            terrain, which can repair its path after editTerrain.
+        :param startPoint:  the starting point
+        :param endPoint:    the ending point
+        :return:            the planner of the leg
+        """
+        self.prepareEdgeCosts()
+        return IncrementalPlanner(self.gridSearchEngine, self.terrainGrid.index(startPoint),
+                                  self.terrainGrid.index(endPoint))
+
+    def setInstrumentation(self, instrumentation):
+        """
+            This function sets the instrumentation recording the searches of the grid engine.
+        :param instrumentation:     a SearchInstrumentation, None to record nothing
+        :return:                    None
+        """
+        self.instrumentation = instrumentation
+
+    def setLegCache(self, legCache):
+        """
+            This function sets the cache the grid engine keeps the found legs in.
+        :param legCache:    a LegCache, None to search every leg
+        :return:            None
+        """
+        self.legCache = legCache
+
+    def legCacheKey(self, search, startNode, endNode):
+        """
+            This function returns the key of a leg in the leg cache.
+        :param search:      the name of the search used for the leg
+        :param startNode:   the starting node
+        :param endNode:     the ending node
+        :return:            the key, made of the digest of the edge costs of the current
+                            season, the cost model version, the search and the nodes
+        """
+        return self.prepareEdgeCosts().digest(), EdgeCostRaster.costModelVersion, search, startNode, endNode
+
     def tracePath(self, path, imagePixelForm):
         """
             This function sets the color of the points on the path.
@@ -258,11 +838,7 @@ class PathFinder():
         :return:        True if the point is valid else false
         """
         # point is invalid if it is out of bounds or it is an impassible vegetation
-        if (str(self.pixelInfoMapping[pixel].color) == str(self.outside)) or \
-                (str(self.pixelInfoMapping[pixel].color) == str(self.impassibleVegetationG)):
-            return False
-        else:
-            return True
+        return bool(self.terrainGrid.passable[self.terrainGrid.index(pixel)])
 
     def calculateDistance(self, point1, point2):
         """
@@ -283,12 +859,13 @@ class PathFinder():
 
     def resetImageToUse(self):
         """
-            This function resets the image data to initial image data.
+            This function resets the terrain and the image data to the base map.
         :return: None
         """
-        self.imageUsed = Image.open(self.imageFilePath)
-        self.imagePixelForm = self.imageUsed.load()
-        self.resetPixelData()
+        self.terrainGrid.applyOverlay(None)
+        self.renderTerrainImage()
+        self.activeSeason = None
+        self.edgeCostRaster = None
 
     def getPointsOnRoute(self, pathFile):
         """
@@ -296,12 +873,55 @@ class PathFinder():
         :param pathFile:    file to read and find the coordinates
         :return:            list of points to be traced
         """
-        pointsOnRoute = []
-        file = open(("PathFiles/"+pathFile), "r")
-        for line in file:
-            point = line.strip().split(" ")
-            pointsOnRoute.append(PixelPosition(int(point[0]), int(point[1])))
-        return pointsOnRoute
+        return self.readPointsFile("PathFiles/" + pathFile)
+
+    @staticmethod
+    def readPointsFile(filePath):
+        """
+            This function reads points given as "x y" on every line of a file.
+        :param filePath:    the file to read
+        :return:            list of the points in the file
+        """
+        points = []
+        with open(filePath, "r") as file:
+            for line in file:
+                point = line.strip().split()
+                if len(point) == 0:
+                    continue
+                points.append(PixelPosition(int(point[0]), int(point[1])))
+        return points
+
+    def legCostMatrix(self, points, withPaths=False):
+        """
+            This function finds the cost and the distance of the cheapest path
+            between every pair of points in the current season, with one search
+            from every point that stops once all the points are reached. A point
+            off the map raises ValueError.
+        :param points:      the points, for example candidate controls of a course
+        :param withPaths:   True to also return the paths
+        :return:            the N x N cost and distance matrices, infinite where
+                            there is no path, and a dictionary of the path from
+                            point i to point j by (i, j) if withPaths is True
+        """
+        # the index of a point off the map would be that of another pixel
+        for point in points:
+            if not self.isOnMap(point):
+                raise ValueError("point outside the map: " + str(point))
+        self.prepareEdgeCosts()
+        nodes = [self.terrainGrid.index(point) for point in points]
+        costs = np.full((len(nodes), len(nodes)), np.inf)
+        distances = np.full((len(nodes), len(nodes)), np.inf)
+        paths = {}
+        for i in range(0, len(nodes)):
+            costs[i], distances[i] = self.gridSearchEngine.findCostsToTargets(nodes[i], nodes)
+            if withPaths:
+                for j in range(0, len(nodes)):
+                    if i != j and np.isfinite(costs[i, j]):
+                        paths[i, j] = [self.terrainGrid.position(node) for node in
+                                       self.gridSearchEngine.lastSearchPath(nodes[i], nodes[j])]
+        if withPaths:
+            return costs, distances, paths
+        return costs, distances
 
     def traceAllRoutesForSeason(self, season):
         """
@@ -318,6 +938,7 @@ class PathFinder():
             This function traces the path for the Summer season.
         :return:    None
         """
+        self.loadSeason(self.seasonsToConsider[0])
         self.traceAllRoutesForSeason(self.seasonsToConsider[0])
 
     def setupImageForFall(self):
@@ -329,26 +950,20 @@ class PathFinder():
             increase the time for any paths through (that is, adjacent to) easy movement
             forest (but only those paths)."
 
+            The pixels next to easy movement forest are found with shifted
+            arrays, see SeasonLayerBuilder.buildFall.
+
         :return:    None
         """
-        for i in range(0, 395):
-            for j in range(0, 500):
-                currentPixel = PixelPosition(i, j)
-
-                if self.pixelInfoMapping[currentPixel].color == self.easyForestCnD:
-                    neighbours = currentPixel.findNeighbours()
-                    for pixel in neighbours:
-                        if self.pixelInfoMapping[pixel].color != self.easyForestCnD:
-                            self.imagePixelForm[pixel.xCoordinate, pixel.yCoordinate] = (240, 128, 128, 255)  # f08080
+        self.terrainGrid.setTerrainClass(self.seasonLayerBuilder.buildFall(self.terrainGrid))
+        self.renderTerrainImage()
 
     def findPathsForFall(self):
         """
             This function traces the paths for the Fall season.
         :return:    None
         """
-        self.resetImageToUse()
-        self.setupImageForFall()
-        self.resetPixelData()
+        self.loadSeason(self.seasonsToConsider[1])
         self.traceAllRoutesForSeason(self.seasonsToConsider[1])
 
     def findingLakeEdge(self):
@@ -357,13 +972,16 @@ class PathFinder():
         :return:    coordinates of the edges of the lake
         """
         coordinatesOfEdges = []
-        for i in range(0, 395):
-            for j in range(0, 500):
-                pixel = PixelPosition(i, j)
-                if self.pixelInfoMapping[pixel].color == self.waterHnInJ:
-                    neighbours = pixel.findNeighbours()
+        terrainClass = self.terrainGrid.terrainClass
+        water = self.terrainCodes[self.waterHnInJ]
+        width = self.terrainGrid.width
+        height = self.terrainGrid.height
+        for i in range(0, width):
+            for j in range(0, height):
+                if terrainClass[j * width + i] == water:
+                    neighbours = PixelPosition(i, j).findNeighbours(width, height)
                     for neighbour in neighbours:
-                        if self.pixelInfoMapping[neighbour].color != self.waterHnInJ:
+                        if terrainClass[neighbour.yCoordinate * width + neighbour.xCoordinate] != water:
                             coordinatesOfEdges.append(neighbour)
                             break
         return coordinatesOfEdges
@@ -379,40 +997,23 @@ class PathFinder():
              and search out from there all at once. This can and should be cast as a BFS
              problem. You will be deducted points if you only perform a naive (and costly) search.
 "
+            The search is a single breadth first search started from all the
+            shore pixels at once, see SeasonLayerBuilder.waterDistance, or the
+            original search from every shore pixel when the path finder was
+            created with winterCompatible.
+
         :return:    None
         """
-        coordinatesOfEdges = self.findingLakeEdge()
-
-        for edge in coordinatesOfEdges:
-
-            queue = deque()
-            queue.append(edge)
-
-            visitedEdges = set()
-            visitedEdges.add(edge)
-
-            while (queue):
-                pixel = queue.popleft()
-                dx = abs(pixel.xCoordinate - edge.xCoordinate)
-                dy = abs(pixel.yCoordinate - edge.yCoordinate)
-                if dx == 7 or dy == 7:
-                    break
-                if dx < 7 or dy < 7:
-                    self.imagePixelForm[pixel.xCoordinate, pixel.yCoordinate] = (92, 242, 237, 255)
-                for p in pixel.findImmediateNeighbours():
-                    if p not in visitedEdges and self.pixelInfoMapping[p].color == self.waterHnInJ:
-                        queue.append(p)
-                        visitedEdges.add(p)
-        self.imageUsed.show()
+        self.terrainGrid.setTerrainClass(self.seasonLayerBuilder.buildWinter(self.terrainGrid))
+        self.renderTerrainImage()
 
     def findPathsForWinter(self):
         """
             This function traces the paths for the Winter season.
         :return:    None
         """
-        self.resetImageToUse()
-        self.setupImageForWinter()
-        self.resetPixelData()
+        self.loadSeason(self.seasonsToConsider[2])
+        self.imageUsed.show()
         self.traceAllRoutesForSeason(self.seasonsToConsider[2])
 
     def setupImageForSpring(self):
@@ -430,98 +1031,174 @@ class PathFinder():
             on the white course linked above should now be underwater! Like in the case
             of Winter, this can and should be cast as a BFS problem."
 
+            The flooded pixels are found in one pass over the grid, see
+            SeasonLayerBuilder.mudFlood, or with the original search from every
+            shore pixel when the path finder was created with springCompatible.
+
         :return:    None
         """
-        coordinatesOfEdges = self.findingLakeEdge()
-
-        for curr in coordinatesOfEdges:
-
-            queue = deque()
-            queue.append(curr)
-            visited = set()
-            visited.add(curr)
-
-            while (queue):
-                pixel = queue.popleft()
-
-                dx = abs(pixel.xCoordinate - curr.xCoordinate)
-                dy = abs(pixel.yCoordinate - curr.yCoordinate)
-
-                if dx == 15 or dy == 15:
-                    break
-
-                if self.pixelInfoMapping[curr].elevation - self.pixelInfoMapping[pixel].elevation > - 1:
-                    self.imagePixelForm[pixel.xCoordinate, pixel.yCoordinate] = (139, 101, 8, 255)
-
-                for p in pixel.findImmediateNeighbours():
-                    if p not in visited and self.pixelInfoMapping[p].color != self.waterHnInJ and \
-                            self.pixelInfoMapping[p].color != self.outside:
-                        visited.add(p)
-                        elevation_diff = self.pixelInfoMapping[curr].elevation - self.pixelInfoMapping[p].elevation
-                        if elevation_diff > -1:
-                            queue.append(p)
-        self.imageUsed.show()
+        self.terrainGrid.setTerrainClass(self.seasonLayerBuilder.buildSpring(self.terrainGrid))
+        self.renderTerrainImage()
 
     def findPathsForSpring(self):
         """
             This function traces the paths for the Spring season.
         :return:    None
         """
-        self.resetImageToUse()
-        self.setupImageForSpring()
-        self.resetPixelData()
+        self.loadSeason(self.seasonsToConsider[3])
+        self.imageUsed.show()
         self.traceAllRoutesForSeason(self.seasonsToConsider[3])
 
-    def traceRoute(self, routeFile, seasonToUse):
+    def solveRoute(self, routeFile, seasonToUse):
         """
-            This function traces the route given in the file passed
-            and uses the given season.
+            This function finds the paths of all legs of the route
+            given in the file passed, on the current terrain.
         :param routeFile:       the file to use for getting points on path
-        :param seasonToUse:     the season to use for terrain path
-        :return: None
+        :param seasonToUse:     the season the terrain is set up for
+        :return:                the result of the route
         """
         # find the points on the route to be traced
-        pointsOnRoute = self.getPointsOnRoute(routeFile)
+        return self.solvePoints(self.getPointsOnRoute(routeFile), seasonToUse, routeFile)
+
+    def solvePoints(self, pointsOnRoute, seasonToUse, routeFile=None):
+        """
+            This function finds the paths of all legs between
+            the points passed, on the current terrain.
+        :param pointsOnRoute:   the points on the route
+        :param seasonToUse:     the season the terrain is set up for
+        :param routeFile:       the file the points were read from, if any
+        :return:                the result of the route
+        """
+        if self.legRunner is not None:
+            return self.legRunner.solveLegs(routeFile, seasonToUse, pointsOnRoute)
+
         start = time.time()
+        result = RouteResult(routeFile, seasonToUse, pointsOnRoute)
+        if self.instrumentation is not None:
+            self.instrumentation.startRun(routeFile, seasonToUse, self.gridSearchEngine.size)
 
+        # traverse the points on the route
         startPoint = pointsOnRoute[0]
+        for point in range(1, len(pointsOnRoute)):
+            endPoint = pointsOnRoute[point]
+            # find the minimum path and the distance to reach next point
+            path, distance = self.findPath(startPoint, endPoint)
+            result.addLeg(path, distance, self.lastBound)
+            startPoint = endPoint
+
+        result.timeTaken = time.time() - start
+        if self.instrumentation is not None:
+            self.instrumentation.finishRun()
+        return result
+
+    def solveScoreCourse(self, routeFile, seasonToUse, exactLimit=12, timeBudget=1.0):
+        """
+            This function finds the fastest order to visit the controls given in
+            the file, keeping the first point as the start and the last as the
+            finish, and the paths of the legs in that order. The time taken by
+            the cost matrix and by the solver are kept in the timings of the result.
+        :param routeFile:       the file with the start, the controls and the finish
+        :param seasonToUse:     the season to use for terrain path
+        :param exactLimit:      the most controls solved exactly, larger sets use local search
+        :param timeBudget:      the seconds the local search may take
+        :return:                the result of the route through the controls in the best order
+        """
+        points = self.getPointsOnRoute(routeFile)
+
+        start = time.time()
+        costs, distances, paths = self.legCostMatrix(points, withPaths=True)
+        matrixTime = time.time() - start
+
+        start = time.time()
+        order, cost = ControlOrderSolver(costs, 0, len(points) - 1, exactLimit, timeBudget).solve()
+        solverTime = time.time() - start
+
+        result = RouteResult(routeFile, seasonToUse, [points[i] for i in order])
+        for i in range(1, len(order)):
+            result.addLeg(paths.get((order[i - 1], order[i]), []), distances[order[i - 1], order[i]])
+        result.timeTaken = matrixTime + solverTime
+        result.timings = {'matrix': matrixTime, 'solver': solverTime}
+        return result
 
-        total_distance = 0
+    def traceScoreCourse(self, routeFile, seasonToUse):
+        """
+            This function traces the fastest order of the controls given in the
+            file passed and uses the given season.
+        :param routeFile:       the file with the start, the controls and the finish
+        :param seasonToUse:     the season to use for terrain path
+        :return: None
+        """
+        result = self.solveScoreCourse(routeFile, seasonToUse)
+        newImageToLoad = self.renderRoute(result)
+        self.reportRoute(result, newImageToLoad, "score_")
+        print("Control order: " + " ".join(str(point) for point in result.pointsOnRoute))
+        print("Cost matrix time: " + str(result.timings['matrix']))
+        print("Solver time: " + str(result.timings['solver']))
 
+        # *********** Comment this if u don't want the image to pop up when its generated. ***********
+        newImageToLoad.show()
+
+    def renderRoute(self, result):
+        """
+            This function draws the paths of a route on the image being used.
+        :param result:  the result of the route
+        :return:        the image with the route
+        """
         # get the image to be used
-        newImageToLoad = Image.new("RGB", (395, 500), "white")
+        newImageToLoad = Image.new("RGB", self.imageUsed.size, "white")
         newImageToLoad.paste(self.imageUsed, (0, 0))
         imagePixelForm = newImageToLoad.load()
 
         # set the red color at the start point
-        self.setVisitedColor(startPoint, imagePixelForm)
+        self.setVisitedColor(result.pointsOnRoute[0], imagePixelForm)
 
-        # traverse the points on the route
-        for point in range(1, len(pointsOnRoute)):
-            endPoint = pointsOnRoute[point]
+        for point in range(1, len(result.pointsOnRoute)):
             # assign red color to new point
-            self.setVisitedColor(endPoint, imagePixelForm)
-
-            # find the minimum path and the distance to reach next point
-            path, distance = self.aStarImplementation(startPoint, endPoint)
-
-            # calculate the total distace
-            total_distance += distance
+            self.setVisitedColor(result.pointsOnRoute[point], imagePixelForm)
             # color the path between the 2 points
-            self.tracePath(path, imagePixelForm)
-            startPoint = endPoint
+            self.tracePath(result.legPaths[point - 1], imagePixelForm)
+
+        return newImageToLoad
 
+    def reportRoute(self, result, image, namePrefix=""):
+        """
+            This function prints the result of a route and saves its image.
+        :param result:      the result of the route
+        :param image:       the image with the route
+        :param namePrefix:  text put before the route file in the name of the image
+        :return:            None
+        """
         # *********************************** Print output ***************************************
 
-        print("\n\t\t----- "+str(routeFile)+"----- ")
+        print("\n\t\t----- "+str(result.routeFile)+"----- ")
 
-        print("Total Distance: " + str(total_distance))
-        print("Total Time Taken:" + str(time.time() - start))
+        print("Total Distance: " + str(result.totalDistance()))
+        print("Total Time Taken:" + str(result.timeTaken))
+        if result.suboptimalityBound() is not None:
+            print("Suboptimality Bound: " + str(result.suboptimalityBound()))
 
         # Save the image with path
-        filename = seasonToUse + routeFile
+        filename = result.season + namePrefix + result.routeFile
         filename = filename[0:len(filename) - 4] + ".png"
-        newImageToLoad.save("GeneratedPaths/"+filename)
+        image.save("GeneratedPaths/"+filename)
+
+        # the pixels reached by the searches, next to the image of the route
+        if self.instrumentation is not None and self.instrumentation.heatmap:
+            exploredImage = self.instrumentation.exploredImage(self.imageUsed, result.season, result.routeFile)
+            if exploredImage is not None:
+                exploredImage.save("GeneratedPaths/" + filename[0:len(filename) - 4] + "_explored.png")
+
+    def traceRoute(self, routeFile, seasonToUse):
+        """
+            This function traces the route given in the file passed
+            and uses the given season.
+        :param routeFile:       the file to use for getting points on path
+        :param seasonToUse:     the season to use for terrain path
+        :return: None
+        """
+        result = self.solveRoute(routeFile, seasonToUse)
+        newImageToLoad = self.renderRoute(result)
+        self.reportRoute(result, newImageToLoad)
 
         # *********** Comment this if u don't want the image to pop up when its generated. ***********
         newImageToLoad.show()
@@ -539,4 +1216,24 @@ class PathFinder():
         print("\n\n************** WINTER **************")
         self.findPathsForWinter()
         print("\n\n************** SPRING **************")
-        self.findPathsForSpring()
\ No newline at end of file
+        self.findPathsForSpring()
+
+    def findPathsForAllSeasonsInParallel(self, workers=None):
+        """
+            This function traces the paths for all seasons and routes at the
+            same time in worker processes. The results are printed and the
+            images saved in the same order as findPathsForAllSeasons, without
+            opening the images.
+        :param workers: the number of worker processes, None for one per cpu
+        :return:        None
+        """
+        # imported here since the runner creates path finders itself
+        from ParallelRouteRunnerClass import ParallelRouteRunner
+
+        results = ParallelRouteRunner(self, workers).run(self.seasonsToConsider, self.pathsToTrace)
+        headers = ["************** SUMMER **************", "\n\n*************** FALL ***************",
+                   "\n\n************** WINTER **************", "\n\n************** SPRING **************"]
+        for i in range(0, len(results)):
+            if i % len(self.pathsToTrace) == 0:
+                print(headers[i // len(self.pathsToTrace)])
+            self.reportRoute(*results[i])
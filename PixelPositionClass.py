@@ -57,25 +57,29 @@ class PixelPosition():
         """
         return self.value < secondPoint.value
 
-    def findNeighbours(self):
+    def findNeighbours(self, width, height):
         """
             This function returns the list of all neighbours
             of the point.
+        :param width:   the width of the map in pixels
+        :param height:  the height of the map in pixels
         :return: the list of all neighbours
         """
         neighbours = []
 
         for i in range(self.xCoordinate - 1, self.xCoordinate + 2):
             for j in range(self.yCoordinate - 1, self.yCoordinate + 2):
-                if (not (i == self.xCoordinate and j == self.yCoordinate)) and (0 <= i <= 394 and 0 <= j <= 499):
+                if (not (i == self.xCoordinate and j == self.yCoordinate)) and (0 <= i < width and 0 <= j < height):
                     neighbours.append(PixelPosition(i, j))
 
         return neighbours
 
-    def findImmediateNeighbours(self):
+    def findImmediateNeighbours(self, width, height):
         """
             This function returns the immediate neighbours
             in 4 directions of the point.
+        :param width:   the width of the map in pixels
+        :param height:  the height of the map in pixels
         :return: the list of immediate neighbours
         """
         immediateNeighbours = []
@@ -83,10 +87,10 @@ class PixelPosition():
         if self.xCoordinate - 1 > 0:
             immediateNeighbours.append(PixelPosition(self.xCoordinate - 1, self.yCoordinate))
 
-        if self.xCoordinate + 1 < 395:
+        if self.xCoordinate + 1 < width:
             immediateNeighbours.append(PixelPosition(self.xCoordinate + 1, self.yCoordinate))
 
-        if self.yCoordinate + 1 < 500:
+        if self.yCoordinate + 1 < height:
             immediateNeighbours.append(PixelPosition(self.xCoordinate, self.yCoordinate + 1))
 
         if self.yCoordinate - 1 > 0:
@@ -0,0 +1,313 @@
+"""
+    This file implements the long running server that answers
+    leg and course queries over HTTP with JSON.
+"""
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from PixelPositionClass import PixelPosition
+from ParallelRouteRunnerClass import ParallelRouteRunner
+from RouteResultClass import RouteResult
+from GridSearchEngineClass import SearchBudgetExceeded
+from EdgeCostRasterClass import EdgeCostRaster
+
+
+class RouteQueryServer():
+
+    """
+        This class loads the terrain and the layers of all seasons once and
+        then answers queries until it is stopped. Requests are read by an
+        asyncio front end, on a TCP port or a Unix socket, and the searches
+        run in a pool of worker processes sharing the terrain.
+
+        POST /leg       {"season": "summer", "start": [x, y], "end": [x, y], "path": false}
+        POST /course    {"season": "summer", "points": [[x, y], ...]} or {"season": ..., "course": "red.txt"}
+        GET  /stats     the number of requests and their latency
+        GET  /health    the seasons the server answers for
+
+        Every answer includes the time the request took in latencyMs, which
+        is also sent in the X-Latency-Ms header. With a leg cache, legs found
+        before are answered by the front end without asking a worker. Queries
+        that are not a JSON object or give a point other than [x, y] are answered
+        with 400, and bodies over maxBodyBytes with 413 without reading them.
+    """
+    __slots__ = 'pathFinder', 'runner', 'latencies', 'requestCount', 'errorCount', 'legCache', 'seasonDigests'
+
+    # the number of latest requests the latency statistics are computed over
+    latencyWindow = 1000
+    # the largest request body read, larger requests are refused without reading them
+    maxBodyBytes = 1 << 20
+
+    def __init__(self, pathFinder, workers=None, maxExpansions=None, legCache=None):
+        """
+            This is the constructor for the class.
+        :param pathFinder:      the path finder with the terrain to use
+        :param workers:         the number of worker processes, None for one per cpu
+        :param maxExpansions:   the most nodes the search of one leg may expand, None for no limit
+        :param legCache:        the LegCache to answer repeated legs from, None to search every leg
+        """
+        self.pathFinder = pathFinder
+        self.runner = ParallelRouteRunner(pathFinder, workers, maxExpansions, pathFinder.seasonsToConsider)
+        self.latencies = deque(maxlen=self.latencyWindow)
+        self.requestCount = 0
+        self.errorCount = 0
+        self.legCache = legCache
+        self.seasonDigests = {}
+
+    def run(self, host="127.0.0.1", port=8080, socketPath=None):
+        """
+            This function starts the workers and serves requests until interrupted.
+        :param host:        the address to listen on
+        :param port:        the port to listen on
+        :param socketPath:  the Unix socket to listen on instead of the port, if given
+        :return:            None
+        """
+        if self.legCache is not None:
+            # the digests of the edge costs of the seasons, used in the keys of the cache
+            for season in self.pathFinder.seasonsToConsider:
+                self.pathFinder.loadSeason(season)
+                self.seasonDigests[season] = self.pathFinder.prepareEdgeCosts().digest()
+
+        with self.runner:
+            # start every worker, which prepares all seasons, before the first query
+            workers = self.runner.workers or os.cpu_count() or 1
+            seasons = self.pathFinder.seasonsToConsider
+            futures = [self.runner.executor.submit(ParallelRouteRunner.useSeasonInWorker, seasons[i % len(seasons)])
+                       for i in range(0, workers)]
+            for future in futures:
+                future.result()
+            try:
+                asyncio.run(self.serve(host, port, socketPath))
+            except KeyboardInterrupt:
+                pass
+
+    async def serve(self, host, port, socketPath):
+        """
+            This function listens for connections.
+        :param host:        the address to listen on
+        :param port:        the port to listen on
+        :param socketPath:  the Unix socket to listen on instead of the port, if given
+        :return:            None
+        """
+        if socketPath is not None:
+            server = await asyncio.start_unix_server(self.handleConnection, path=socketPath)
+            print("Answering route queries on " + socketPath)
+        else:
+            server = await asyncio.start_server(self.handleConnection, host, port)
+            print("Answering route queries on http://" + host + ":" + str(port))
+        async with server:
+            await server.serve_forever()
+
+    async def handleConnection(self, reader, writer):
+        """
+            This function reads the requests of a connection and writes the
+            answers, keeping the connection open unless the client closes it.
+        :param reader:  the stream to read the requests from
+        :param writer:  the stream to write the answers to
+        :return:        None
+        """
+        try:
+            while True:
+                requestLine = await reader.readline()
+                if not requestLine:
+                    break
+                start = time.perf_counter()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                parts = requestLine.decode('latin-1').split()
+                contentLength = headers.get('content-length', '0')
+                if not contentLength.isdigit():
+                    # the body can not be told from the next request, so the connection is closed
+                    status, answer = 400, {'error': "malformed Content-Length: " + contentLength}
+                    headers['connection'] = 'close'
+                elif int(contentLength) > self.maxBodyBytes:
+                    status, answer = 413, {'error': "request body over " + str(self.maxBodyBytes) + " bytes"}
+                    headers['connection'] = 'close'
+                else:
+                    body = await reader.readexactly(int(contentLength))
+                    if len(parts) < 2:
+                        status, answer = 400, {'error': "malformed request line"}
+                    else:
+                        status, answer = await self.dispatch(parts[0], parts[1], body)
+
+                latency = (time.perf_counter() - start) * 1000
+                self.requestCount += 1
+                self.latencies.append(latency)
+                if status >= 400:
+                    self.errorCount += 1
+                answer['latencyMs'] = latency
+                keepAlive = headers.get('connection', '').lower() != 'close'
+                self.writeAnswer(writer, status, answer, latency, keepAlive)
+                await writer.drain()
+                print(" ".join(parts[0:2]) + " " + str(status) + " " + format(latency, ".2f") + " ms")
+                if not keepAlive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def writeAnswer(writer, status, answer, latency, keepAlive):
+        """
+            This function writes an HTTP answer with a JSON body.
+        :param writer:      the stream to write to
+        :param status:      the HTTP status code
+        :param answer:      the object to send as JSON
+        :param latency:     the time the request took in milliseconds
+        :param keepAlive:   False to ask the client to close the connection
+        :return:            None
+        """
+        reasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large",
+                   422: "Unprocessable Entity", 503: "Service Unavailable"}
+        body = json.dumps(answer).encode('utf-8')
+        head = "HTTP/1.1 " + str(status) + " " + reasons.get(status, "Error") + "\r\n" + \
+               "Content-Type: application/json\r\n" + \
+               "Content-Length: " + str(len(body)) + "\r\n" + \
+               "X-Latency-Ms: " + format(latency, ".3f") + "\r\n" + \
+               "Connection: " + ("keep-alive" if keepAlive else "close") + "\r\n\r\n"
+        writer.write(head.encode('latin-1') + body)
+
+    async def dispatch(self, method, path, body):
+        """
+            This function answers one request.
+        :param method:  the HTTP method
+        :param path:    the path requested
+        :param body:    the body of the request
+        :return:        the HTTP status code and the answer
+        """
+        if method == 'GET' and path == '/health':
+            return 200, {'seasons': list(self.pathFinder.seasonsToConsider)}
+        if method == 'GET' and path == '/stats':
+            return 200, self.latencyStatistics()
+        if method != 'POST' or path not in ('/leg', '/course'):
+            return 404, {'error': "unknown request " + method + " " + path}
+
+        try:
+            query = json.loads(body.decode('utf-8') or '{}')
+            if not isinstance(query, dict):
+                raise ValueError("the query must be a JSON object")
+            if path == '/leg':
+                return 200, await self.answerLeg(query)
+            return 200, await self.answerCourse(query)
+        except (ValueError, KeyError, TypeError, OSError) as error:
+            status = 422 if str(error).startswith("no path") else 400
+            return status, {'error': str(error)}
+        except SearchBudgetExceeded as error:
+            return 503, {'error': str(error)}
+
+    def readSeason(self, query):
+        """
+            This function returns the season of a query.
+        :param query:   the query
+        :return:        the season
+        """
+        season = query.get('season', self.pathFinder.seasonsToConsider[0])
+        if season not in self.pathFinder.seasonsToConsider:
+            raise ValueError("unknown season: " + str(season))
+        return season
+
+    def readPoint(self, coordinates):
+        """
+            This function returns the point at coordinates given as [x, y].
+        :param coordinates: the x and y coordinates
+        :return:            the point
+        """
+        if not isinstance(coordinates, list) or len(coordinates) != 2:
+            raise ValueError("a point must be given as [x, y]: " + json.dumps(coordinates))
+        x, y = int(coordinates[0]), int(coordinates[1])
+        if not (0 <= x < self.pathFinder.terrainGrid.width and 0 <= y < self.pathFinder.terrainGrid.height):
+            raise ValueError("point outside the map: " + str([x, y]))
+        return PixelPosition(x, y)
+
+    async def answerLeg(self, query):
+        """
+            This function finds the path of one leg in a worker process.
+        :param query:   the season, start and end of the leg, and whether to send the path
+        :return:        the distance of the leg and its path if asked for
+        """
+        season = self.readSeason(query)
+        path, distance, bound = await self.solveLeg(season, self.readPoint(query['start']),
+                                                    self.readPoint(query['end']))
+        answer = {'season': season, 'distance': distance}
+        if bound is not None:
+            answer['bound'] = bound
+        if query.get('path', False):
+            answer['path'] = [[point.xCoordinate, point.yCoordinate] for point in reversed(path)]
+        return answer
+
+    async def answerCourse(self, query):
+        """
+            This function finds the paths of all legs of a course at the same time.
+        :param query:   the season and the points of the course, or the name of a course in PathFiles
+        :return:        the total distance and the distance of every leg
+        """
+        season = self.readSeason(query)
+        if 'course' in query:
+            points = self.pathFinder.getPointsOnRoute(os.path.basename(str(query['course'])))
+        else:
+            points = [self.readPoint(coordinates) for coordinates in query['points']]
+        legs = await asyncio.gather(*[self.solveLeg(season, points[i - 1], points[i])
+                                      for i in range(1, len(points))])
+        result = RouteResult(query.get('course'), season, points)
+        for path, distance, bound in legs:
+            result.addLeg(path, distance, bound)
+        answer = {'season': season, 'totalDistance': result.totalDistance(), 'legDistances': result.legDistances}
+        if result.suboptimalityBound() is not None:
+            answer['bound'] = result.suboptimalityBound()
+        return answer
+
+    async def solveLeg(self, season, startPoint, endPoint):
+        """
+            This function finds the path of one leg, from the leg cache
+            if it holds the leg or else in a worker process.
+        :param season:      the season to use
+        :param startPoint:  the starting point of the leg
+        :param endPoint:    the ending point of the leg
+        :return:            the path of the leg, its distance and the bound of the search
+        """
+        terrainGrid = self.pathFinder.terrainGrid
+        engine = self.pathFinder.gridSearchEngine
+        startNode = terrainGrid.index(startPoint)
+        # the workers search with the settings of the path finder
+        search = self.pathFinder.selectSearch()
+        useCache = self.legCache is not None and not search.startswith('anytime')
+        if useCache:
+            key = (self.seasonDigests[season], EdgeCostRaster.costModelVersion, search, startNode,
+                   terrainGrid.index(endPoint))
+            cached = self.legCache.get(key)
+            if cached is not None:
+                path = [terrainGrid.position(node) for node in engine.decodePath(startNode, cached[0])]
+                return path, cached[1], cached[2]
+
+        path, distance, bound = await asyncio.get_running_loop().run_in_executor(
+            self.runner.executor, ParallelRouteRunner.solveLegInWorker, season, startPoint, endPoint,
+            self.runner.maxExpansions)
+        if useCache:
+            self.legCache.put(key, engine.encodePath(startNode, [terrainGrid.index(point) for point in path]),
+                              distance, bound)
+        return path, distance, bound
+
+    def latencyStatistics(self):
+        """
+            This function returns the statistics of the latency of the latest requests.
+        :return:    the number of requests and errors and the mean, median,
+                    95th percentile and highest latency in milliseconds
+        """
+        latencies = sorted(self.latencies)
+        statistics = {'requests': self.requestCount, 'errors': self.errorCount, 'window': len(latencies)}
+        if latencies:
+            statistics['meanMs'] = sum(latencies) / len(latencies)
+            statistics['p50Ms'] = latencies[(len(latencies) - 1) // 2]
+            statistics['p95Ms'] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            statistics['maxMs'] = latencies[-1]
+        if self.legCache is not None:
+            statistics['cache'] = self.legCache.statistics()
+        return statistics
@@ -0,0 +1,64 @@
+"""
+    This is the file for declaring the class to store
+    the result of tracing a route.
+"""
+
+
+class RouteResult():
+
+    """
+        This class stores the paths and distances of the
+        legs between the points of a route.
+    """
+    __slots__ = 'routeFile', 'season', 'pointsOnRoute', 'legPaths', 'legDistances', 'legBounds', 'timeTaken', \
+                'timings'
+
+    def __init__(self, routeFile, season, pointsOnRoute):
+        """
+            This is the constructor for the class.
+        :param routeFile:       the file the points on the route were read from
+        :param season:          the season the route was traced for
+        :param pointsOnRoute:   the points on the route
+        """
+        self.routeFile = routeFile
+        self.season = season
+        self.pointsOnRoute = pointsOnRoute
+        self.legPaths = []
+        self.legDistances = []
+        self.legBounds = []
+        self.timeTaken = 0
+        self.timings = {}
+
+    def addLeg(self, path, distance, bound=None):
+        """
+            This function adds the next leg of the route.
+        :param path:        the path of the leg
+        :param distance:    the distance of the leg
+        :param bound:       the proven largest ratio of the cost of the leg to the
+                            optimal cost, None if the search gave no bound
+        :return:            None
+        """
+        self.legPaths.append(path)
+        self.legDistances.append(distance)
+        self.legBounds.append(bound)
+
+    def suboptimalityBound(self):
+        """
+            This function returns the proven largest ratio of the cost of the
+            route to the optimal cost, the largest bound of its legs.
+        :return:    the bound, None if any leg has no bound
+        """
+        if not self.legBounds or None in self.legBounds:
+            return None
+        return max(self.legBounds)
+
+    def totalDistance(self):
+        """
+            This function returns the total distance of the route,
+            adding up the legs in the order of the route.
+        :return:    the total distance
+        """
+        total_distance = 0
+        for distance in self.legDistances:
+            total_distance += distance
+        return total_distance
@@ -0,0 +1,157 @@
+"""
+    This file implements collecting the counters and timings
+    of the searches of every leg and the pixels they explored.
+"""
+import json
+import time
+import numpy as np
+from PIL import Image
+
+
+class SearchInstrumentation():
+
+    """
+        This class records, for every leg found by the grid engine or by the
+        hierarchical graph, which leaves its counters and the pixels it reached
+        in the grid engine, the time taken and the counters of the search: the nodes expanded, the entries
+        pushed on the queue, the stale entries popped and the nodes reopened.
+        Legs are grouped in runs, one per route traced, and every run gets a
+        summary of its legs.
+
+        With heatmap set, the pixels reached by the searches of a run are
+        counted as well and can be drawn over the terrain image. Nothing is
+        recorded unless an instrumentation is set on the path finder.
+    """
+    __slots__ = 'runs', 'currentRun', 'heatmap', 'explored', 'exploredMaps', 'legStart', 'searchNumber'
+
+    def __init__(self, heatmap=False):
+        """
+            This is the constructor for the class.
+        :param heatmap:     True to count the pixels reached by the searches
+        """
+        self.runs = []
+        self.currentRun = None
+        self.heatmap = heatmap
+        self.explored = None
+        self.exploredMaps = {}
+        self.legStart = 0.0
+        self.searchNumber = 0
+
+    def startRun(self, routeFile, season, size):
+        """
+            This function starts recording the legs of a route.
+        :param routeFile:   the file the points on the route were read from
+        :param season:      the season of the route
+        :param size:        the number of pixels of the map
+        :return:            None
+        """
+        self.currentRun = {'routeFile': routeFile, 'season': season, 'legs': []}
+        if self.heatmap:
+            self.explored = np.zeros(size, dtype=np.uint16)
+
+    def startLeg(self, searchEngine):
+        """
+            This function starts recording a leg, clearing the counters of the search engine.
+        :param searchEngine:    the grid search engine finding the leg, or keeping the
+                                counters of the hierarchical graph finding it
+        :return:                None
+        """
+        searchEngine.recordCounters(0, 0, 0, 0)
+        self.searchNumber = searchEngine.searchNumber
+        self.legStart = time.perf_counter()
+
+    def recordLeg(self, searchEngine, startNode, endNode, search, distance, cached=False):
+        """
+            This function records a leg once it is found, with the counters
+            and the pixels reached of the search that ran.
+        :param searchEngine:    the grid search engine that found the leg or
+                                keeps the counters of the search that did
+        :param startNode:       the starting node
+        :param endNode:         the ending node
+        :param search:          the name of the search used
+        :param distance:        the distance of the leg
+        :param cached:          True if the leg was taken from the leg cache
+        :return:                None
+        """
+        seconds = time.perf_counter() - self.legStart
+        if self.currentRun is None:
+            self.startRun(None, None, searchEngine.size)
+        width = searchEngine.width
+        self.currentRun['legs'].append({'start': [startNode % width, startNode // width],
+                                        'end': [endNode % width, endNode // width],
+                                        'search': search, 'cached': cached, 'seconds': seconds,
+                                        'distance': distance,
+                                        'nodesExpanded': searchEngine.nodesExpanded,
+                                        'nodesPushed': searchEngine.nodesPushed,
+                                        'stalePops': searchEngine.stalePops,
+                                        'reopenedNodes': searchEngine.reopenedNodes})
+
+        if self.heatmap and not cached:
+            # the nodes stamped by the searches of this leg were reached by them
+            reached = np.asarray(searchEngine.visitStamp) > self.searchNumber
+            if searchEngine.backwardStamp is not None:
+                reached |= np.asarray(searchEngine.backwardStamp) > self.searchNumber
+            self.explored += reached
+
+    def finishRun(self):
+        """
+            This function ends the current run and adds the summary of its legs.
+        :return:    the run
+        """
+        run = self.currentRun
+        if run is None:
+            return None
+        legs = run['legs']
+        seconds = sum(leg['seconds'] for leg in legs)
+        summary = {'legs': len(legs), 'cachedLegs': sum(1 for leg in legs if leg['cached']), 'seconds': seconds}
+        for counter in ('nodesExpanded', 'nodesPushed', 'stalePops', 'reopenedNodes'):
+            summary[counter] = sum(leg[counter] for leg in legs)
+        summary['nodesPerSecond'] = summary['nodesExpanded'] / seconds if seconds > 0 else 0
+        if legs:
+            summary['slowestLeg'] = max(range(0, len(legs)), key=lambda i: legs[i]['seconds'])
+        run['summary'] = summary
+
+        if self.heatmap:
+            self.exploredMaps[(run['season'], run['routeFile'])] = self.explored
+            self.explored = None
+        self.runs.append(run)
+        self.currentRun = None
+        return run
+
+    def exploredImage(self, terrainImage, season, routeFile):
+        """
+            This function draws the pixels reached by the searches of a run over the
+            darkened terrain, from yellow for pixels reached once to red for the most.
+        :param terrainImage:    the image of the terrain of the season
+        :param season:          the season of the run
+        :param routeFile:       the route file of the run
+        :return:                the image, None if the pixels of the run were not counted
+        """
+        explored = self.exploredMaps.get((season, routeFile))
+        if explored is None:
+            return None
+        width, height = terrainImage.size
+        pixels = np.asarray(terrainImage.convert("RGB"), dtype=np.float32) * 0.35
+        counts = explored.reshape(height, width).astype(np.float32)
+        reached = counts > 0
+        intensity = counts / max(1.0, float(counts.max()))
+        pixels[reached, 0] = 255
+        pixels[reached, 1] = 255 * (1 - intensity[reached])
+        pixels[reached, 2] = 0
+        return Image.fromarray(pixels.astype(np.uint8), "RGB")
+
+    def report(self):
+        """
+            This function returns the runs recorded so far.
+        :return:    dictionary of the runs with their legs and summaries
+        """
+        return {'runs': self.runs}
+
+    def save(self, reportFilePath):
+        """
+            This function writes the runs recorded so far as JSON.
+        :param reportFilePath:  the file to write to
+        :return:                None
+        """
+        with open(reportFilePath, "w") as reportFile:
+            json.dump(self.report(), reportFile, indent=2)
@@ -0,0 +1,300 @@
+"""
+    This file implements the builders of the terrain class
+    layers of the seasons, working on whole arrays at once.
+"""
+from collections import deque
+import numpy as np
+
+
+class SeasonLayerBuilder():
+
+    """
+        This class computes the terrain classes of a season
+        from the terrain classes and elevations of the map.
+    """
+    __slots__ = 'roleCodes', 'springCompatible', 'winterCompatible'
+
+    # version of the layer rules, compiled season layers are rebuilt when it changes
+    layerVersion = 3
+
+    iceDistance = 7
+    mudDistance = 15
+    mudElevationGain = 1
+
+    # *************************************** Assign the 4 immediate and 8 neighbour steps ***************************
+    immediateSteps = [(0, -1), (-1, 0), (1, 0), (0, 1)]
+    neighbourSteps = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx != 0 or dy != 0]
+
+    def __init__(self, terrainCodes, roleColors, springCompatible=False, winterCompatible=False):
+        """
+            This is the constructor for the class.
+        :param terrainCodes:        dictionary of the class code of every color
+        :param roleColors:          dictionary of the colors of 'easyForest', 'water',
+                                    'outside', 'fall', 'winter' and 'spring'
+        :param springCompatible:    True to build the Spring layer with the search
+                                    from every shore pixel used originally
+        :param winterCompatible:    True to build the Winter layer with the search
+                                    from every shore pixel used originally
+        """
+        self.roleCodes = {role: terrainCodes[color] for role, color in roleColors.items()}
+        self.springCompatible = springCompatible
+        self.winterCompatible = winterCompatible
+
+    def rulesVersion(self):
+        """
+            This function returns the version of the rules the layers are built with.
+        :return:    the version of the layer rules
+        """
+        return str(self.layerVersion) + ("-winter-compatible" if self.winterCompatible else "") + \
+            ("-compatible" if self.springCompatible else "")
+
+    @staticmethod
+    def shiftedAny(mask, steps):
+        """
+            This function marks every pixel that has a marked neighbour.
+        :param mask:    boolean array of the marked pixels
+        :param steps:   the (dx, dy) steps to the neighbours to check
+        :return:        boolean array of the pixels next to a marked pixel
+        """
+        height, width = mask.shape
+        result = np.zeros_like(mask)
+        for dx, dy in steps:
+            # the neighbour of the pixel at (x, y) is at (x + dx, y + dy)
+            result[max(0, -dy):height - max(0, dy), max(0, -dx):width - max(0, dx)] |= \
+                mask[max(0, dy):height - max(0, -dy), max(0, dx):width - max(0, -dx)]
+        return result
+
+    def buildFall(self, terrainGrid):
+        """
+            This function computes the terrain classes for the Fall season, where
+            every pixel next to easy movement forest is covered by leaves.
+        :param terrainGrid: the terrain grid to use
+        :return:            the terrain classes of the season
+        """
+        terrainClass = terrainGrid.terrainClass.reshape(terrainGrid.height, terrainGrid.width).copy()
+        easyForest = terrainClass == self.roleCodes['easyForest']
+        terrainClass[self.shiftedAny(easyForest, self.neighbourSteps) & ~easyForest] = self.roleCodes['fall']
+        return terrainClass
+
+    def waterDistance(self, terrainGrid):
+        """
+            This function finds the number of steps from every water pixel to
+            the nearest non-water pixel, with one breadth first search started
+            from all the shore pixels at once.
+        :param terrainGrid: the terrain grid to use
+        :return:            array of the distances, 0 for pixels that are not water
+                            and 65535 for water that can not reach any other pixel
+        """
+        water = (terrainGrid.terrainClass == self.roleCodes['water']).reshape(terrainGrid.height, terrainGrid.width)
+        unreached = np.iinfo(np.uint16).max
+        distance = np.where(water, unreached, 0).astype(np.uint16)
+
+        frontier = ~water
+        steps = 0
+        while frontier.any():
+            steps += 1
+            frontier = self.shiftedAny(frontier, self.immediateSteps) & (distance == unreached)
+            distance[frontier] = steps
+        return distance
+
+    def shorePixels(self, terrainGrid):
+        """
+            This function finds the shore pixels the original searches started from:
+            every water pixel contributes its first non-water neighbour, in the order
+            the neighbours of a PixelPosition are listed.
+        :param terrainGrid: the terrain grid to use
+        :return:            list of the indices of the shore pixels, in order
+        """
+        width = terrainGrid.width
+        height = terrainGrid.height
+        water = terrainGrid.terrainClass.reshape(height, width) == self.roleCodes['water']
+        shoreOf = np.full((height, width), -1, dtype=np.int64)
+        indices = np.arange(width * height).reshape(height, width)
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                if dx == 0 and dy == 0:
+                    continue
+                rows = slice(max(0, -dy), height - max(0, dy))
+                columns = slice(max(0, -dx), width - max(0, dx))
+                neighbourRows = slice(max(0, dy), height - max(0, -dy))
+                neighbourColumns = slice(max(0, dx), width - max(0, -dx))
+                choose = water[rows, columns] & (shoreOf[rows, columns] == -1) & \
+                    ~water[neighbourRows, neighbourColumns]
+                shoreOf[rows, columns][choose] = indices[neighbourRows, neighbourColumns][choose]
+        return np.unique(shoreOf[shoreOf >= 0]).tolist()
+
+    @staticmethod
+    def immediateNeighbours(pixel, width, height):
+        """
+            This function returns the immediate neighbours of a pixel the way
+            PixelPosition.findImmediateNeighbours does, skipping the first row
+            and column as the original searches did.
+        :param pixel:   the index of the pixel
+        :param width:   the width of the map
+        :param height:  the height of the map
+        :return:        list of the indices of the neighbours
+        """
+        x = pixel % width
+        y = pixel // width
+        neighbours = []
+        if x - 1 > 0:
+            neighbours.append(pixel - 1)
+        if x + 1 < width:
+            neighbours.append(pixel + 1)
+        if y + 1 < height:
+            neighbours.append(pixel + width)
+        if y - 1 > 0:
+            neighbours.append(pixel - width)
+        return neighbours
+
+    def buildWinter(self, terrainGrid):
+        """
+            This function computes the terrain classes for the Winter season,
+            where water within iceDistance steps of non-water is frozen.
+
+            This differs from the original search, see compatibleIce: the land
+            pixels on the shore are no longer iced, and water the original search
+            missed because it stopped at the first pixel iceDistance rows or
+            columns away is iced, so the Winter routes change.
+        :param terrainGrid: the terrain grid to use
+        :return:            the terrain classes of the season
+        """
+        terrainClass = terrainGrid.terrainClass.reshape(terrainGrid.height, terrainGrid.width).copy()
+        if self.winterCompatible:
+            terrainClass[self.compatibleIce(terrainGrid)] = self.roleCodes['winter']
+            return terrainClass
+        distance = self.waterDistance(terrainGrid)
+        terrainClass[(distance > 0) & (distance <= self.iceDistance)] = self.roleCodes['winter']
+        return terrainClass
+
+    def compatibleIce(self, terrainGrid):
+        """
+            This function finds the pixels iced in Winter the way the original
+            implementation did: a separate search through the water from every
+            non-water pixel next to water, icing that pixel too and stopping as
+            soon as a pixel iceDistance rows or columns away is reached.
+        :param terrainGrid: the terrain grid to use
+        :return:            boolean array of the iced pixels
+        """
+        width = terrainGrid.width
+        height = terrainGrid.height
+        water = (terrainGrid.terrainClass == self.roleCodes['water']).tolist()
+        iced = np.zeros(width * height, dtype=bool)
+
+        for edge in self.shorePixels(terrainGrid):
+            edgeX = edge % width
+            edgeY = edge // width
+
+            queue = deque([edge])
+            visited = {edge}
+            while queue:
+                pixel = queue.popleft()
+                if abs(pixel % width - edgeX) == self.iceDistance or abs(pixel // width - edgeY) == self.iceDistance:
+                    break
+                iced[pixel] = True
+                for neighbour in self.immediateNeighbours(pixel, width, height):
+                    if neighbour not in visited and water[neighbour]:
+                        visited.add(neighbour)
+                        queue.append(neighbour)
+
+        return iced.reshape(height, width)
+
+    def mudFlood(self, terrainGrid):
+        """
+            This function finds the pixels flooded in Spring with one pass over
+            the grid. A pixel is flooded when it can be reached from a water pixel
+            in at most mudDistance steps through pixels that are neither water nor
+            outside, none of them more than mudElevationGain above that water.
+
+            Each step of the pass keeps, for every pixel, the highest elevation of
+            the water it can be reached from so far. Higher water allows more pixels
+            to be reached, so this gives exactly the pixels of the rule above.
+
+            The original search, see compatibleMudFlood, compared elevations with
+            the shore pixel it started from instead, so this floods other pixels
+            and the Spring routes change.
+        :param terrainGrid: the terrain grid to use
+        :return:            the number of steps to every pixel (0 for water and 255
+                            for pixels not flooded) and the elevation of the water
+                            each pixel is reached from (NaN if not flooded)
+        """
+        shape = (terrainGrid.height, terrainGrid.width)
+        terrainClass = terrainGrid.terrainClass.reshape(shape)
+        elevation = terrainGrid.elevation.reshape(shape)
+        water = terrainClass == self.roleCodes['water']
+        land = ~water & (terrainClass != self.roleCodes['outside'])
+        height, width = shape
+
+        sourceElevation = np.where(water, elevation, -np.inf).astype(np.float32)
+        steps = np.where(water, 0, 255).astype(np.uint8)
+
+        for step in range(1, self.mudDistance + 1):
+            bestSource = np.full(shape, -np.inf, dtype=np.float32)
+            for dx, dy in self.immediateSteps:
+                target = bestSource[max(0, -dy):height - max(0, dy), max(0, -dx):width - max(0, dx)]
+                np.maximum(target, sourceElevation[max(0, dy):height - max(0, -dy), max(0, dx):width - max(0, -dx)],
+                           out=target)
+            reached = land & (elevation - bestSource <= self.mudElevationGain)
+            steps[reached & (steps == 255)] = step
+            sourceElevation = np.where(reached, np.maximum(sourceElevation, bestSource), sourceElevation)
+
+        return steps, np.where(steps == 255, np.nan, sourceElevation).astype(np.float32)
+
+    def compatibleMudFlood(self, terrainGrid):
+        """
+            This function finds the pixels flooded in Spring the way the original
+            implementation did: a separate search from every non-water pixel next
+            to water, stopping as soon as a pixel 15 rows or columns away is reached
+            and comparing elevations with the pixel the search started from.
+        :param terrainGrid: the terrain grid to use
+        :return:            boolean array of the flooded pixels
+        """
+        width = terrainGrid.width
+        height = terrainGrid.height
+        terrainClass = terrainGrid.terrainClass.reshape(height, width)
+        elevation = terrainGrid.elevation.tolist()
+        blocked = ((terrainClass == self.roleCodes['water']) |
+                   (terrainClass == self.roleCodes['outside'])).reshape(-1).tolist()
+        flooded = np.zeros(width * height, dtype=bool)
+
+        for edge in self.shorePixels(terrainGrid):
+            edgeX = edge % width
+            edgeY = edge // width
+            edgeElevation = elevation[edge]
+
+            queue = deque([edge])
+            visited = {edge}
+            while queue:
+                pixel = queue.popleft()
+                x = pixel % width
+                y = pixel // width
+                if abs(x - edgeX) == self.mudDistance or abs(y - edgeY) == self.mudDistance:
+                    break
+                if edgeElevation - elevation[pixel] > - self.mudElevationGain:
+                    flooded[pixel] = True
+
+                for neighbour in self.immediateNeighbours(pixel, width, height):
+                    if neighbour not in visited and not blocked[neighbour]:
+                        visited.add(neighbour)
+                        if edgeElevation - elevation[neighbour] > - self.mudElevationGain:
+                            queue.append(neighbour)
+
+        return flooded.reshape(height, width)
+
+    def buildSpring(self, terrainGrid):
+        """
+            This function computes the terrain classes for the Spring season,
+            where the pixels flooded from the water become mud. Unless springCompatible
+            is set, the flood of mudFlood is used, which differs from the original
+            search by about 5000 pixels and so changes the Spring routes.
+        :param terrainGrid: the terrain grid to use
+        :return:            the terrain classes of the season
+        """
+        if self.springCompatible:
+            flooded = self.compatibleMudFlood(terrainGrid)
+        else:
+            steps = self.mudFlood(terrainGrid)[0]
+            flooded = (steps > 0) & (steps != 255)
+        terrainClass = terrainGrid.terrainClass.reshape(terrainGrid.height, terrainGrid.width).copy()
+        terrainClass[flooded] = self.roleCodes['spring']
+        return terrainClass
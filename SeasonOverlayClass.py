@@ -0,0 +1,39 @@
+"""
+    This is the file for declaring the class to store the
+    changes a season makes to the base terrain.
+"""
+import numpy as np
+
+
+class SeasonOverlay():
+
+    """
+        This class stores the pixels a season changes, as the flat
+        indices of the pixels and their terrain class in the season.
+    """
+    __slots__ = 'indices', 'terrainClass'
+
+    def __init__(self, indices, terrainClass):
+        """
+            This is the constructor for the class.
+        :param indices:         the flat indices of the changed pixels
+        :param terrainClass:    the terrain class codes of the changed pixels
+        """
+        self.indices = np.asarray(indices, dtype=np.int32).reshape(-1)
+        self.terrainClass = np.asarray(terrainClass, dtype=np.uint8).reshape(-1)
+
+    @classmethod
+    def fromLayers(cls, baseTerrainClass, terrainClass):
+        """
+            This function creates the overlay between the base
+            terrain classes and the terrain classes of a season.
+        :param baseTerrainClass:    the terrain classes of the base map
+        :param terrainClass:        the terrain classes of the season
+        :return:                    the overlay of the season
+        """
+        terrainClass = np.asarray(terrainClass, dtype=np.uint8).reshape(-1)
+        indices = np.flatnonzero(np.asarray(baseTerrainClass).reshape(-1) != terrainClass)
+        return cls(indices, terrainClass[indices])
+
+    def __len__(self):
+        return len(self.indices)
@@ -0,0 +1,133 @@
+"""
+    This file implements the compiled binary terrain bundle which
+    stores the elevation and terrain class layers of all seasons.
+"""
+import hashlib
+import json
+import os
+import numpy as np
+
+
+class TerrainBundle():
+
+    """
+        This class reads and writes the terrain bundle file.
+
+        The file starts with a magic string, the format version and the
+        length of a JSON header. The header holds the checksums of the source
+        files, the version of the season layer rules and the dtype, shape and
+        offset of every layer. The layers
+        follow, aligned to 64 bytes, and are opened with memory mapping so
+        processes using the same bundle share the page cache.
+    """
+    __slots__ = 'bundleFilePath', 'header'
+
+    magic = b'PRFTERRN'
+    version = 2
+    alignment = 64
+
+    def __init__(self, bundleFilePath):
+        """
+            This is the constructor for the class.
+        :param bundleFilePath:  path of the bundle file
+        """
+        self.bundleFilePath = bundleFilePath
+        self.header = None
+
+    @staticmethod
+    def checksum(filePath):
+        """
+            This function returns the checksum of a file.
+        :param filePath:    the file to find the checksum of
+        :return:            the sha1 hex digest of the file contents
+        """
+        digest = hashlib.sha1()
+        with open(filePath, "rb") as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def readHeader(self):
+        """
+            This function reads the header of the bundle.
+        :return:    the header, or None if the file is missing or
+                    was written by another version of the format
+        """
+        if not os.path.exists(self.bundleFilePath):
+            return None
+        with open(self.bundleFilePath, "rb") as file:
+            prefix = file.read(len(self.magic) + 8)
+            if len(prefix) < len(self.magic) + 8 or prefix[0:len(self.magic)] != self.magic:
+                return None
+            version, headerLength = np.frombuffer(prefix[len(self.magic):], dtype='<u4')
+            if version != self.version:
+                return None
+            return json.loads(file.read(int(headerLength)).decode('utf-8'))
+
+    def isCurrent(self, sourceFilePaths, layerVersion):
+        """
+            This function checks whether the bundle was compiled from the
+            current contents of the source files with the current layer rules.
+        :param sourceFilePaths: the source files of the terrain
+        :param layerVersion:    the version of the rules the layers are built with
+        :return:                True if the bundle can be used else False
+        """
+        self.header = self.readHeader()
+        if self.header is None or self.header.get('layerVersion') != layerVersion:
+            return False
+        checksums = [self.checksum(filePath) for filePath in sourceFilePaths]
+        return self.header['checksums'] == checksums
+
+    def open(self):
+        """
+            This function opens all layers of the bundle with memory mapping.
+        :return:    the width, height and a dictionary of read only layers
+        """
+        if self.header is None:
+            self.header = self.readHeader()
+        layers = {}
+        for name, layer in self.header['layers'].items():
+            if np.prod(layer['shape']) == 0:
+                # empty layers can not be memory mapped
+                layers[name] = np.zeros(tuple(layer['shape']), dtype=layer['dtype'])
+                continue
+            layers[name] = np.memmap(self.bundleFilePath, dtype=layer['dtype'], mode='r',
+                                     offset=layer['offset'], shape=tuple(layer['shape']))
+        return self.header['width'], self.header['height'], layers
+
+    def write(self, sourceFilePaths, layerVersion, width, height, layers):
+        """
+            This function writes the bundle. The file is written next to the
+            bundle and then renamed, so readers never see a partial bundle.
+        :param sourceFilePaths: the source files the layers were compiled from
+        :param layerVersion:    the version of the rules the layers were built with
+        :param width:           the width of the map
+        :param height:          the height of the map
+        :param layers:          dictionary of the layer arrays to store
+        :return:                None
+        """
+        header = {'checksums': [self.checksum(filePath) for filePath in sourceFilePaths],
+                  'layerVersion': layerVersion, 'width': width, 'height': height, 'layers': {}}
+        arrays = [(name, np.ascontiguousarray(array)) for name, array in layers.items()]
+
+        # the header size depends on the offsets, so reserve enough space for them
+        offset = 0
+        for name, array in arrays:
+            header['layers'][name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+            offset += -(-array.nbytes // self.alignment) * self.alignment
+        headerLength = len(json.dumps(header)) + 16 * len(arrays) + 64
+        dataStart = -(-(len(self.magic) + 8 + headerLength) // self.alignment) * self.alignment
+        for name, array in arrays:
+            header['layers'][name]['offset'] += dataStart
+        headerBytes = json.dumps(header).encode('utf-8').ljust(headerLength)
+
+        temporaryFilePath = self.bundleFilePath + "." + str(os.getpid()) + ".tmp"
+        with open(temporaryFilePath, "wb") as file:
+            file.write(self.magic)
+            file.write(np.array([self.version, headerLength], dtype='<u4').tobytes())
+            file.write(headerBytes)
+            for name, array in arrays:
+                file.seek(header['layers'][name]['offset'])
+                file.write(array.tobytes())
+        os.replace(temporaryFilePath, self.bundleFilePath)
+        self.header = header
@@ -0,0 +1,158 @@
+"""
+    This is the file for declaring the class to store the
+    terrain data of the whole map in flat arrays.
+"""
+import numpy as np
+from PixelDataClass import PixelData
+from PixelPositionClass import PixelPosition
+from SeasonOverlayClass import SeasonOverlay
+
+
+class TerrainGrid():
+
+    """
+        This class stores the elevation, terrain class, speed and passability
+        of every pixel in contiguous arrays indexed by y * width + x.
+        It can be used in place of the old PixelPosition -> PixelData
+        dictionary.
+
+        The terrain classes of the base map are never changed. A season
+        is applied as an overlay on a working copy, so switching seasons
+        only touches the pixels the seasons change. Pixels edited on top
+        of a season are undone when the next overlay is applied.
+    """
+    __slots__ = 'width', 'height', 'elevation', 'baseTerrainClass', 'terrainClass', 'speed', 'colors', \
+                'speedTable', 'passableTable', 'passable', 'activeOverlay', 'editedIndices'
+
+    def __init__(self, width, height, elevation, terrainClass, colors, speedTable, passableTable=None):
+        """
+            This is the constructor for the class.
+        :param width:           the width of the map in pixels
+        :param height:          the height of the map in pixels
+        :param elevation:       the elevations of all pixels, in row major order
+        :param terrainClass:    the terrain class code of all pixels of the base map, in row major order
+        :param colors:          the hex color of every terrain class code
+        :param speedTable:      the speed of every terrain class code
+        :param passableTable:   whether every terrain class code can be entered,
+                                None for the codes with a speed above 0
+        """
+        self.width = width
+        self.height = height
+        self.elevation = np.ascontiguousarray(elevation, dtype=np.float32).reshape(-1)
+        self.baseTerrainClass = np.asarray(terrainClass, dtype=np.uint8).reshape(-1).view()
+        self.baseTerrainClass.flags.writeable = False
+        self.terrainClass = self.baseTerrainClass.copy()
+        self.colors = list(colors)
+        self.speedTable = np.asarray(speedTable, dtype=np.float32)
+        self.speed = self.speedTable[self.terrainClass]
+        self.passableTable = self.speedTable > 0 if passableTable is None else np.asarray(passableTable, dtype=bool)
+        self.passable = self.passableTable[self.terrainClass]
+        self.activeOverlay = None
+        self.editedIndices = np.zeros(0, dtype=np.int64)
+
+    def index(self, point):
+        """
+            This function returns the flat index of a point.
+        :param point:   the point to find the index of
+        :return:        the flat index of the point
+        """
+        return point.yCoordinate * self.width + point.xCoordinate
+
+    def position(self, index):
+        """
+            This function returns the point at a flat index.
+        :param index:   the flat index
+        :return:        the point at that index
+        """
+        return PixelPosition(index % self.width, index // self.width)
+
+    def colorAt(self, index):
+        """
+            This function returns the hex color of the pixel at an index.
+        :param index:   the flat index of the pixel
+        :return:        the hex color of the pixel
+        """
+        return self.colors[self.terrainClass[index]]
+
+    def applyOverlay(self, overlay):
+        """
+            This function replaces the active overlay. The pixels of the previous
+            overlay are restored from the base map before the new one is applied.
+        :param overlay: the overlay to apply, None for the base map
+        :return:        None
+        """
+        if self.activeOverlay is not None:
+            indices = self.activeOverlay.indices
+            self.setClasses(indices, self.baseTerrainClass[indices])
+        if len(self.editedIndices) > 0:
+            indices = self.editedIndices
+            self.setClasses(indices, self.baseTerrainClass[indices])
+            self.editedIndices = np.zeros(0, dtype=np.int64)
+        if overlay is not None:
+            self.setClasses(overlay.indices, overlay.terrainClass)
+        self.activeOverlay = overlay
+
+    def setClasses(self, indices, terrainClass):
+        """
+            This function sets the terrain class of pixels together with their speed and passability.
+        :param indices:         the flat indices of the pixels
+        :param terrainClass:    the terrain class code of every pixel, or one for all
+        :return:                None
+        """
+        self.terrainClass[indices] = terrainClass
+        self.speed[indices] = self.speedTable[terrainClass]
+        self.passable[indices] = self.passableTable[terrainClass]
+
+    def editPixels(self, indices, terrainClass=None, speed=None):
+        """
+            This function changes pixels of the current terrain, for example an
+            area closed on race day. A new terrain class also sets the speed of
+            the class, unless another speed is given.
+        :param indices:         the flat indices of the pixels to change
+        :param terrainClass:    the new terrain class code, None to keep it
+        :param speed:           the new speed, None for the speed of the terrain class
+        :return:                None
+        """
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1)
+        if terrainClass is not None:
+            self.setClasses(indices, terrainClass)
+        if speed is not None:
+            self.speed[indices] = speed
+        self.editedIndices = np.union1d(self.editedIndices, indices)
+
+    def setTerrainClass(self, terrainClass):
+        """
+            This function sets the terrain classes of all pixels,
+            keeping only the differences to the base map as overlay.
+        :param terrainClass:    the new terrain class codes
+        :return:                the overlay that was applied
+        """
+        overlay = SeasonOverlay.fromLayers(self.baseTerrainClass, terrainClass)
+        self.applyOverlay(overlay)
+        return overlay
+
+    def __getitem__(self, key):
+        """
+            This function returns the pixel data of a point or flat index,
+            the same way the old dictionary did.
+        :param key: the point or the flat index
+        :return:    the pixel data at that location
+        """
+        index = key if isinstance(key, (int, np.integer)) else self.index(key)
+        return PixelData(float(self.elevation[index]), self.colorAt(index), float(self.speed[index]))
+
+    def __contains__(self, point):
+        """
+            This function checks whether a point lies on the map.
+        :param point:   the point to check for
+        :return:        True if the point is on the map else False
+        """
+        return 0 <= point.xCoordinate < self.width and 0 <= point.yCoordinate < self.height
+
+    def __len__(self):
+        return self.width * self.height
+
+    def __iter__(self):
+        for i in range(0, self.width):
+            for j in range(0, self.height):
+                yield PixelPosition(i, j)
@@ -0,0 +1,77 @@
+"""
+    This file implements the mapping of the terrain colors
+    to the small integer class codes used everywhere else.
+"""
+import numpy as np
+
+
+class TerrainPalette():
+
+    """
+        This class gives every terrain color, the colors of the map and those
+        of the seasons, a class code from 0 to 255 in the order they are given.
+        Pixels are classified once when the terrain image is loaded, after
+        which the terrain is only handled as codes: the speed table and the
+        passability table are indexed by code.
+    """
+    __slots__ = 'colors', 'codes', 'speedTable', 'passableTable', 'packedColors', 'packedCodes'
+
+    def __init__(self, colors, speeds, blockedColors):
+        """
+            This is the constructor for the class.
+        :param colors:          the hex colors of the terrain classes, in the order of their codes
+        :param speeds:          the speed of every terrain class
+        :param blockedColors:   the colors of the terrain classes that can not be entered
+        """
+        if len(colors) > 256:
+            raise ValueError("a palette holds at most 256 terrain colors, " + str(len(colors)) + " were given")
+        self.colors = [color.lower() for color in colors]
+        self.codes = {color: code for code, color in enumerate(self.colors)}
+        self.speedTable = np.asarray(speeds, dtype=np.float32)
+        blockedCodes = [self.code(color) for color in blockedColors]
+        self.passableTable = np.ones(len(self.colors), dtype=bool)
+        self.passableTable[blockedCodes] = False
+
+        # the colors packed as 0xRRGGBB and sorted, to classify pixels with a binary search
+        packed = np.array([int(color[1:], 16) for color in self.colors], dtype=np.uint32)
+        order = np.argsort(packed)
+        self.packedColors = packed[order]
+        self.packedCodes = order.astype(np.uint8)
+
+    def code(self, color):
+        """
+            This function returns the class code of a color.
+        :param color:   the hex color
+        :return:        the class code
+        """
+        code = self.codes.get(color.lower())
+        if code is None:
+            raise ValueError("unknown terrain color " + str(color) + ", the known colors are " +
+                             ", ".join(self.colors))
+        return code
+
+    def blockedCodes(self):
+        """
+            This function returns the class codes that can not be entered.
+        :return:    list of the class codes
+        """
+        return [code for code in range(0, len(self.colors)) if not self.passableTable[code]]
+
+    def classify(self, pixels):
+        """
+            This function returns the class code of every pixel of an image.
+        :param pixels:  array of height x width x 3 (or 4, the alpha is ignored) color values
+        :return:        the class codes of the pixels in row major order
+        """
+        pixels = np.asarray(pixels, dtype=np.uint32)
+        packed = ((pixels[:, :, 0] << 16) | (pixels[:, :, 1] << 8) | pixels[:, :, 2]).reshape(-1)
+        positions = np.minimum(np.searchsorted(self.packedColors, packed), len(self.packedColors) - 1)
+        unknown = self.packedColors[positions] != packed
+        if unknown.any():
+            width = pixels.shape[1]
+            first = int(np.flatnonzero(unknown)[0])
+            colors = ['#%06x' % color for color in np.unique(packed[unknown])[0:5]]
+            raise ValueError(str(int(unknown.sum())) + " pixels have colors that are not terrain colors, "
+                             "the first at (" + str(first % width) + ", " + str(first // width) + "): " +
+                             ", ".join(colors))
+        return self.packedCodes[positions]
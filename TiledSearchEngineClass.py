@@ -0,0 +1,148 @@
+"""
+    This file implements the A* search on a tiled terrain store.
+"""
+from heapq import heappush, heappop
+from math import degrees, atan
+from GridSearchEngineClass import GridSearchEngine, SearchBudgetExceeded
+
+
+class TiledSearchEngine():
+
+    """
+        This class implements A* on integer node ids (y * width + x) of a
+        tiled terrain store. The costs of the edges are computed from the
+        tiles as the search reaches them and the state of the search is kept
+        only for the nodes it visits, so the memory used depends on the size
+        of the search and not on the size of the map.
+    """
+    __slots__ = 'store', 'width', 'height', 'speedTable', 'blocked', 'costPerDistance', 'nodesExpanded', 'lastCost'
+
+    # the steepest downhill step makes moving at most this many times faster than on flat ground
+    maxSlopeFactor = 1.9
+
+    def __init__(self, store):
+        """
+            This is the constructor for the class.
+        :param store:   the open tiled terrain store to search on
+        """
+        self.store = store
+        self.width = store.width
+        self.height = store.height
+        self.speedTable = store.header['speedTable']
+        self.blocked = [code in store.header['blockedCodes'] for code in range(0, 256)]
+        # the lowest cost per unit of distance of any edge, for an admissible heuristic
+        self.costPerDistance = 1 / (max(self.speedTable) * self.maxSlopeFactor)
+        self.nodesExpanded = 0
+        self.lastCost = 0.0
+
+    def lowerBound(self, x, y, targetX, targetY):
+        """
+            This function returns a lower bound of the cost from a pixel to a target.
+        :param x:           the x coordinate of the pixel
+        :param y:           the y coordinate of the pixel
+        :param targetX:     the x coordinate of the target
+        :param targetY:     the y coordinate of the target
+        :return:            the lower bound of the cost
+        """
+        dx = abs(x - targetX)
+        dy = abs(y - targetY)
+        diagonal = min(dx, dy)
+        return self.costPerDistance * (diagonal * GridSearchEngine.diagonalDist +
+                                       (dx - diagonal) * GridSearchEngine.xDistLongitude +
+                                       (dy - diagonal) * GridSearchEngine.yDistLatitude)
+
+    def findPath(self, startNode, endNode, maxExpansions=None):
+        """
+            This function finds the path between 2 nodes using A*.
+        :param startNode:       the starting node
+        :param endNode:         the ending node
+        :param maxExpansions:   the most nodes the search may expand, None for no limit
+        :return:                the nodes of the path from the end node back to
+                                (but excluding) the start node and the distance
+        """
+        store = self.store
+        width = self.width
+        height = self.height
+        tileSize = store.tileSize
+        speedTable = self.speedTable
+        blocked = self.blocked
+        lowerBound = self.lowerBound
+        steps = [(dx, dy, GridSearchEngine.stepDistance(dx, dy)) for dx, dy in GridSearchEngine.stepDirections]
+        infinity = float('inf')
+        budget = infinity if maxExpansions is None else maxExpansions
+        endX = endNode % width
+        endY = endNode // width
+
+        costTillNow = {startNode: 0.0}
+        distanceTillNow = {startNode: 0.0}
+        previousNode = {startNode: -1}
+        closed = set()
+        queue = [(0.0, startNode)]
+        expanded = 0
+
+        while queue:
+            value, currentNode = heappop(queue)
+
+            # skip entries that were already expanded
+            if currentNode in closed:
+                continue
+            closed.add(currentNode)
+            expanded += 1
+            if expanded > budget:
+                self.nodesExpanded = expanded
+                raise SearchBudgetExceeded("more than " + str(maxExpansions) + " nodes expanded from node " +
+                                           str(startNode) + " to node " + str(endNode))
+
+            # if the destination is reached
+            if currentNode == endNode:
+                break
+
+            currentCost = costTillNow[currentNode]
+            currentDistance = distanceTillNow[currentNode]
+            x = currentNode % width
+            y = currentNode // width
+            currentTile = store.tileOf(x, y)
+            elevation, terrainClass = store.tile(currentTile)
+            currentElevation = elevation[(y % tileSize) * tileSize + x % tileSize]
+
+            for dx, dy, distance in steps:
+                nx = x + dx
+                ny = y + dy
+                if nx < 0 or ny < 0 or nx >= width or ny >= height:
+                    continue
+                # most neighbours lie in the tile of the current node
+                tile = store.tileOf(nx, ny)
+                if tile == currentTile:
+                    nodeElevation, nodeClass = elevation, terrainClass
+                else:
+                    nodeElevation, nodeClass = store.tile(tile)
+                index = (ny % tileSize) * tileSize + nx % tileSize
+                code = nodeClass[index]
+                if blocked[code]:
+                    continue
+
+                elevation_angle = degrees(atan((currentElevation - nodeElevation[index]) / distance))
+                pixel_speed = speedTable[code]
+                new_cost = currentCost + distance / (pixel_speed - (pixel_speed * elevation_angle / 100))
+                node = ny * width + nx
+
+                if new_cost < costTillNow.get(node, infinity):
+                    costTillNow[node] = new_cost
+                    distanceTillNow[node] = currentDistance + distance
+                    previousNode[node] = currentNode
+                    closed.discard(node)
+                    heappush(queue, (new_cost + lowerBound(nx, ny, endX, endY), node))
+
+        self.nodesExpanded = expanded
+
+        if endNode not in closed:
+            raise ValueError("no path from node " + str(startNode) + " to node " + str(endNode))
+
+        self.lastCost = costTillNow[endNode]
+        current = endNode
+        path = []
+        # add all nodes to the path array
+        while current != startNode:
+            path.append(current)
+            current = previousNode[current]
+        return path, distanceTillNow[endNode]
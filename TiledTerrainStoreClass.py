@@ -0,0 +1,215 @@
+"""
+    This file implements the tiled terrain store, which keeps the elevation
+    and terrain class of a map in square tiles of a memory mapped file.
+"""
+import json
+import mmap
+import os
+from collections import OrderedDict
+import numpy as np
+
+
+class TiledTerrainStore():
+
+    """
+        This class reads and writes the tiled terrain store file.
+
+        The file starts with a magic string, the format version and the
+        length of a JSON header. The header holds the size of the map and
+        the tiles, the speed of every terrain class code and the codes that
+        can not be entered. Every tile follows, aligned to the page size,
+        with its elevations as float32 and then its terrain class codes.
+
+        The file is memory mapped and a tile is only read from disk when it is
+        first used. At most maxResidentTiles tiles are kept, the pages of the
+        least recently used tile are released when another one is needed, so
+        maps larger than the memory can be searched.
+
+        A store can be written from whole layers, or from bands of tileSize
+        rows with writeBands, which PathFinder.writeTiledStoreFromSources
+        uses to write the summer terrain straight from the source files. The
+        terrain of the other seasons needs the whole map, so it can only be
+        written from a path finder holding it.
+    """
+    __slots__ = 'storeFilePath', 'header', 'maxResidentTiles', 'width', 'height', 'tileSize', 'tilesAcross', \
+                'tileBytes', 'dataStart', 'file', 'mapping', 'residentTiles', 'tilesLoaded'
+
+    magic = b'PRFTILES'
+    version = 1
+
+    def __init__(self, storeFilePath, maxResidentTiles=64):
+        """
+            This is the constructor for the class.
+        :param storeFilePath:       path of the store file
+        :param maxResidentTiles:    the most tiles kept in memory at the same time
+        """
+        self.storeFilePath = storeFilePath
+        self.maxResidentTiles = maxResidentTiles
+        self.header = None
+        self.file = None
+        self.mapping = None
+        self.residentTiles = OrderedDict()
+        self.tilesLoaded = 0
+
+    def write(self, elevation, terrainClass, speedTable, blockedCodes, tileSize=256, fillClass=0):
+        """
+            This function writes the store from whole layers, one tile at a time,
+            so the layers can themselves be memory mapped.
+        :param elevation:       (height, width) array of the elevations
+        :param terrainClass:    (height, width) array of the terrain class codes
+        :param speedTable:      the speed of every terrain class code
+        :param blockedCodes:    the terrain class codes that can not be entered
+        :param tileSize:        the width and height of the tiles in pixels
+        :param fillClass:       the terrain class code of the pixels of the edge
+                                tiles beyond the map
+        :return:                None
+        """
+        height, width = elevation.shape
+        bands = ((elevation[firstY:firstY + tileSize], terrainClass[firstY:firstY + tileSize])
+                 for firstY in range(0, height, tileSize))
+        self.writeBands(width, height, bands, speedTable, blockedCodes, tileSize, fillClass)
+
+    def writeBands(self, width, height, bands, speedTable, blockedCodes, tileSize=256, fillClass=0):
+        """
+            This function writes the store from bands of tileSize rows of the
+            map, given from the top down, so only one band has to be in memory.
+            The file is written next to the store and then renamed, so readers
+            never see a partial store.
+        :param width:           the width of the map
+        :param height:          the height of the map
+        :param bands:           iterable of the elevations and terrain class codes
+                                of every band, as (rows, width) arrays
+        :param speedTable:      the speed of every terrain class code
+        :param blockedCodes:    the terrain class codes that can not be entered
+        :param tileSize:        the width and height of the tiles in pixels
+        :param fillClass:       the terrain class code of the pixels of the edge
+                                tiles beyond the map
+        :return:                None
+        """
+        tileBytes = -(-(tileSize * tileSize * 5) // mmap.PAGESIZE) * mmap.PAGESIZE
+        header = {'width': width, 'height': height, 'tileSize': tileSize, 'tileBytes': tileBytes,
+                  'speedTable': [float(speed) for speed in speedTable],
+                  'blockedCodes': [int(code) for code in blockedCodes]}
+        headerLength = len(json.dumps(header)) + 32
+        header['dataStart'] = -(-(len(self.magic) + 8 + headerLength) // mmap.PAGESIZE) * mmap.PAGESIZE
+        headerBytes = json.dumps(header).encode('utf-8').ljust(headerLength)
+
+        temporaryFilePath = self.storeFilePath + "." + str(os.getpid()) + ".tmp"
+        try:
+            with open(temporaryFilePath, "wb") as file:
+                file.write(self.magic)
+                file.write(np.array([self.version, headerLength], dtype='<u4').tobytes())
+                file.write(headerBytes)
+                file.seek(header['dataStart'])
+                firstY = 0
+                for bandElevation, bandClass in bands:
+                    rows = min(tileSize, height - firstY)
+                    if bandElevation.shape != (rows, width) or bandClass.shape != (rows, width):
+                        raise ValueError("the band at row " + str(firstY) + " is " + str(bandElevation.shape) +
+                                         " pixels, " + str((rows, width)) + " were expected")
+                    for firstX in range(0, width, tileSize):
+                        tileElevation = np.zeros((tileSize, tileSize), dtype='<f4')
+                        tileClass = np.full((tileSize, tileSize), fillClass, dtype=np.uint8)
+                        columns = min(tileSize, width - firstX)
+                        tileElevation[0:rows, 0:columns] = bandElevation[:, firstX:firstX + columns]
+                        tileClass[0:rows, 0:columns] = bandClass[:, firstX:firstX + columns]
+                        file.write(tileElevation.tobytes())
+                        file.write(tileClass.tobytes())
+                        file.write(bytes(tileBytes - tileSize * tileSize * 5))
+                    firstY += rows
+                if firstY != height:
+                    raise ValueError("the bands hold " + str(firstY) + " rows, the map is " + str(height) + " high")
+            os.replace(temporaryFilePath, self.storeFilePath)
+        finally:
+            if os.path.exists(temporaryFilePath):
+                os.remove(temporaryFilePath)
+
+    def open(self):
+        """
+            This function reads the header and memory maps the store.
+        :return:    the store
+        """
+        with open(self.storeFilePath, "rb") as file:
+            prefix = file.read(len(self.magic) + 8)
+            if prefix[0:len(self.magic)] != self.magic:
+                raise ValueError(self.storeFilePath + " is not a tiled terrain store")
+            version, headerLength = np.frombuffer(prefix[len(self.magic):], dtype='<u4')
+            if version != self.version:
+                raise ValueError(self.storeFilePath + " was written by version " + str(version) +
+                                 " of the tiled terrain store format")
+            self.header = json.loads(file.read(int(headerLength)).decode('utf-8'))
+
+        self.width = self.header['width']
+        self.height = self.header['height']
+        self.tileSize = self.header['tileSize']
+        self.tileBytes = self.header['tileBytes']
+        self.dataStart = self.header['dataStart']
+        self.tilesAcross = -(-self.width // self.tileSize)
+        self.file = open(self.storeFilePath, "rb")
+        self.mapping = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self
+
+    def close(self):
+        """
+            This function releases the tiles and closes the store.
+        :return:    None
+        """
+        self.residentTiles.clear()
+        if self.mapping is not None:
+            self.mapping.close()
+            self.file.close()
+            self.mapping = None
+            self.file = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exceptionType, exceptionValue, traceback):
+        self.close()
+
+    def tileOf(self, x, y):
+        """
+            This function returns the tile a pixel lies in.
+        :param x:   the x coordinate of the pixel
+        :param y:   the y coordinate of the pixel
+        :return:    the index of the tile
+        """
+        return (y // self.tileSize) * self.tilesAcross + x // self.tileSize
+
+    def tile(self, tileIndex):
+        """
+            This function returns the layers of a tile, paging it in if
+            it is not resident and releasing the least recently used tile
+            when too many are resident.
+        :param tileIndex:   the index of the tile
+        :return:            the elevations and terrain class codes of the
+                            tile, in row major order within the tile
+        """
+        layers = self.residentTiles.get(tileIndex)
+        if layers is not None:
+            self.residentTiles.move_to_end(tileIndex)
+            return layers
+
+        if len(self.residentTiles) >= self.maxResidentTiles:
+            evicted, layers = self.residentTiles.popitem(last=False)
+            # drop the pages of the tile, they are read from the file again when needed
+            self.mapping.madvise(mmap.MADV_DONTNEED, self.dataStart + evicted * self.tileBytes, self.tileBytes)
+
+        start = self.dataStart + tileIndex * self.tileBytes
+        pixels = self.tileSize * self.tileSize
+        view = memoryview(self.mapping)
+        layers = (view[start:start + pixels * 4].cast('f'), view[start + pixels * 4:start + pixels * 5])
+        self.residentTiles[tileIndex] = layers
+        self.tilesLoaded += 1
+        return layers
+
+    def pixel(self, x, y):
+        """
+            This function returns the elevation and terrain class of a pixel.
+        :param x:   the x coordinate of the pixel
+        :param y:   the y coordinate of the pixel
+        :return:    the elevation and terrain class code of the pixel
+        """
+        elevation, terrainClass = self.tile(self.tileOf(x, y))
+        index = (y % self.tileSize) * self.tileSize + x % self.tileSize
+        return elevation[index], terrainClass[index]
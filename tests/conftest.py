@@ -0,0 +1,42 @@
+"""
+    This file sets up the tests to run from the top of the repository,
+    where the modules, the terrain files and the route files are.
+"""
+import os
+import sys
+import pytest
+
+repositoryPath = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repositoryPath)
+
+from PathFinderClass import PathFinder
+
+
+@pytest.fixture(autouse=True)
+def inRepository(monkeypatch):
+    """
+        This fixture runs every test from the top of the repository.
+    """
+    monkeypatch.chdir(repositoryPath)
+
+
+@pytest.fixture(scope="session")
+def pathFinder():
+    """
+        This fixture is the path finder of the grid engine on the repository terrain, shared by the tests.
+    """
+    os.chdir(repositoryPath)
+    return PathFinder("TerrainImageAndElevation/terrain.png", "TerrainImageAndElevation/elevations.txt",
+                      searchEngine='grid', bundleFilePath="TerrainImageAndElevation/terrain.bundle")
+
+
+@pytest.fixture(scope="session")
+def originalPathFinder():
+    """
+        This fixture is the path finder building the winter and spring layers with the original
+        searches, as the images in GeneratedPaths were. It reads the terrain files, so the
+        shared terrain bundle is not rebuilt for its layer rules.
+    """
+    os.chdir(repositoryPath)
+    return PathFinder("TerrainImageAndElevation/terrain.png", "TerrainImageAndElevation/elevations.txt",
+                      searchEngine='grid', springCompatible=True, winterCompatible=True)
@@ -0,0 +1,40 @@
+"""
+    This file checks that the bidirectional search and the bucket queue
+    find paths as cheap as Dijkstra's algorithm and the binary heap on
+    every season and course.
+"""
+import pytest
+from PathFinderClass import PathFinder
+
+
+@pytest.mark.parametrize("season", PathFinder.seasonsToConsider)
+@pytest.mark.parametrize("routeFile", PathFinder.pathsToTrace)
+def testBidirectionalCostIsOptimal(pathFinder, season, routeFile):
+    pathFinder.loadSeason(season)
+    pathFinder.prepareEdgeCosts()
+    searchEngine = pathFinder.gridSearchEngine
+    nodes = [pathFinder.terrainGrid.index(point) for point in pathFinder.getPointsOnRoute(routeFile)]
+    for startNode, endNode in zip(nodes, nodes[1:]):
+        searchEngine.findPathBidirectional(startNode, endNode)
+        bidirectionalCost = searchEngine.lastCost
+        costs, distances = searchEngine.findCostsToTargets(startNode, [endNode])
+        assert bidirectionalCost == pytest.approx(costs[0], rel=1e-9)
+
+
+@pytest.mark.parametrize("season", PathFinder.seasonsToConsider)
+@pytest.mark.parametrize("routeFile", PathFinder.pathsToTrace)
+def testBucketQueueCostMatchesHeap(pathFinder, season, routeFile):
+    pathFinder.loadSeason(season)
+    pathFinder.prepareEdgeCosts()
+    searchEngine = pathFinder.gridSearchEngine
+    nodes = [pathFinder.terrainGrid.index(point) for point in pathFinder.getPointsOnRoute(routeFile)]
+    try:
+        for startNode, endNode in zip(nodes, nodes[1:]):
+            searchEngine.setOpenList('heap')
+            searchEngine.findPath(startNode, endNode)
+            heapCost = searchEngine.lastCost
+            searchEngine.setOpenList('buckets')
+            searchEngine.findPath(startNode, endNode)
+            assert searchEngine.lastCost == pytest.approx(heapCost, rel=1e-9)
+    finally:
+        searchEngine.setOpenList('heap')
@@ -0,0 +1,26 @@
+"""
+    This file checks the leg cost matrix against the
+    searches of single legs and its checks of the points.
+"""
+import pytest
+from PixelPositionClass import PixelPosition
+
+
+def testMatrixCostsMatchSingleLegs(pathFinder):
+    pathFinder.loadSeason("summer")
+    points = pathFinder.getPointsOnRoute("white.txt")[0:4]
+    costs, distances = pathFinder.legCostMatrix(points)
+    searchEngine = pathFinder.gridSearchEngine
+    for i in range(0, len(points)):
+        for j in range(0, len(points)):
+            if i != j:
+                searchEngine.findPathBidirectional(pathFinder.terrainGrid.index(points[i]),
+                                                   pathFinder.terrainGrid.index(points[j]))
+                assert costs[i, j] == pytest.approx(searchEngine.lastCost, rel=1e-9)
+
+
+@pytest.mark.parametrize("x, y", [(395, 10), (-1, 10), (10, 500), (10, -1)])
+def testMatrixRejectsPointsOffTheMap(pathFinder, x, y):
+    pathFinder.loadSeason("summer")
+    with pytest.raises(ValueError, match="outside the map"):
+        pathFinder.legCostMatrix([PixelPosition(230, 327), PixelPosition(x, y)])
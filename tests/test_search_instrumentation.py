@@ -0,0 +1,26 @@
+"""
+    This file checks that the instrumentation records the
+    counters and the pixels reached of the search that ran.
+"""
+import pytest
+from SearchInstrumentationClass import SearchInstrumentation
+
+
+@pytest.mark.parametrize("hierarchical", [False, True])
+def testInstrumentedLegRecordsItsSearch(pathFinder, hierarchical):
+    pathFinder.loadSeason("summer")
+    instrumentation = SearchInstrumentation(heatmap=True)
+    pathFinder.setInstrumentation(instrumentation)
+    try:
+        points = pathFinder.getPointsOnRoute("white.txt")
+        instrumentation.startRun("white.txt", "summer", pathFinder.gridSearchEngine.size)
+        pathFinder.findPath(points[0], points[1], hierarchical=hierarchical)
+        run = instrumentation.finishRun()
+    finally:
+        pathFinder.setInstrumentation(None)
+
+    leg = run['legs'][0]
+    assert leg['search'] == ('hierarchical' if hierarchical else 'astar')
+    assert leg['nodesExpanded'] > 0
+    assert leg['nodesPushed'] >= leg['nodesExpanded'] + leg['stalePops']
+    assert (instrumentation.exploredMaps[("summer", "white.txt")] > 0).any()
@@ -0,0 +1,52 @@
+"""
+    This file checks the winter ice and spring mud layers against the
+    images in GeneratedPaths, made with the original searches, and the
+    routes through the layers against their known distances.
+"""
+import pytest
+from Benchmark_Suite import goldenTotalDistances, distanceTolerance
+
+
+@pytest.mark.parametrize("routeFile", ["brown.txt", "white.txt", "red.txt"])
+def testOriginalWinterLayerMatchesGeneratedImage(originalPathFinder, routeFile):
+    assert originalPathFinder.compareSeasonWithImage(
+        "winter", "GeneratedPaths/winter" + routeFile.replace(".txt", ".png")) == (0, 0)
+
+
+@pytest.mark.parametrize("routeFile", ["brown.txt", "white.txt", "red.txt"])
+def testWinterLayerDiffersOnlyOnShoreAndFarWater(pathFinder, routeFile):
+    pathFinder.loadSeason("summer")
+    distance = pathFinder.seasonLayerBuilder.waterDistance(pathFinder.terrainGrid)
+    onlyInReference, onlyInSeason = pathFinder.seasonDifferenceWithImage(
+        "winter", "GeneratedPaths/winter" + routeFile.replace(".txt", ".png"))
+
+    # the original search iced the land pixels it started from, and only they are lost
+    assert onlyInReference.any() and (distance[onlyInReference] == 0).all()
+    # it stopped at the first water 7 rows or columns away, missing most of the
+    # water 7 steps from land and a few pixels 6 steps from it
+    assert int((onlyInSeason & (distance == 7)).sum()) == 1174
+    assert int((onlyInSeason & (distance == 6)).sum()) == 14
+    assert int(onlyInSeason.sum()) == 1174 + 14
+
+@pytest.mark.parametrize("routeFile", ["brown.txt", "white.txt", "red.txt"])
+def testOriginalSpringLayerMatchesGeneratedImage(originalPathFinder, routeFile):
+    assert originalPathFinder.compareSeasonWithImage(
+        "spring", "GeneratedPaths/spring" + routeFile.replace(".txt", ".png")) == (0, 0)
+
+
+@pytest.mark.parametrize("routeFile, differingPixels", [("brown.txt", (5018, 197)), ("white.txt", (5031, 198)),
+                                                        ("red.txt", (5024, 196))])
+def testSpringLayerDiffersFromOriginalFlood(pathFinder, routeFile, differingPixels):
+    # the one-pass flood compares elevations with the water, not with the shore pixel
+    # the original search started from, so it floods other pixels and changes the routes
+    assert pathFinder.compareSeasonWithImage(
+        "spring", "GeneratedPaths/spring" + routeFile.replace(".txt", ".png")) == differingPixels
+
+
+@pytest.mark.parametrize("season", ["winter", "spring"])
+@pytest.mark.parametrize("routeFile", ["brown.txt", "white.txt", "red.txt"])
+def testSeasonRouteDistance(pathFinder, season, routeFile):
+    pathFinder.loadSeason(season)
+    result = pathFinder.solvePoints(pathFinder.getPointsOnRoute(routeFile), season, routeFile)
+    golden = goldenTotalDistances[(season, routeFile)]
+    assert result.totalDistance() == pytest.approx(golden, rel=distanceTolerance)
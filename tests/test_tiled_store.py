@@ -0,0 +1,38 @@
+"""
+    This file checks the tiled terrain store written from the source
+    files and the routes of the tiled search engine on it.
+"""
+import pytest
+from PathFinderClass import PathFinder
+from Benchmark_Suite import goldenTotalDistances, distanceTolerance
+
+
+@pytest.fixture(scope="module")
+def tiledStoreFilePath(tmp_path_factory):
+    """
+        This fixture is the tiled store of the summer terrain, written from the source files.
+    """
+    return str(tmp_path_factory.mktemp("tiles") / "terrain.tiles")
+
+
+@pytest.fixture(scope="module")
+def tiledPathFinder(tiledStoreFilePath):
+    """
+        This fixture is the path finder of the tiled engine, which writes the store as it is missing.
+    """
+    return PathFinder("TerrainImageAndElevation/terrain.png", "TerrainImageAndElevation/elevations.txt",
+                      searchEngine='tiled', tiledStoreFilePath=tiledStoreFilePath)
+
+
+def testStreamedStoreMatchesLoadedMap(pathFinder, tiledPathFinder, tiledStoreFilePath, tmp_path):
+    pathFinder.loadSeason('summer')
+    pathFinder.writeTiledStore(str(tmp_path / "loaded.tiles"))
+    with open(tiledStoreFilePath, "rb") as streamed, open(str(tmp_path / "loaded.tiles"), "rb") as loaded:
+        assert streamed.read() == loaded.read()
+
+
+@pytest.mark.parametrize("routeFile", PathFinder.pathsToTrace)
+def testTiledRouteDistance(tiledPathFinder, routeFile):
+    result = tiledPathFinder.solveRoute(routeFile, 'summer')
+    golden = goldenTotalDistances[('summer', routeFile)]
+    assert result.totalDistance() == pytest.approx(golden, rel=distanceTolerance)